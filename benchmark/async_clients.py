@@ -0,0 +1,77 @@
+"""
+Run many coroutine clients on one event loop against the asyncio server.
+
+    python3 -m benchmark.async_clients --clients 1000 --num-iter 10
+"""
+import argparse
+import asyncio
+import time
+from multiprocessing import Process
+from pathlib import Path
+
+from benchmark.common import format_summary, summarize
+from client.async_request_sender import AsyncRequestSender
+from client.registrar import Registrar
+from server.async_server import start_async_server
+from utils.utils import new_client_id
+
+
+async def run_client(register_pipe_path: Path, num_iter: int, durations):
+    """
+    Register one coroutine client, send `num_iter` requests and unregister.
+    """
+    client_id = new_client_id()
+    registrar = Registrar(client_id, register_pipe_path)
+    sender = AsyncRequestSender(client_id)
+
+    registrar.register()
+    await sender.init()
+    for i in range(num_iter):
+        st = time.perf_counter_ns()
+        await sender.request(i)
+        durations.append((time.perf_counter_ns() - st) / 1000)
+    registrar.unregister()
+    sender.close()
+
+
+async def run_clients(register_pipe_path: Path, clients: int, num_iter: int):
+    """
+    Run all coroutine clients concurrently and print the results.
+    """
+    durations = []
+    st = time.perf_counter()
+    await asyncio.gather(
+        *(
+            run_client(register_pipe_path, num_iter, durations)
+            for _ in range(clients)
+        )
+    )
+    elapsed = time.perf_counter() - st
+
+    print(format_summary(f"{clients} coroutine clients", summarize(durations)))
+    print(f"throughput: {len(durations) / elapsed:.1f} req/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--num-iter", type=int, default=10)
+    args = parser.parse_args()
+
+    register_pipe_path = Path("register_pipe")
+    server_proc = Process(target=start_async_server, args=(register_pipe_path,))
+    server_proc.start()
+    while not register_pipe_path.exists():
+        time.sleep(1e-3)
+
+    try:
+        asyncio.run(run_clients(register_pipe_path, args.clients, args.num_iter))
+    finally:
+        server_proc.terminate()
+        server_proc.join()
+        if register_pipe_path.exists():
+            register_pipe_path.unlink()
+
+
+if __name__ == "__main__":
+    main()
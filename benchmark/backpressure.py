@@ -0,0 +1,158 @@
+"""
+One client sends a burst of batch requests and stops reading its responses
+for a while, as a stalled consumer would, while another client keeps
+sending single requests. Print the latency of the second client, once with
+blocking response writes and once with PipeLimits, and the server's
+outbound stats taken during the stall.
+
+With blocking writes a reactor server stops in the write to the full pipe,
+so every client waits for the stalled one. With PipeLimits the responses
+are queued, or the stalled client's requests are left unread, and the
+other client is not held up.
+
+    python3 -m benchmark.backpressure --burst 100 --stall 1.0
+"""
+import argparse
+import os
+import threading
+import time
+from multiprocessing import Event, Process
+from pathlib import Path
+
+from benchmark.common import format_summary, running_server, summarize
+from client.registrar import Registrar
+from client.request_sender import RequestSender
+from server.server import Server
+from utils.pipe_writer import PipeLimits
+from utils.utils import new_client_id
+
+
+def stalled_client(
+    register_pipe_path: Path,
+    burst: int,
+    batch_size: int,
+    stall: float,
+    started: Event,
+) -> None:
+    """
+    Send `burst` batch requests, read nothing for `stall` seconds, then
+    read all responses.
+    """
+    client_id = new_client_id()
+    registrar = Registrar(client_id, register_pipe_path)
+    sender = RequestSender(client_id)
+    registrar.register()
+    sender.init()
+
+    futures = []
+
+    def send() -> None:
+        # Blocks once the server stops reading the requests.
+        for _ in range(burst):
+            futures.append(sender.submit_many(range(batch_size)))
+
+    sender_th = threading.Thread(target=send)
+    sender_th.start()
+    started.set()
+    time.sleep(stall)
+    # Read while the burst is still being sent, which may be waiting for
+    # the server to take more requests.
+    for i in range(burst):
+        while len(futures) <= i:
+            time.sleep(1e-3)
+        futures[i].result()
+    sender_th.join()
+
+    registrar.unregister()
+    sender.close()
+
+
+def bench(args, pipe_limits) -> None:
+    """
+    Print the latency of a client running next to a stalled one.
+    """
+    register_pipe_path = Path(f"{os.getpid()}_backpressure_register_pipe")
+    with running_server(
+        register_pipe_path, mode=args.mode, pipe_limits=pipe_limits
+    ):
+        client_id = new_client_id()
+        registrar = Registrar(client_id, register_pipe_path)
+        sender = RequestSender(client_id)
+        registrar.register()
+        sender.init()
+
+        started = Event()
+        stalled = Process(
+            target=stalled_client,
+            args=(
+                register_pipe_path,
+                args.burst,
+                args.batch_size,
+                args.stall,
+                started,
+            ),
+        )
+        stalled.start()
+        started.wait()
+
+        durations = []
+        stats = None
+        deadline = time.monotonic() + args.stall
+        while time.monotonic() < deadline:
+            st = time.perf_counter_ns()
+            sender.request(1)
+            durations.append((time.perf_counter_ns() - st) / 1000)
+            if stats is None and time.monotonic() > deadline - args.stall / 2:
+                try:
+                    stats = registrar.stats(timeout=args.stall)
+                except TimeoutError:
+                    stats = dict()
+
+        stalled.join()
+        registrar.unregister()
+        sender.close()
+
+    name = "blocking writes" if pipe_limits is None else "pipe limits"
+    print(format_summary(name, summarize(durations)))
+    if not stats:
+        print(f"{name}: the server did not answer stats during the stall")
+    else:
+        print(f"{name}: outbound {stats['outbound']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--burst", type=int, default=100)
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=512,
+        help="values per batch request; the response is as large",
+    )
+    parser.add_argument(
+        "--stall",
+        type=float,
+        default=1.0,
+        help="seconds the stalled client does not read",
+    )
+    parser.add_argument(
+        "--mode", choices=Server.MODES, default=Server.REACTOR_MODE
+    )
+    parser.add_argument("--pipe-capacity", type=int, default=None)
+    parser.add_argument("--max-pipe-capacity", type=int, default=None)
+    parser.add_argument(
+        "--max-queued", type=int, default=PipeLimits().max_queued
+    )
+    args = parser.parse_args()
+
+    bench(args, None)
+    bench(
+        args,
+        PipeLimits(
+            args.pipe_capacity, args.max_pipe_capacity, args.max_queued
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Compare sending integers one request at a time with batch requests
+of several sizes.
+
+    python3 -m benchmark.batch --num-values 100000 --batch-sizes 10 100 1000 10000
+"""
+import argparse
+import time
+
+from benchmark.common import (
+    add_transport_argument,
+    connected_sender,
+    running_server,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-values", type=int, default=100000)
+    parser.add_argument(
+        "--batch-sizes", type=int, nargs="+", default=[10, 100, 1000, 10000]
+    )
+    add_transport_argument(parser)
+    args = parser.parse_args()
+
+    values = list(range(args.num_values))
+    for transport in args.transports:
+        with running_server(transport=transport), connected_sender(
+            transport=transport
+        ) as sender:
+            st = time.perf_counter()
+            for value in values:
+                sender.request(value)
+            elapsed = time.perf_counter() - st
+            print(
+                f"{transport} single requests: "
+                f"{len(values) / elapsed:.1f} values/s"
+            )
+
+            for batch_size in args.batch_sizes:
+                st = time.perf_counter()
+                for i in range(0, len(values), batch_size):
+                    sender.request_many(values[i : i + batch_size])
+                elapsed = time.perf_counter() - st
+                print(
+                    f"{transport} batch size {batch_size:>6}: "
+                    f"{len(values) / elapsed:.1f} values/s"
+                )
+
+if __name__ == "__main__":
+    main()
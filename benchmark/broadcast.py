@@ -0,0 +1,179 @@
+"""
+Measure what a broadcast costs as the number of clients grows: how long
+Server.broadcast() takes and how long until the last client has the payload.
+
+"inline" sends the whole payload in every client's frame, as one write per
+client would; "shared" writes it once into shared memory and sends each
+client a notice of a few dozen bytes.
+
+    python3 -m benchmark.broadcast --clients 10 100 500 --sizes 1024 1048576
+"""
+import argparse
+import os
+import statistics
+import time
+from multiprocessing import Barrier, Process, Queue
+from pathlib import Path
+
+from client.registrar import Registrar
+from client.request_sender import RequestSender
+from server.server import Server
+from utils.broadcast import Publisher
+from utils.utils import new_client_id
+
+# How long to wait for a client to receive every broadcast.
+RECEIVE_TIMEOUT = 60.0
+
+
+def run_clients(
+    register_pipe_path: Path,
+    num_clients: int,
+    expected: int,
+    ready: Barrier,
+    results: Queue,
+) -> None:
+    """
+    Register `num_clients` subscribed clients and report when each received
+    each broadcast.
+    """
+    clients = []
+    received = []
+
+    def on_broadcast(version: int, payload: memoryview) -> None:
+        # Touch the payload as a subscriber applying it would.
+        payload[-1:].tobytes()
+        received.append((version, time.perf_counter_ns()))
+
+    for _ in range(num_clients):
+        client_id = new_client_id()
+        registrar = Registrar(client_id, register_pipe_path)
+        sender = RequestSender(client_id)
+        registrar.register()
+        sender.init()
+        sender.subscribe(on_broadcast)
+        clients.append((registrar, sender))
+
+    ready.wait()
+    deadline = time.monotonic() + RECEIVE_TIMEOUT
+    while time.monotonic() < deadline:
+        missed = sum(sender.broadcasts_missed for _, sender in clients)
+        if len(received) + missed >= expected * num_clients:
+            break
+        time.sleep(1e-3)
+    results.put((list(received), missed))
+
+    for registrar, sender in clients:
+        registrar.unregister()
+        sender.close()
+
+
+def bench(
+    num_clients: int,
+    processes: int,
+    size: int,
+    rounds: int,
+    shared: bool,
+    mode: str,
+) -> None:
+    """
+    Print the cost of broadcasting `size` bytes to `num_clients` clients.
+    """
+    register_pipe_path = Path(f"{os.getpid()}_broadcast_register_pipe")
+    publisher = Publisher(
+        inline_limit=0 if shared else size + 1, keep=rounds
+    )
+    server = Server(register_pipe_path, mode=mode, publisher=publisher)
+    server.start()
+
+    per_process = [
+        num_clients // processes + (i < num_clients % processes)
+        for i in range(processes)
+    ]
+    per_process = [count for count in per_process if count]
+    ready = Barrier(len(per_process) + 1)
+    results = Queue()
+    procs = [
+        Process(
+            target=run_clients,
+            args=(register_pipe_path, count, rounds, ready, results),
+        )
+        for count in per_process
+    ]
+    for proc in procs:
+        proc.start()
+    ready.wait()
+
+    payload = os.urandom(size)
+    published = dict()
+    calls = []
+    for version in range(1, rounds + 1):
+        st = time.perf_counter_ns()
+        server.broadcast(payload)
+        calls.append(time.perf_counter_ns() - st)
+        published[version] = st
+        # Let the broadcast reach everyone before the next one.
+        time.sleep(0.05)
+
+    last = dict()
+    missed = 0
+    for _ in procs:
+        received, proc_missed = results.get()
+        missed += proc_missed
+        for version, at in received:
+            last[version] = max(last.get(version, 0), at)
+    for proc in procs:
+        proc.join()
+    server.stop()
+    try:
+        register_pipe_path.unlink()
+    except FileNotFoundError:
+        pass
+
+    fan_out = [
+        (last[version] - st) / 1e6
+        for version, st in published.items()
+        if version in last
+    ]
+    name = "shared" if shared else "inline"
+    print(
+        f"{num_clients:>7} {size:>9} {name:<7} "
+        f"{statistics.fmean(calls) / 1e3:>12.1f} "
+        f"{statistics.fmean(fan_out) if fan_out else 0:>12.2f} "
+        f"{max(fan_out, default=0):>10.2f} {missed:>6}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--clients", type=int, nargs="+", default=[10, 100, 500]
+    )
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1024, 1048576]
+    )
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument(
+        "--mode", choices=Server.MODES, default=Server.THREAD_MODE
+    )
+    args = parser.parse_args()
+
+    print(
+        "clients     bytes publish  broadcast us  to last ms     max ms "
+        "missed"
+    )
+    for num_clients in args.clients:
+        for size in args.sizes:
+            for shared in (False, True):
+                bench(
+                    num_clients,
+                    args.processes,
+                    size,
+                    args.rounds,
+                    shared,
+                    args.mode,
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import argparse
+import contextlib
+import os
+import statistics
+import time
+from multiprocessing import Event, Process
+from pathlib import Path
+from typing import Dict, List
+
+from client.registrar import Registrar
+from client.request_sender import RequestSender
+from server.server import start_server
+from utils.utils import FIFO_TRANSPORT, TRANSPORTS, ZMQ_TRANSPORT
+from utils.zmq_pipe import zmq
+
+
+def available_transports() -> List[str]:
+    """
+    Return the transports whose dependencies are installed.
+    """
+    return [t for t in TRANSPORTS if t != ZMQ_TRANSPORT or zmq is not None]
+
+
+def add_transport_argument(parser: argparse.ArgumentParser) -> None:
+    """
+    Add a --transports option, defaulting to every available transport.
+    """
+    parser.add_argument(
+        "--transports",
+        choices=TRANSPORTS,
+        nargs="+",
+        default=available_transports(),
+    )
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """
+    Return the nearest-rank percentile of an already sorted list.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def summarize(durations_us: List[float]) -> Dict[str, float]:
+    """
+    Summarize a list of durations in microseconds.
+    """
+    values = sorted(durations_us)
+    return {
+        "count": len(values),
+        "mean": statistics.fmean(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": values[-1] if values else 0.0,
+    }
+
+
+def format_summary(name: str, summary: Dict[str, float]) -> str:
+    """
+    Format a summary as a single line.
+    """
+    return (
+        f"{name}: n={summary['count']} "
+        f"mean={summary['mean']:.2f} us "
+        f"p50={summary['p50']:.2f} us "
+        f"p90={summary['p90']:.2f} us "
+        f"p99={summary['p99']:.2f} us "
+        f"max={summary['max']:.2f} us"
+    )
+
+
+@contextlib.contextmanager
+def running_server(register_pipe_path: Path = Path("register_pipe"), **kwargs):
+    """
+    Run start_server() in a child process until the block exits.
+
+    Keyword arguments are passed to start_server().
+    """
+    stop_event = Event()
+    server_proc = Process(
+        target=start_server,
+        args=(register_pipe_path,),
+        kwargs=dict(kwargs, stop_event=stop_event),
+    )
+    server_proc.start()
+    while not register_pipe_path.exists():
+        time.sleep(1e-3)
+
+    try:
+        yield server_proc
+    finally:
+        stop_event.set()
+        server_proc.join()
+        if register_pipe_path.exists():
+            register_pipe_path.unlink()
+
+
+@contextlib.contextmanager
+def connected_sender(
+    register_pipe_path: Path = Path("register_pipe"),
+    transport: str = FIFO_TRANSPORT,
+):
+    """
+    Register this process with the server and yield a ready RequestSender.
+    """
+    registrar = Registrar(os.getpid(), register_pipe_path, transport)
+    sender = RequestSender(
+        os.getpid(),
+        transport=transport,
+        register_pipe_path=register_pipe_path,
+    )
+    registrar.register()
+    sender.init()
+
+    try:
+        yield sender
+    finally:
+        registrar.unregister()
+        sender.close()
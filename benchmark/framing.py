@@ -0,0 +1,86 @@
+"""
+Compare throughput of the newline-delimited text protocol and the
+length-prefixed binary frames across payload sizes.
+
+    python3 -m benchmark.framing --sizes 8 64 512 4096 65536
+"""
+import argparse
+import threading
+import time
+from pathlib import Path
+
+from utils.frame import OP_REQUEST, pack_frame
+from utils.pipe_reader import PIPEReader
+from utils.pipe_writer import PIPEWriter
+from utils.utils import make_pipe
+
+
+def write_text(pipe_path: Path, payload: bytes, count: int) -> None:
+    writer = PIPEWriter(pipe_path, persistent=True)
+    message = payload.decode()
+    for _ in range(count):
+        writer.write(message)
+    writer.close()
+
+
+def write_frames(pipe_path: Path, payload: bytes, count: int) -> None:
+    writer = PIPEWriter(pipe_path, persistent=True)
+    for i in range(count):
+        writer.write_bytes(pack_frame(OP_REQUEST, payload, i))
+    writer.close()
+
+
+def run(binary: bool, size: int, count: int) -> float:
+    """
+    Send `count` messages of `size` bytes and return the elapsed seconds.
+    """
+    pipe_path = Path("framing_bench_pipe")
+    make_pipe(pipe_path)
+    reader = PIPEReader(pipe_path)
+
+    payload = b"7" * size
+    writer_th = threading.Thread(
+        target=write_frames if binary else write_text,
+        args=(pipe_path, payload, count),
+    )
+
+    st = time.perf_counter()
+    writer_th.start()
+    received = 0
+    while received < count:
+        if binary:
+            received += len(reader.read_frames())
+        else:
+            received += len(reader.read())
+    elapsed = time.perf_counter() - st
+
+    writer_th.join()
+    reader.close()
+    pipe_path.unlink()
+
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[8, 64, 512, 4096, 65536]
+    )
+    parser.add_argument("--bytes-per-run", type=int, default=64 * 1024 * 1024)
+    parser.add_argument("--max-count", type=int, default=100000)
+    args = parser.parse_args()
+
+    print("size       protocol   msg/s        MB/s")
+    for size in args.sizes:
+        count = min(args.max_count, max(args.bytes_per_run // size, 1))
+        for binary in (False, True):
+            elapsed = run(binary, size, count)
+            name = "binary" if binary else "text"
+            print(
+                f"{size:<10} {name:<10} {count / elapsed:<12.1f} "
+                f"{count * size / elapsed / 1e6:.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
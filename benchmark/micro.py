@@ -0,0 +1,309 @@
+"""
+Microbenchmarks of each layer on its own, for every transport:
+
+    make_pipe             create a named pipe (fifo only)
+    create_channel        create and open a client channel, then close it
+    pipe_write            write of one small frame by the client
+    pipe_read             read of one waiting frame by the server
+    register              Registrar.register until the first response
+    unregister            Registrar.unregister
+    handle                RequestHandler.handle of one request
+
+Nothing is printed while measuring. The result is one JSON document with
+p50/p90/p99/max latencies in microseconds and the throughput of every
+component, plus a description of the machine, so runs on different machines
+can be compared.
+
+    python3 -m benchmark.micro --num-iter 1000 --output result.json
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from benchmark.common import add_transport_argument, summarize
+from client.registrar import Registrar
+from client.request_sender import RequestSender
+from server.request_handler import RequestHandler
+from server.server import Server
+from utils.frame import OP_REQUEST, VALUE, Frame, pack_frame
+from utils.shared_channel import inbound_path
+from utils.transport import channel_paths, get_transport
+from utils.utils import (
+    FIFO_TRANSPORT,
+    SEQPACKET_TRANSPORT,
+    SHARED_TRANSPORT,
+    ZMQ_TRANSPORT,
+    make_pipe,
+    new_client_id,
+)
+
+FRAME = pack_frame(OP_REQUEST, VALUE.pack(42))
+
+
+def measure(
+    fn: Callable[[], None],
+    num_iter: int,
+    after: Optional[Callable[[], None]] = None,
+) -> Dict[str, float]:
+    """
+    Time `num_iter` calls of `fn`, calling `after` untimed after each one.
+
+    Returns:
+        The latency summary in microseconds and the throughput in calls/s.
+    """
+    durations = []
+    for _ in range(num_iter):
+        st = time.perf_counter_ns()
+        fn()
+        durations.append((time.perf_counter_ns() - st) / 1000)
+        if after is not None:
+            after()
+    return summarize_durations(durations)
+
+
+def summarize_durations(durations) -> Dict[str, float]:
+    """
+    Summarize durations in microseconds and add the throughput in calls/s.
+    """
+    result = summarize(durations)
+    total = sum(durations) / 1e6
+    result["throughput"] = len(durations) / total if total > 0 else 0.0
+    return result
+
+
+def remove_channel(client_id: int) -> None:
+    """
+    Delete whatever the channel of `client_id` left on the filesystem.
+    """
+    for path in channel_paths(client_id):
+        if path.exists():
+            path.unlink()
+
+
+@contextlib.contextmanager
+def channel_listener(transport: str):
+    """
+    Yield the register path to create channels through.
+
+    Seqpacket and zmq channels go through the register socket, so a thread
+    serves it. Shared channels write to the inbound pipe of the register
+    path, which only has to exist. The other transports need nothing.
+    """
+    if transport not in (SEQPACKET_TRANSPORT, ZMQ_TRANSPORT, SHARED_TRANSPORT):
+        yield None
+        return
+
+    register_pipe_path = Path(f"{os.getpid()}_micro_listen_pipe")
+    listener = get_transport(transport).listen(register_pipe_path)
+    if transport == SHARED_TRANSPORT:
+        shared = get_transport(transport)
+        try:
+            yield register_pipe_path
+        finally:
+            listener.close()
+            shared.inbound.close()
+            shared.returns.close()
+            for path in (register_pipe_path, inbound_path(register_pipe_path)):
+                path.unlink()
+        return
+    done = threading.Event()
+
+    def accept() -> None:
+        while not done.is_set():
+            listener.read(timeout=0.01)
+
+    th = threading.Thread(target=accept)
+    th.start()
+    try:
+        yield register_pipe_path
+    finally:
+        done.set()
+        th.join()
+        listener.close()
+
+
+def bench_make_pipe(num_iter: int) -> Dict[str, float]:
+    path = Path(f"{os.getpid()}_micro_pipe")
+    try:
+        return measure(lambda: make_pipe(path), num_iter)
+    finally:
+        path.unlink()
+
+
+def bench_create_channel(
+    transport: str, num_iter: int, register_pipe_path: Optional[Path]
+) -> Dict[str, float]:
+    def create_channel() -> None:
+        client_id = new_client_id()
+        client_ends = get_transport(transport).create_channel(
+            client_id, register_pipe_path=register_pipe_path
+        )
+        server_ends = get_transport(transport).open_channel(client_id)
+        for end in server_ends + client_ends:
+            if end is not None:
+                end.close()
+        remove_channel(client_id)
+
+    return measure(create_channel, num_iter)
+
+
+def bench_pipe(
+    transport: str, num_iter: int, register_pipe_path: Optional[Path]
+) -> Dict[str, Dict[str, float]]:
+    client_id = new_client_id()
+    client_reader, client_writer = get_transport(transport).create_channel(
+        client_id, register_pipe_path=register_pipe_path
+    )
+    server_reader, server_writer = get_transport(transport).open_channel(
+        client_id
+    )
+    if server_reader is None:
+        # Shared channels: the server reads the inbound pipe of all clients.
+        server_reader = get_transport(transport).inbound
+    try:
+        write = measure(
+            lambda: client_writer.write_bytes(FRAME),
+            num_iter,
+            after=lambda: server_reader.read_frames(),
+        )
+        client_writer.write_bytes(FRAME)
+        read = measure(
+            lambda: server_reader.read_frames(),
+            num_iter,
+            after=lambda: client_writer.write_bytes(FRAME),
+        )
+    finally:
+        for end in (server_writer, client_reader):
+            end.close()
+        if transport != SHARED_TRANSPORT:
+            server_reader.close()
+        client_writer.close()
+        remove_channel(client_id)
+    return {"pipe_write": write, "pipe_read": read}
+
+
+def bench_registration(
+    transport: str, num_iter: int
+) -> Dict[str, Dict[str, float]]:
+    register_pipe_path = Path(f"{os.getpid()}_micro_register_pipe")
+    server = Server(register_pipe_path, transport=transport)
+    server.start()
+
+    register, unregister = [], []
+    try:
+        for _ in range(num_iter):
+            client_id = new_client_id()
+            registrar = Registrar(client_id, register_pipe_path, transport)
+            sender = RequestSender(
+                client_id,
+                transport=transport,
+                register_pipe_path=register_pipe_path,
+            )
+
+            st = time.perf_counter_ns()
+            registrar.register()
+            sender.init()
+            register.append((time.perf_counter_ns() - st) / 1000)
+
+            st = time.perf_counter_ns()
+            registrar.unregister()
+            unregister.append((time.perf_counter_ns() - st) / 1000)
+
+            sender.close()
+            registrar.register_pipe.close()
+    finally:
+        server.stop()
+        server.registration_handler.register_th.join()
+        if register_pipe_path.exists():
+            register_pipe_path.unlink()
+
+    return {
+        "register": summarize_durations(register),
+        "unregister": summarize_durations(unregister),
+    }
+
+
+def bench_handle(
+    transport: str, num_iter: int, register_pipe_path: Optional[Path]
+) -> Dict[str, float]:
+    client_id = new_client_id()
+    sender = RequestSender(
+        client_id, transport=transport, register_pipe_path=register_pipe_path
+    )
+    handler = RequestHandler(client_id, transport=transport)
+    request = Frame(OP_REQUEST, 1, 0, VALUE.pack(42))
+    try:
+        return measure(
+            lambda: handler.handle(request),
+            num_iter,
+            after=lambda: sender.read_pipe.read_frames(),
+        )
+    finally:
+        handler.cleanup()
+        sender.close()
+
+
+def run_transport(
+    transport: str, num_iter: int
+) -> Dict[str, Dict[str, float]]:
+    """
+    Measure every component over one transport.
+    """
+    results = dict()
+    if transport == FIFO_TRANSPORT:
+        results["make_pipe"] = bench_make_pipe(num_iter)
+    with channel_listener(transport) as register_pipe_path:
+        results["create_channel"] = bench_create_channel(
+            transport, num_iter, register_pipe_path
+        )
+        results.update(bench_pipe(transport, num_iter, register_pipe_path))
+        results["handle"] = bench_handle(
+            transport, num_iter, register_pipe_path
+        )
+    results.update(bench_registration(transport, num_iter))
+    return results
+
+
+def machine() -> Dict[str, object]:
+    """
+    Describe the machine the benchmark ran on.
+    """
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-iter", type=int, default=1000)
+    parser.add_argument("--output", type=Path, default=None)
+    add_transport_argument(parser)
+    args = parser.parse_args()
+
+    report = {
+        "machine": machine(),
+        "num_iter": args.num_iter,
+        "results": {
+            transport: run_transport(transport, args.num_iter)
+            for transport in args.transports
+        },
+    }
+    text = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
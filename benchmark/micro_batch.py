@@ -0,0 +1,115 @@
+"""
+Measure the throughput and latency of many clients when the server batches
+their requests across clients, at several batch windows.
+
+The handler pays a fixed cost per call, as a model invocation or a GPU
+kernel launch would, on top of the doubling. Without batching every request
+pays it; with a window the requests of a batch share it, at the price of
+waiting for the batch to fill.
+
+    python3 -m benchmark.micro_batch --num-clients 16 --windows 0 50 200 1000
+"""
+import argparse
+import time
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from benchmark.common import add_transport_argument
+from server.request_handler import RequestHandler
+from server.server import Server
+from test import run
+from utils.frame import BATCH_TYPECODE
+
+# Fixed cost of each process_request()/process_batch() call in seconds.
+CALL_COST = 200e-6
+
+
+def spend(seconds: float) -> None:
+    """
+    Keep the CPU busy for `seconds`.
+    """
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class FixedCostHandler(RequestHandler):
+    """
+    A request handler paying CALL_COST once per call, however many values
+    the call processes.
+    """
+
+    @staticmethod
+    def process_request(data: int) -> int:
+        spend(CALL_COST)
+        return data * 2
+
+    @classmethod
+    def process_batch(cls, data):
+        spend(CALL_COST)
+        if np is not None:
+            return data * 2
+        return array(BATCH_TYPECODE, [v * 2 for v in data])
+
+
+def main() -> None:
+    global CALL_COST
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-clients", type=int, default=16)
+    parser.add_argument("--num-iter", type=int, default=200)
+    parser.add_argument(
+        "--windows",
+        type=float,
+        nargs="+",
+        default=[0, 50, 200, 1000],
+        help="batch windows in microseconds",
+    )
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument(
+        "--call-cost",
+        type=float,
+        default=CALL_COST * 1e6,
+        help="fixed cost of each processing call in microseconds",
+    )
+    parser.add_argument(
+        "--mode", choices=Server.MODES, default=Server.THREAD_MODE
+    )
+    add_transport_argument(parser)
+    args = parser.parse_args()
+    # Read by the server process, which is forked after this.
+    CALL_COST = args.call_cost / 1e6
+
+    print(
+        f"{args.num_clients} clients, {args.call_cost:g} us per call, "
+        f"max batch {args.max_batch}"
+    )
+    print("transport window us    req/s     p50 us     p99 us     max us")
+    for transport in args.transports:
+        for window in [None] + args.windows:
+            result = run(
+                num_clients=args.num_clients,
+                verbose=False,
+                mode=args.mode,
+                num_iter=args.num_iter,
+                interval=0,
+                transport=transport,
+                handler_cls=FixedCostHandler,
+                batch_window=None if window is None else window / 1e6,
+                max_batch=args.max_batch,
+            )
+            latency = result["latency"]
+            name = "off" if window is None else f"{window:g}"
+            print(
+                f"{transport:<9} {name:>9} {result['throughput']:>9.1f} "
+                f"{latency['p50']:>10.2f} {latency['p99']:>10.2f} "
+                f"{latency['max']:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
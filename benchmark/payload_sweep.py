@@ -0,0 +1,89 @@
+"""
+Round trip of one batch request carrying payloads from 64 B to 64 MB, for
+every transport. The response is as large as the request.
+
+With the zmq transport, payloads of at least the copy threshold travel as
+a message part of their own without being copied; --copy-thresholds runs
+the zmq sweep once per threshold to find the cutoff.
+
+    python3 -m benchmark.payload_sweep --copy-thresholds 4096 65536 1048576
+"""
+import argparse
+import time
+from array import array
+
+from benchmark.common import (
+    add_transport_argument,
+    connected_sender,
+    running_server,
+    summarize,
+)
+from utils import zmq_pipe
+from utils.frame import BATCH_TYPECODE
+from utils.utils import ZMQ_TRANSPORT
+
+SIZES = [64 * 16**i for i in range(6)]
+
+
+def sweep(transport: str, sizes, num_iter: int, budget: int) -> None:
+    """
+    Print the round trip latency and bandwidth of every payload size.
+    """
+    with running_server(transport=transport), connected_sender(
+        transport=transport
+    ) as sender:
+        for size in sizes:
+            values = array(BATCH_TYPECODE, range(size // 8))
+            iterations = max(3, min(num_iter, budget // size))
+
+            durations = []
+            for _ in range(iterations):
+                st = time.perf_counter_ns()
+                sender.request_many(values)
+                durations.append((time.perf_counter_ns() - st) / 1000)
+
+            summary = summarize(durations)
+            # Both directions carry `size` bytes.
+            bandwidth = 2 * size / summary["p50"]
+            label = transport
+            if transport == ZMQ_TRANSPORT:
+                label += f" (copy threshold {zmq_pipe.COPY_THRESHOLD})"
+            print(
+                f"{label} {size:>9} B: n={summary['count']} "
+                f"p50={summary['p50']:.1f} us p99={summary['p99']:.1f} us "
+                f"{bandwidth:.1f} MB/s"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--num-iter", type=int, default=100)
+    parser.add_argument(
+        "--budget",
+        type=int,
+        default=256 * 1024 * 1024,
+        help="bytes sent per size at most, bounding the iterations of "
+        "large payloads",
+    )
+    parser.add_argument(
+        "--copy-thresholds",
+        type=int,
+        nargs="+",
+        default=[zmq_pipe.COPY_THRESHOLD],
+    )
+    add_transport_argument(parser)
+    args = parser.parse_args()
+
+    for transport in args.transports:
+        if transport != ZMQ_TRANSPORT:
+            sweep(transport, args.sizes, args.num_iter, args.budget)
+            continue
+        for threshold in args.copy_thresholds:
+            # The server process is forked after this and inherits it.
+            zmq_pipe.COPY_THRESHOLD = threshold
+            sweep(transport, args.sizes, args.num_iter, args.budget)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Compare per-request round trip latency of the per-message and the
+persistent PIPEWriter modes.
+
+    python3 -m benchmark.pipe_writer --num-iter 2000
+"""
+import argparse
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+from benchmark.common import format_summary, summarize
+from utils.pipe_reader import PIPEReader
+from utils.pipe_writer import PIPEWriter
+from utils.utils import make_pipe
+
+
+def echo_loop(
+    request_path: Path, response_path: Path, persistent: bool, count: int
+) -> None:
+    """
+    Read `count` requests and echo each one back.
+    """
+    reader = PIPEReader(request_path)
+    writer = PIPEWriter(response_path, persistent=persistent)
+    handled = 0
+    while handled < count:
+        for msg in reader.read():
+            writer.write(msg)
+            handled += 1
+    writer.close()
+
+
+def run(persistent: bool, num_iter: int) -> List[float]:
+    """
+    Run `num_iter` round trips and return their durations in microseconds.
+    """
+    request_path = Path("bench_to_echo_pipe")
+    response_path = Path("echo_to_bench_pipe")
+    make_pipe(request_path)
+    make_pipe(response_path)
+
+    reader = PIPEReader(response_path)
+    echo_th = threading.Thread(
+        target=echo_loop,
+        args=(request_path, response_path, persistent, num_iter),
+    )
+    echo_th.start()
+    # Give the echo thread time to open its reader.
+    time.sleep(0.1)
+
+    writer = PIPEWriter(request_path, persistent=persistent)
+    durations = []
+    for i in range(num_iter):
+        st = time.perf_counter_ns()
+        writer.write(f"{i}")
+        reader.read()
+        durations.append((time.perf_counter_ns() - st) / 1000)
+    writer.close()
+
+    echo_th.join()
+    request_path.unlink()
+    response_path.unlink()
+
+    return durations
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-iter", type=int, default=2000)
+    args = parser.parse_args()
+
+    for persistent in (False, True):
+        name = "persistent" if persistent else "per-message"
+        print(format_summary(name, summarize(run(persistent, args.num_iter))))
+
+
+if __name__ == "__main__":
+    main()
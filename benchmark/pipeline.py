@@ -0,0 +1,52 @@
+"""
+Measure request throughput of one RequestSender at several pipeline depths.
+
+    python3 -m benchmark.pipeline --depths 1 8 64
+"""
+import argparse
+import time
+from collections import deque
+
+from benchmark.common import (
+    add_transport_argument,
+    connected_sender,
+    running_server,
+)
+from client.request_sender import RequestSender
+
+
+def run(sender: RequestSender, depth: int, num_requests: int) -> float:
+    """
+    Keep `depth` requests in flight and return the requests per second.
+    """
+    in_flight = deque()
+    st = time.perf_counter()
+    for i in range(num_requests):
+        if len(in_flight) >= depth:
+            in_flight.popleft().result()
+        in_flight.append(sender.submit(i))
+    while in_flight:
+        in_flight.popleft().result()
+    return num_requests / (time.perf_counter() - st)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--num-requests", type=int, default=20000)
+    add_transport_argument(parser)
+    args = parser.parse_args()
+
+    for transport in args.transports:
+        with running_server(transport=transport), connected_sender(
+            transport=transport
+        ) as sender:
+            for depth in args.depths:
+                throughput = run(sender, depth, args.num_requests)
+                print(
+                    f"{transport} depth {depth:>3}: {throughput:.1f} req/s"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Compare the request latency of unpinned runs with runs whose server and
+clients are pinned to cores of their own: the register loop on the first
+core, the request handler threads spread over the first half of the others
+and the clients over the rest.
+
+Pinning needs a multi-core Linux host; with --fifo-priority the pinned
+runs also ask for SCHED_FIFO, which needs CAP_SYS_NICE.
+
+    python3 -m benchmark.placement --num-clients 4 --repeat 3
+"""
+import argparse
+import os
+
+from server.server import Server
+from test import run
+from utils.placement import Placement, ServerPlacement
+
+
+def pinned_placements(cpus, fifo_priority=None, nice=None):
+    """
+    Split `cpus` between the register loop, the handlers and the clients.
+    """
+    cpus = sorted(cpus)
+    registration, others = cpus[:1], cpus[1:] or cpus[:1]
+    half = max(len(others) // 2, 1)
+    handlers, clients = others[:half], others[half:] or others[:half]
+    return (
+        ServerPlacement(
+            registration=Placement(frozenset(registration), fifo_priority, nice),
+            handlers=Placement(frozenset(handlers), fifo_priority, nice),
+        ),
+        Placement(frozenset(clients), fifo_priority, nice),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-clients", type=int, default=4)
+    parser.add_argument("--num-iter", type=int, default=1000)
+    parser.add_argument("--interval", type=float, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--mode", choices=Server.MODES, default=Server.THREAD_MODE
+    )
+    parser.add_argument("--fifo-priority", type=int, default=None)
+    parser.add_argument("--nice", type=int, default=None)
+    args = parser.parse_args()
+
+    cpus = os.sched_getaffinity(0)
+    if len(cpus) < 3:
+        print(
+            f"only {len(cpus)} core(s) available: the pinned runs share "
+            f"them, so expect no difference"
+        )
+    placement, client_placement = pinned_placements(
+        cpus, args.fifo_priority, args.nice
+    )
+    print(f"pinned: server {placement}, clients {client_placement}")
+
+    print("placement  run     req/s     p50 us     p99 us     max us")
+    for i in range(args.repeat):
+        for name, placements in (
+            ("unpinned", (None, None)),
+            ("pinned", (placement, client_placement)),
+        ):
+            result = run(
+                num_clients=args.num_clients,
+                verbose=False,
+                mode=args.mode,
+                num_iter=args.num_iter,
+                interval=args.interval,
+                placement=placements[0],
+                client_placement=placements[1],
+            )
+            latency = result["latency"]
+            print(
+                f"{name:<10} {i:>3} {result['throughput']:>9.1f} "
+                f"{latency['p50']:>10.2f} {latency['p99']:>10.2f} "
+                f"{latency['max']:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Measure how a CPU-bound handler scales when requests are processed on a
+pool of worker processes instead of the threads reading the client pipes.
+
+Throughput should grow close to linearly with the number of workers until
+it reaches the number of cores.
+
+    python3 -m benchmark.process_pool --num-clients 8 --workers 1 2 4 8
+"""
+import argparse
+import os
+
+from benchmark.common import add_transport_argument
+from server.request_handler import RequestHandler
+from test import run
+
+# Iterations of busy work per request, roughly a few milliseconds.
+WORK = 200000
+
+
+class CpuBoundHandler(RequestHandler):
+    """
+    A request handler burning CPU on every request.
+    """
+
+    @staticmethod
+    def process_request(data: int) -> int:
+        total = 0
+        for i in range(WORK):
+            total += i * i
+        return data * 2
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-clients", type=int, default=os.cpu_count())
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count()}),
+    )
+    parser.add_argument("--num-iter", type=int, default=20)
+    add_transport_argument(parser)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} cores, {args.num_clients} clients")
+    print("transport workers   req/s     speedup   p50 us       p99 us")
+    for transport in args.transports:
+        baseline = None
+        for workers in [None] + args.workers:
+            result = run(
+                num_clients=args.num_clients,
+                verbose=False,
+                num_iter=args.num_iter,
+                interval=0,
+                handler_cls=CpuBoundHandler,
+                workers=workers,
+                transport=transport,
+            )
+            throughput = result["throughput"]
+            if baseline is None:
+                baseline = throughput
+            latency = result["latency"]
+            print(
+                f"{transport:<9} {workers or 'inline':>7} {throughput:>9.1f} "
+                f"{throughput / baseline:>8.2f}x "
+                f"{latency['p50']:>10.2f} {latency['p99']:>12.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
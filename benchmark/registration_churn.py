@@ -0,0 +1,73 @@
+"""
+Register, send one request and unregister over and over, once with a
+channel created per client and once with the server's channel pool, and
+print the latency of registration and of the first request.
+
+    python3 -m benchmark.registration_churn --num-iter 1000 --pool-size 8
+"""
+import argparse
+import os
+import time
+from pathlib import Path
+
+from benchmark.common import format_summary, running_server, summarize
+from client.registrar import Registrar
+from client.request_sender import RequestSender
+from server.server import Server
+from utils.utils import new_client_id
+
+
+def churn(register_pipe_path: Path, num_iter: int, pooled: bool) -> None:
+    """
+    Print the registration and first request latencies of `num_iter`
+    short-lived clients.
+    """
+    register, first_request = [], []
+    for _ in range(num_iter):
+        client_id = new_client_id()
+        registrar = Registrar(client_id, register_pipe_path)
+
+        st = time.perf_counter_ns()
+        if pooled:
+            sender = RequestSender(
+                client_id, channel_id=registrar.acquire()
+            )
+        else:
+            sender = RequestSender(client_id)
+            registrar.register()
+            sender.init()
+        register.append((time.perf_counter_ns() - st) / 1000)
+
+        st = time.perf_counter_ns()
+        sender.request(1)
+        first_request.append((time.perf_counter_ns() - st) / 1000)
+
+        registrar.unregister()
+        sender.close()
+        registrar.register_pipe.close()
+
+    name = "pooled" if pooled else "created"
+    print(format_summary(f"{name} register", summarize(register)))
+    print(format_summary(f"{name} first request", summarize(first_request)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-iter", type=int, default=1000)
+    parser.add_argument("--pool-size", type=int, default=8)
+    parser.add_argument(
+        "--mode", choices=Server.MODES, default=Server.THREAD_MODE
+    )
+    args = parser.parse_args()
+
+    register_pipe_path = Path(f"{os.getpid()}_churn_register_pipe")
+    with running_server(register_pipe_path, mode=args.mode):
+        churn(register_pipe_path, args.num_iter, pooled=False)
+    with running_server(
+        register_pipe_path, mode=args.mode, channel_pool=args.pool_size
+    ):
+        churn(register_pipe_path, args.num_iter, pooled=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Compare throughput and tail latency of the thread-per-client and the
+epoll reactor server modes as the number of clients grows.
+
+    python3 -m benchmark.server_scaling --clients 1 10 100 1000
+"""
+import argparse
+
+from benchmark.common import add_transport_argument
+from server.server import Server
+from test import run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--clients", type=int, nargs="+", default=[1, 10, 100, 1000]
+    )
+    parser.add_argument("--num-iter", type=int, default=100)
+    add_transport_argument(parser)
+    args = parser.parse_args()
+
+    print("transport mode     clients   req/s       p50 us     p99 us")
+    for transport in args.transports:
+        for num_clients in args.clients:
+            for mode in Server.MODES:
+                result = run(
+                    num_clients=num_clients,
+                    verbose=False,
+                    mode=mode,
+                    num_iter=args.num_iter,
+                    interval=0,
+                    transport=transport,
+                )
+                latency = result["latency"]
+                print(
+                    f"{transport:<9} {mode:<8} {num_clients:>7} "
+                    f"{result['throughput']:>9.1f} "
+                    f"{latency['p50']:>10.2f} {latency['p99']:>10.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
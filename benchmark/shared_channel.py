@@ -0,0 +1,176 @@
+"""
+Register 100, 1,000 and 5,000 clients spread over a few processes, once
+with a channel of their own each and once over the shared channel, and
+print how long registering took, the request throughput, and the
+descriptors, threads and pipes the server needed.
+
+    python3 -m benchmark.shared_channel --clients 100 1000 5000 --mode thread
+"""
+import argparse
+import os
+import time
+from multiprocessing import Barrier, Event, Process, Queue
+from pathlib import Path
+
+from benchmark.common import running_server
+from client.registrar import Registrar
+from client.request_sender import RequestSender
+from server.server import Server
+from utils.utils import FIFO_TRANSPORT, SHARED_TRANSPORT, new_client_id
+
+
+def run_clients(
+    register_pipe_path: Path,
+    transport: str,
+    num_clients: int,
+    num_iter: int,
+    window: int,
+    ready: Barrier,
+    go: Event,
+    results: Queue,
+) -> None:
+    """
+    Register `num_clients` clients of this process, then have each send
+    `num_iter` requests, with at most `window` of them in flight.
+    """
+    st = time.perf_counter()
+    clients = []
+    for _ in range(num_clients):
+        client_id = new_client_id()
+        registrar = Registrar(client_id, register_pipe_path, transport)
+        sender = RequestSender(
+            client_id,
+            transport=transport,
+            register_pipe_path=register_pipe_path,
+        )
+        registrar.register()
+        clients.append((registrar, sender))
+    for _, sender in clients:
+        sender.init()
+    setup = time.perf_counter() - st
+
+    ready.wait()
+    go.wait()
+
+    st = time.perf_counter()
+    for i in range(num_iter):
+        for pos in range(0, num_clients, window):
+            futures = [
+                sender.submit(i) for _, sender in clients[pos : pos + window]
+            ]
+            for future in futures:
+                future.result()
+    results.put((setup, time.perf_counter() - st))
+
+    for registrar, sender in clients:
+        registrar.unregister()
+        sender.close()
+
+
+def count_entries(path: str) -> int:
+    """
+    Return the number of entries of a /proc directory.
+    """
+    return len(os.listdir(path))
+
+
+def bench(
+    transport: str,
+    num_clients: int,
+    processes: int,
+    num_iter: int,
+    window: int,
+    mode: str,
+) -> None:
+    """
+    Print the cost of serving `num_clients` clients over `transport`.
+    """
+    register_pipe_path = Path(f"{os.getpid()}_shared_register_pipe")
+    per_process = [
+        num_clients // processes + (i < num_clients % processes)
+        for i in range(processes)
+    ]
+
+    with running_server(
+        register_pipe_path, mode=mode, transport=transport
+    ) as server_proc:
+        ready = Barrier(processes + 1)
+        go = Event()
+        results = Queue()
+        procs = [
+            Process(
+                target=run_clients,
+                args=(
+                    register_pipe_path,
+                    transport,
+                    count,
+                    num_iter,
+                    window,
+                    ready,
+                    go,
+                    results,
+                ),
+            )
+            for count in per_process
+        ]
+        for proc in procs:
+            proc.start()
+
+        ready.wait()
+        fds = count_entries(f"/proc/{server_proc.pid}/fd")
+        threads = count_entries(f"/proc/{server_proc.pid}/task")
+        pipes = sum(1 for path in Path().iterdir() if path.is_fifo())
+        go.set()
+
+        outcomes = [results.get() for _ in procs]
+        for proc in procs:
+            proc.join()
+
+    setup = max(setup for setup, _ in outcomes)
+    elapsed = max(elapsed for _, elapsed in outcomes)
+    print(
+        f"{transport} {num_clients:>5} clients: "
+        f"setup {setup:.2f} s, "
+        f"{num_clients * num_iter / elapsed:.0f} req/s, "
+        f"server fds={fds} threads={threads}, pipes={pipes}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--clients", type=int, nargs="+", default=[100, 1000, 5000]
+    )
+    parser.add_argument(
+        "--transports",
+        nargs="+",
+        choices=(FIFO_TRANSPORT, SHARED_TRANSPORT),
+        default=[FIFO_TRANSPORT, SHARED_TRANSPORT],
+    )
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--num-iter", type=int, default=10)
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=256,
+        help="requests in flight per client process at most",
+    )
+    parser.add_argument(
+        "--mode", choices=Server.MODES, default=Server.THREAD_MODE
+    )
+    args = parser.parse_args()
+
+    for num_clients in args.clients:
+        for transport in args.transports:
+            bench(
+                transport,
+                num_clients,
+                args.processes,
+                args.num_iter,
+                args.window,
+                args.mode,
+            )
+
+
+if __name__ == "__main__":
+    main()
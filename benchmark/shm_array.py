@@ -0,0 +1,66 @@
+"""
+Compare sending NumPy arrays inside frame payloads (request_many) with
+shared memory descriptors (request_array), with and without the staging
+copy into the segment pool. Needs NumPy.
+
+    python3 -m benchmark.shm_array --sizes 1000 100000 1000000 --num-iter 100
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmark.common import (
+    add_transport_argument,
+    connected_sender,
+    running_server,
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 100000, 1000000]
+    )
+    parser.add_argument("--num-iter", type=int, default=100)
+    add_transport_argument(parser)
+    args = parser.parse_args()
+
+    for transport in args.transports:
+        with running_server(transport=transport), connected_sender(
+            transport=transport
+        ) as sender:
+            for size in args.sizes:
+                data = np.arange(size, dtype=np.int64)
+
+                st = time.perf_counter()
+                for _ in range(args.num_iter):
+                    sender.request_many(data)
+                payload = (time.perf_counter() - st) / args.num_iter
+
+                st = time.perf_counter()
+                for _ in range(args.num_iter):
+                    sender.request_array(data).release()
+                staged = (time.perf_counter() - st) / args.num_iter
+
+                shm, pooled = sender.array_pool.ndarray(
+                    data.shape, data.dtype
+                )
+                pooled[...] = data
+                st = time.perf_counter()
+                for _ in range(args.num_iter):
+                    sender.request_array(pooled).release()
+                zero_copy = (time.perf_counter() - st) / args.num_iter
+                del pooled
+                sender.array_pool.release(shm)
+
+                print(
+                    f"{transport} {size:>8} values: "
+                    f"payload {payload * 1e6:10.1f} us, "
+                    f"shm staged {staged * 1e6:10.1f} us, "
+                    f"shm zero-copy {zero_copy * 1e6:10.1f} us"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Compare the transports (FIFO, shared memory ring, ZeroMQ) on the test.py
+request-latency harness.
+
+    python3 -m benchmark.shm_transport --num-clients 1 --wait-strategy spin
+"""
+import argparse
+
+from benchmark.common import add_transport_argument, format_summary
+from test import run
+from utils.pipe_reader import WaitStrategy
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-clients", type=int, default=1)
+    parser.add_argument("--num-iter", type=int, default=2000)
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0,
+        help="seconds between requests, 0 sends back to back",
+    )
+    parser.add_argument(
+        "--wait-strategy", choices=WaitStrategy.MODES, default="block"
+    )
+    add_transport_argument(parser)
+    args = parser.parse_args()
+
+    for transport in args.transports:
+        result = run(
+            num_clients=args.num_clients,
+            wait_strategy=WaitStrategy(args.wait_strategy),
+            verbose=False,
+            num_iter=args.num_iter,
+            interval=args.interval,
+            transport=transport,
+        )
+        print(format_summary(transport, result["latency"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Compare a batch request with a stream request over the same values: the
+time to the first result, the time to the whole result, and the peak
+memory of the client and the server.
+
+The handler pays a cost per chunk of values, as a computation producing
+its result piece by piece would. A batch response is only sent once every
+chunk is computed; a stream sends each chunk as soon as it is, and at most
+`window` of them are ahead of the client.
+
+    python3 -m benchmark.streaming --sizes 100000 1000000 10000000
+"""
+import argparse
+import os
+import resource
+import time
+from array import array
+from multiprocessing import Process, Queue
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from benchmark.common import running_server
+from client.registrar import Registrar
+from client.request_sender import RequestSender
+from server.request_handler import RequestHandler
+from utils.frame import BATCH_TYPECODE
+from utils.utils import new_client_id
+
+# Cost of processing one chunk of STREAM_CHUNK values, in seconds.
+CHUNK_COST = 100e-6
+
+
+def spend(seconds: float) -> None:
+    """
+    Keep the CPU busy for `seconds`.
+    """
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class ChunkCostHandler(RequestHandler):
+    """
+    A request handler paying CHUNK_COST for every STREAM_CHUNK values,
+    whether they are processed as a batch or as a stream.
+    """
+
+    @classmethod
+    def process_batch(cls, data):
+        spend(CHUNK_COST * -(-len(data) // cls.STREAM_CHUNK))
+        if np is not None:
+            return data * 2
+        return array(BATCH_TYPECODE, [v * 2 for v in data])
+
+    def process_stream(self, data):
+        for pos in range(0, len(data), self.STREAM_CHUNK):
+            yield RequestHandler.process_batch(
+                self, data[pos : pos + self.STREAM_CHUNK]
+            )
+            spend(CHUNK_COST)
+
+
+def rss_kb() -> int:
+    """
+    Return the resident set size of this process in KiB.
+    """
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGESIZE") // 1024
+
+
+def peak_rss_kb(pid: int) -> int:
+    """
+    Return the peak resident set size of process `pid` in KiB.
+    """
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1])
+    return 0
+
+
+def run_client(
+    register_pipe_path: Path,
+    size: int,
+    stream: bool,
+    window: int,
+    results: Queue,
+) -> None:
+    """
+    Send one request over `size` values and report how long the first and
+    the last result took, and how much the peak memory grew.
+    """
+    client_id = new_client_id()
+    registrar = Registrar(client_id, register_pipe_path)
+    sender = RequestSender(client_id)
+    registrar.register()
+    sender.init()
+
+    values = range(size)
+    before = rss_kb()
+    st = time.perf_counter()
+    first = None
+    received = 0
+    if stream:
+        for chunk in sender.stream(values, window):
+            if first is None:
+                first = time.perf_counter() - st
+            received += len(chunk)
+    else:
+        received = len(sender.request_many(values))
+        first = time.perf_counter() - st
+    elapsed = time.perf_counter() - st
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    registrar.unregister()
+    sender.close()
+    assert received == size, received
+    results.put((first, elapsed, peak - before))
+
+
+def bench(size: int, stream: bool, window: int) -> None:
+    """
+    Print the cost of one request over `size` values.
+    """
+    register_pipe_path = Path(f"{os.getpid()}_streaming_register_pipe")
+    with running_server(
+        register_pipe_path, handler_cls=ChunkCostHandler
+    ) as server_proc:
+        server_before = peak_rss_kb(server_proc.pid)
+        results = Queue()
+        client = Process(
+            target=run_client,
+            args=(register_pipe_path, size, stream, window, results),
+        )
+        client.start()
+        first, elapsed, client_peak = results.get()
+        client.join()
+        server_peak = peak_rss_kb(server_proc.pid) - server_before
+
+    name = f"stream w={window}" if stream else "batch"
+    print(
+        f"{size:>9} {name:<12} {first * 1e3:>10.2f} {elapsed * 1e3:>10.2f} "
+        f"{client_peak / 1024:>12.1f} {server_peak / 1024:>12.1f}"
+    )
+
+
+def main() -> None:
+    global CHUNK_COST
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100000, 1000000, 10000000]
+    )
+    parser.add_argument("--windows", type=int, nargs="+", default=[2, 8])
+    parser.add_argument(
+        "--chunk-cost",
+        type=float,
+        default=CHUNK_COST * 1e6,
+        help=f"microseconds per {RequestHandler.STREAM_CHUNK} values",
+    )
+    args = parser.parse_args()
+    # Read by the server process, which is forked after this.
+    CHUNK_COST = args.chunk_cost / 1e6
+
+    print(
+        "   values request      first ms   total ms  client MiB+  server MiB+"
+    )
+    for size in args.sizes:
+        bench(size, False, 0)
+        for window in args.windows:
+            bench(size, True, window)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Compare request latency and CPU usage of the PIPEReader wait strategies
+using the test.py harness.
+
+    python3 -m benchmark.wait_strategy --num-clients 5
+"""
+import argparse
+
+from benchmark.common import add_transport_argument, format_summary
+from test import run
+from utils.pipe_reader import WaitStrategy
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-clients", type=int, default=5)
+    parser.add_argument("--spin-count", type=int, default=1000)
+    add_transport_argument(parser)
+    args = parser.parse_args()
+
+    for transport in args.transports:
+        for mode in WaitStrategy.MODES:
+            result = run(
+                num_clients=args.num_clients,
+                wait_strategy=WaitStrategy(mode, args.spin_count),
+                verbose=False,
+                transport=transport,
+            )
+            name = f"{transport} {mode}"
+            print(format_summary(name, result["latency"]))
+            print(
+                f"{name}: cpu user {result['cpu_user']:.3f} s, "
+                f"sys {result['cpu_sys']:.3f} s"
+            )
+
+
+if __name__ == "__main__":
+    main()
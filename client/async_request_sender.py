@@ -0,0 +1,308 @@
+import asyncio
+import errno
+import itertools
+import os
+import select
+import time
+from pathlib import Path
+from typing import AsyncIterator, Callable, List, Optional
+
+from utils.frame import (
+    CREDIT,
+    OP_BROADCAST,
+    OP_CANCEL,
+    OP_CHUNK,
+    OP_CREDIT,
+    OP_END,
+    OP_ERROR,
+    OP_INIT,
+    OP_REQUEST,
+    OP_STREAM,
+    VALUE,
+    pack_frame,
+    pack_header,
+    pack_stream_request,
+    unpack_values,
+)
+from utils.broadcast import open_notice
+from utils.pipe_reader import PIPEReader
+from utils.utils import make_pipe
+
+
+class AsyncRequestSender:
+    """
+    A class to send requests to the server from an asyncio event loop.
+
+    The response pipe is watched with loop.add_reader(), so waiting for a
+    response never blocks the loop or polls. Many senders can share one loop.
+
+    stream() iterates over a streaming response asynchronously; the sender
+    serves one request or stream at a time. Broadcasts of the server go to
+    the callbacks registered with subscribe(), called from the loop.
+    """
+
+    # How long to wait between attempts to open the request pipe
+    # while the server has not opened its end yet.
+    CONNECT_RETRY_INTERVAL = 1e-3
+
+    def __init__(self, client_id: int) -> None:
+        """
+        Initialize the AsyncRequestSender object.
+
+        Args:
+            client_id (int): The id registered with the server.
+                Use utils.utils.new_client_id() to run several senders in one process.
+        """
+        self.pid = client_id
+
+        self.write_pipe_path = Path(f"{self.pid}_to_server_pipe")
+        self.read_pipe_path = Path(f"server_to_{self.pid}_pipe")
+
+        make_pipe(self.write_pipe_path)
+        make_pipe(self.read_pipe_path)
+
+        self.read_pipe = PIPEReader(self.read_pipe_path)
+        self.write_fd = None
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.lock = asyncio.Lock()
+        self.response: Optional[asyncio.Future] = None
+        # Id and frames of the stream being read, in the order they arrived.
+        self.stream_ids = itertools.count(1)
+        self.stream_id: Optional[int] = None
+        self.stream_frames: Optional[asyncio.Queue] = None
+
+        self.subscribers: List[Callable[[int, memoryview], None]] = []
+        self.broadcasts_missed = 0
+
+    async def connect(self) -> None:
+        """
+        Open the request pipe without blocking the event loop.
+        """
+        if self.write_fd is not None:
+            return
+
+        self.loop = asyncio.get_running_loop()
+        self.loop.add_reader(self.read_pipe.fileno(), self._on_readable)
+
+        while True:
+            try:
+                self.write_fd = os.open(
+                    self.write_pipe_path, os.O_WRONLY | os.O_NONBLOCK
+                )
+                return
+            except OSError as e:
+                # ENXIO: the server has not opened the read end yet.
+                if e.errno != errno.ENXIO:
+                    raise
+            await asyncio.sleep(self.CONNECT_RETRY_INTERVAL)
+
+    async def init(self) -> None:
+        """
+        Send the init request, which completes once the server has opened
+        both pipes.
+        """
+        await self._request(pack_frame(OP_INIT))
+
+    async def request(self, data: int) -> int:
+        """
+        Send a request to the server and wait for the response.
+
+        Returns:
+            The response received from the server.
+        """
+        value = await self._request(
+            pack_frame(
+                OP_REQUEST, VALUE.pack(data), timestamp=time.perf_counter_ns()
+            )
+        )
+        if value != data * 2:
+            raise Exception(
+                f"[pid : {self.pid} | client] "
+                f"Response data is not correct. "
+                f"Expected: {data * 2}, "
+                f"Received: {value}"
+            )
+        return value
+
+    async def stream(
+        self, values: List[int], window: int = 8
+    ) -> AsyncIterator[List[int]]:
+        """
+        Send a stream request and yield its response chunk by chunk, each a
+        list of values, as they arrive.
+
+        At most `window` chunks are sent ahead of the consumer. Leaving the
+        iteration early, or closing the iterator, stops the stream on the
+        server.
+        """
+        if window <= 0:
+            raise ValueError(f"window must be positive: {window}")
+        async with self.lock:
+            await self.connect()
+
+            self.stream_id = next(self.stream_ids)
+            self.stream_frames = asyncio.Queue()
+            finished = False
+            try:
+                await self._write_frame(
+                    OP_STREAM,
+                    pack_stream_request(values, window),
+                    time.perf_counter_ns(),
+                )
+                consumed = 0
+                while True:
+                    frame = await self.stream_frames.get()
+                    if frame.opcode == OP_END:
+                        finished = True
+                        return
+                    if frame.opcode == OP_ERROR:
+                        finished = True
+                        raise Exception(
+                            f"[pid : {self.pid} | client] "
+                            f"Server error: {bytes(frame.payload).decode()}"
+                        )
+                    if frame.opcode != OP_CHUNK:
+                        finished = True
+                        raise Exception(
+                            f"[pid : {self.pid} | client] "
+                            f"Unexpected opcode: {frame.opcode}"
+                        )
+
+                    yield unpack_values(frame.payload).tolist()
+                    consumed += 1
+                    if consumed >= max(window // 2, 1):
+                        await self._write_frame(
+                            OP_CREDIT, CREDIT.pack(consumed)
+                        )
+                        consumed = 0
+            finally:
+                if not finished and self.write_fd is not None:
+                    await self._write_frame(OP_CANCEL)
+                self.stream_id = None
+                self.stream_frames = None
+
+    async def _write_frame(
+        self, opcode: int, payload: bytes = b"", timestamp: int = 0
+    ) -> None:
+        """
+        Write a frame of the stream being read, of any length.
+
+        A frame longer than PIPE_BUF is written in pieces, which is safe as
+        the lock keeps other frames of this sender out of the pipe.
+        """
+        frame = (
+            pack_header(opcode, payload, self.stream_id, timestamp) + payload
+        )
+        view = memoryview(frame)
+        while view:
+            piece = view[: select.PIPE_BUF]
+            await self._write(piece)
+            view = view[len(piece) :]
+
+    def subscribe(self, callback: Callable[[int, memoryview], None]) -> None:
+        """
+        Call `callback(version, payload)` for every broadcast of the server
+        once connect() has been awaited. The payload is only valid during
+        the call.
+        """
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[int, memoryview], None]) -> None:
+        """
+        Stop calling `callback` for broadcasts.
+        """
+        self.subscribers.remove(callback)
+
+    def _deliver(self, notice: bytes) -> None:
+        """
+        Hand a broadcast to every subscriber.
+        """
+        if not self.subscribers:
+            return
+        try:
+            with open_notice(notice) as (version, payload):
+                for callback in list(self.subscribers):
+                    callback(version, payload)
+        except FileNotFoundError:
+            self.broadcasts_missed += 1
+
+    async def _request(self, frame: bytes) -> int:
+        """
+        Send one frame and wait for the value of its response.
+        """
+        async with self.lock:
+            await self.connect()
+
+            self.response = self.loop.create_future()
+            await self._write(frame)
+            response = await self.response
+            self.response = None
+
+        if response.opcode == OP_ERROR:
+            raise Exception(
+                f"[pid : {self.pid} | client] "
+                f"Server error: {response.payload.decode()}"
+            )
+        return VALUE.unpack(response.payload)[0]
+
+    async def _write(self, data: bytes) -> None:
+        """
+        Write a frame shorter than PIPE_BUF, waiting while the pipe is full.
+        """
+        while True:
+            try:
+                os.write(self.write_fd, data)
+                return
+            except BlockingIOError:
+                writable = self.loop.create_future()
+                self.loop.add_writer(
+                    self.write_fd, writable.set_result, None
+                )
+                try:
+                    await writable
+                finally:
+                    self.loop.remove_writer(self.write_fd)
+
+    def _on_readable(self) -> None:
+        """
+        Complete the pending request with the frame read from the pipe, or
+        queue the frames of the stream being read.
+        """
+        frames = []
+        for frame in self.read_pipe.read_frames(busy_wait=False):
+            # Requests have id 0; other frames belong to a stream, possibly
+            # one that was stopped with frames still on their way.
+            if frame.opcode == OP_BROADCAST:
+                self._deliver(frame.payload)
+            elif frame.request_id == 0:
+                frames.append(frame)
+            elif frame.request_id == self.stream_id:
+                self.stream_frames.put_nowait(frame)
+        if not frames or self.response is None or self.response.done():
+            return
+        if len(frames) != 1:
+            self.response.set_exception(
+                Exception(
+                    f"[pid : {self.pid} | client] Response is not correct."
+                )
+            )
+            return
+        self.response.set_result(frames[0])
+
+    def close(self) -> None:
+        """
+        Stop watching the response pipe, close the pipes and delete them.
+        """
+        if self.loop is not None:
+            self.loop.remove_reader(self.read_pipe.fileno())
+        if self.write_fd is not None:
+            os.close(self.write_fd)
+            self.write_fd = None
+        self.read_pipe.close()
+
+        for path in (self.write_pipe_path, self.read_pipe_path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
@@ -3,16 +3,20 @@ import random
 import time
 import datetime
 from pathlib import Path
+from typing import List, Optional
 
 from client.registrar import Registrar
 from client.request_sender import RequestSender
+from utils.pipe_reader import WaitStrategy
+from utils.placement import Placement
+from utils.utils import FIFO_TRANSPORT
 
 
-def generate_data() -> str:
+def generate_data() -> int:
     """
     Generate random integer data between 1 and 100.
     """
-    return f"{time.perf_counter_ns()} {random.randint(1, 100)}"
+    return random.randint(1, 100)
 
 
 class Client:
@@ -20,31 +24,98 @@ class Client:
     A class representing a client.
     """
 
-    def __init__(self, register_pipe_path: Path) -> None:
+    def __init__(
+        self,
+        register_pipe_path: Path,
+        wait_strategy: Optional[WaitStrategy] = None,
+        num_iter: int = 100,
+        verbose: bool = True,
+        interval: float = 1e-2,
+        transport: str = FIFO_TRANSPORT,
+        pooled: bool = False,
+        placement: Optional[Placement] = None,
+    ) -> None:
         """
         Initialize the Client object.
+
+        Args:
+            register_pipe_path (Path): The path to the register pipe.
+            wait_strategy (WaitStrategy, optional): How to wait for responses.
+            num_iter (int, optional): The number of requests to send. Defaults to 100.
+            verbose (bool, optional): If True, print every request. Defaults to True.
+            interval (float, optional): Seconds to sleep between requests. Defaults to 1e-2.
+            transport (str, optional): "fifo", "shm", "zmq", "seqpacket"
+                or "shared".
+                Defaults to "fifo".
+            pooled (bool, optional): If True, register on one of the
+                server's pooled channels instead of creating a channel.
+                Defaults to False.
+            placement (Placement, optional): The cores and scheduling of the
+                thread calling start(), applied when it starts. What it got
+                is kept in `placement_report`. Defaults to None.
         """
         self.register_pipe_path = register_pipe_path
+        self.num_iter = num_iter
+        self.verbose = verbose
+        self.interval = interval
+        self.wait_strategy = wait_strategy
+        self.transport = transport
+        self.pooled = pooled
+        self.placement = placement
+        self.placement_report = None
 
         self.pid = os.getpid()
 
-        self.registrar = Registrar(self.pid, self.register_pipe_path)
-        self.request_sender = RequestSender(self.pid)
+        self.registrar = Registrar(
+            self.pid, self.register_pipe_path, transport
+        )
+        # A pooled channel is only known once registered.
+        self.request_sender = None
+        if not pooled:
+            self.request_sender = RequestSender(
+                self.pid, wait_strategy, transport, self.register_pipe_path
+            )
+
+    def log(self, msg: str) -> None:
+        """
+        Print a message if the client is verbose.
+        """
+        if self.verbose:
+            print(msg)
 
-    def start(self) -> None:
+    def start(self) -> List[float]:
         """
         Start the client by registering, sending requests, and unregistering.
+
+        Returns:
+            The request durations in microseconds.
         """
+        if self.placement is not None:
+            self.placement_report = self.placement.apply()
+            self.log(
+                f"[{datetime.datetime.now()}] placement: "
+                f"{self.placement_report}"
+            )
 
         st = time.perf_counter_ns()
-        self.registrar.register()
+        if self.pooled:
+            self.request_sender = RequestSender(
+                self.pid,
+                self.wait_strategy,
+                self.transport,
+                channel_id=self.registrar.acquire(),
+            )
+        else:
+            self.registrar.register()
         dur = (time.perf_counter_ns() - st) / 1000
-        print(f"[{datetime.datetime.now()}] registration duration: {dur} us")
+        self.log(f"[{datetime.datetime.now()}] registration duration: {dur} us")
 
-        self.request_sender.request("-1 init")
+        if not self.pooled:
+            self.request_sender.init()
 
+        durations = []
         total_duration = 0
-        num_iter = 100
+        num_iter = self.num_iter
         for _ in range(num_iter):
             data = generate_data()
 
@@ -53,22 +124,54 @@ class Client:
             response = self.request_sender.request(data)
             dur = (time.perf_counter_ns() - st) / 1000
             total_duration += dur
-            print(
+            durations.append(dur)
+            self.log(
                 f"[{datetime.datetime.now()}] request duration: {dur} us, org: {data}, res: {response}"
             )
-            time.sleep(1e-2)
-        print(f"total duration: {total_duration} us")
-        print(f"mean duration: {total_duration / num_iter} us")
+            if self.interval:
+                time.sleep(self.interval)
+        self.log(f"total duration: {total_duration} us")
+        self.log(f"mean duration: {total_duration / num_iter} us")
 
         st = time.perf_counter_ns()
         self.registrar.unregister()
         dur = (time.perf_counter_ns() - st) / 1000
-        print(f"[{datetime.datetime.now()}] unregistration duration: {dur} us")
-
-
-def start_client(register_pipe_path: Path) -> None:
+        self.request_sender.close()
+        self.log(
+            f"[{datetime.datetime.now()}] unregistration duration: {dur} us"
+        )
+
+        return durations
+
+
+def start_client(
+    register_pipe_path: Path,
+    wait_strategy: Optional[WaitStrategy] = None,
+    result_queue=None,
+    verbose: bool = True,
+    num_iter: int = 100,
+    interval: float = 1e-2,
+    transport: str = FIFO_TRANSPORT,
+    pooled: bool = False,
+    placement: Optional[Placement] = None,
+) -> None:
     """
     Start the client.
+
+    If result_queue is given, the request durations are put on it.
+    With `placement`, the client runs on the cores and with the scheduling
+    it gives.
     """
-    client = Client(register_pipe_path)
-    client.start()
+    client = Client(
+        register_pipe_path,
+        wait_strategy,
+        num_iter=num_iter,
+        verbose=verbose,
+        interval=interval,
+        transport=transport,
+        pooled=pooled,
+        placement=placement,
+    )
+    durations = client.start()
+    if result_queue is not None:
+        result_queue.put(durations)
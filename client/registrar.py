@@ -1,6 +1,10 @@
+import json
 from pathlib import Path
+from typing import Dict
 
-from utils.pipe_writer import PIPEWriter
+from utils.pipe_reader import PIPEReader
+from utils.transport import get_transport
+from utils.utils import FIFO_TRANSPORT, make_pipe
 
 
 class Registrar:
@@ -8,24 +12,94 @@ class Registrar:
     A class to handle client registration and unregistration.
     """
 
-    def __init__(self, pid: int, register_pipe_path: Path):
+    def __init__(
+        self,
+        pid: int,
+        register_pipe_path: Path,
+        transport: str = FIFO_TRANSPORT,
+    ):
         """
         Initialize the Registrar object.
         """
 
         self.pid = pid
         self.register_pipe_path = register_pipe_path
+        self.transport = transport
 
-        self.register_pipe = PIPEWriter(self.register_pipe_path)
+        self.register_pipe = get_transport(transport).connect(
+            self.register_pipe_path
+        )
 
     def register(self) -> None:
         """
         Register the client with the server.
         """
-        self.register_pipe.write(f"register {self.pid}")
+        if self.transport == FIFO_TRANSPORT:
+            self.register_pipe.write(f"register {self.pid}")
+        else:
+            self.register_pipe.write(f"register {self.pid} {self.transport}")
 
     def unregister(self) -> None:
         """
         Unregister the client from the server.
         """
         self.register_pipe.write(f"unregister {self.pid}")
+
+    def acquire(self, timeout: float = 1.0) -> str:
+        """
+        Register the client on one of the server's pooled channels.
+
+        The server answers on the pipe `register_to_<pid>_pipe` once the
+        channel is being served, so the first request needs no init.
+
+        Returns:
+            The id of the channel, for RequestSender's `channel_id`.
+
+        Raises:
+            TimeoutError: If the server does not answer within `timeout`.
+            RuntimeError: If the server has no channel pool.
+        """
+        reply = self.ask("acquire", "register", timeout)
+        if not reply.startswith("ack "):
+            raise RuntimeError(
+                f"[pid : {self.pid} | client] The server has no channel pool."
+            )
+        return reply[len("ack ") :]
+
+    def stats(self, timeout: float = 1.0) -> Dict:
+        """
+        Ask the server for a snapshot of its stats.
+
+        The server answers with one JSON line on the pipe
+        `stats_to_<pid>_pipe`, which only lives during the call.
+
+        Raises:
+            TimeoutError: If the server does not answer within `timeout`.
+        """
+        return json.loads(self.ask("stats", "stats", timeout))
+
+    def ask(self, op: str, reply_name: str, timeout: float) -> str:
+        """
+        Send `<op> <pid>` and return the line the server answers with on
+        the pipe `<reply_name>_to_<pid>_pipe`, which only lives during the
+        call.
+
+        Raises:
+            TimeoutError: If the server does not answer within `timeout`.
+        """
+        reply_pipe_path = Path(f"{reply_name}_to_{self.pid}_pipe")
+        make_pipe(reply_pipe_path)
+        reply_pipe = PIPEReader(reply_pipe_path)
+        try:
+            self.register_pipe.write(f"{op} {self.pid}")
+            lines = reply_pipe.read(timeout=timeout)
+        finally:
+            reply_pipe.close()
+            reply_pipe_path.unlink()
+
+        if not lines:
+            raise TimeoutError(
+                f"[pid : {self.pid} | client] No answer to {op} "
+                f"within {timeout} s."
+            )
+        return lines[0]
@@ -1,34 +1,371 @@
+import collections
+import functools
+import itertools
+import threading
+import time
+from concurrent.futures import Future
 from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
-from utils.pipe_reader import PIPEReader
-from utils.pipe_writer import PIPEWriter
-from utils.utils import make_pipe
+from utils.frame import (
+    CREDIT,
+    OP_ARRAY,
+    OP_BATCH,
+    OP_BROADCAST,
+    OP_CANCEL,
+    OP_CHUNK,
+    OP_CREDIT,
+    OP_END,
+    OP_ERROR,
+    OP_INIT,
+    OP_REQUEST,
+    OP_RESPONSE,
+    OP_STREAM,
+    VALUE,
+    Frame,
+    pack_stream_request,
+    pack_values,
+    unpack_values,
+)
+from utils.broadcast import open_notice
+from utils.pipe_reader import WaitStrategy
+from utils.shm_array import (
+    ArrayDescriptor,
+    ArrayLease,
+    SegmentPool,
+    describe,
+    pack_descriptor,
+    require_numpy,
+    unpack_descriptor,
+    view,
+)
+from utils.transport import channel_paths, get_transport
+from utils.utils import FIFO_TRANSPORT
+
+
+class ResponseFuture(Future):
+    """
+    A future for a response that reads the response pipe while waiting.
+    """
+
+    def __init__(self, sender: "RequestSender") -> None:
+        """
+        Initialize the ResponseFuture object.
+        """
+        super().__init__()
+        self.sender = sender
+
+    def result(self, timeout: Optional[float] = None):
+        """
+        Wait for the response, reading the pipe if no other thread is.
+        """
+        self.sender.wait(self, timeout)
+        return super().result(timeout=0)
+
+
+class ResponseStream:
+    """
+    An iterator over the chunks of a streaming response, each a list of
+    values, as they arrive.
+
+    At most `window` chunks are sent ahead of the consumer: whenever half of
+    them have been consumed, the server is granted as many more. Leaving the
+    iteration early should be followed by close(), which stops the stream
+    on the server.
+    """
+
+    def __init__(
+        self, sender: "RequestSender", request_id: int, window: int
+    ) -> None:
+        """
+        Initialize the ResponseStream object.
+        """
+        self.sender = sender
+        self.request_id = request_id
+        self.window = window
+
+        self.chunks: collections.deque = collections.deque()
+        self.finished = False
+        self.error: Optional[Exception] = None
+        # Chunks consumed since the last credit.
+        self.consumed = 0
+
+    def __iter__(self) -> "ResponseStream":
+        return self
+
+    def __next__(self) -> List[int]:
+        """
+        Return the next chunk, reading the pipe until it arrives.
+        """
+        while not self.chunks:
+            if self.finished:
+                if self.error is not None:
+                    raise self.error
+                raise StopIteration
+            self.sender.wait(self)
+        chunk = self.chunks.popleft()
+
+        self.consumed += 1
+        if self.consumed >= max(self.window // 2, 1) and not self.finished:
+            self.sender.send_control(
+                OP_CREDIT, CREDIT.pack(self.consumed), self.request_id
+            )
+            self.consumed = 0
+        return chunk.tolist()
+
+    def done(self) -> bool:
+        """
+        Whether a chunk or the end of the stream is there to be consumed.
+        """
+        return bool(self.chunks) or self.finished
+
+    def feed(self, response: Frame) -> None:
+        """
+        Take a frame of the stream read from the response pipe.
+        """
+        if response.opcode == OP_CHUNK:
+            # Copied out, as the payload may view the transport's buffer.
+            self.chunks.append(unpack_values(response.payload))
+            return
+        try:
+            if response.opcode != OP_END:
+                self.sender.check_response(response)
+                raise Exception(
+                    f"[pid : {self.sender.pid} | client] "
+                    f"Unexpected opcode: {response.opcode}"
+                )
+        except Exception as e:
+            self.error = e
+        self.finished = True
+
+    def fail(self, error: Exception) -> None:
+        """
+        End the stream with `error`.
+        """
+        self.error = error
+        self.finished = True
+
+    def close(self) -> None:
+        """
+        Stop the stream on the server if it has not ended.
+        """
+        if self.sender.drop_stream(self.request_id):
+            self.fail(
+                Exception(
+                    f"[pid : {self.sender.pid} | client] Stream is closed."
+                )
+            )
+            self.sender.send_control(OP_CANCEL, b"", self.request_id)
+        self.chunks.clear()
+
+    def __enter__(self) -> "ResponseStream":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class Subscription:
+    """
+    A callback receiving the broadcasts of the server, called with the
+    version and a memoryview of the payload that is only valid during the
+    call.
+
+    Broadcasts are received by whichever thread reads the response pipe.
+    With `listen`, a thread of the subscription reads it whenever no
+    request is waiting, so broadcasts also arrive while the sender is idle;
+    responses then reach their callers through that thread.
+    """
+
+    def __init__(
+        self,
+        sender: "RequestSender",
+        callback: Callable[[int, memoryview], None],
+        listen: bool = True,
+    ) -> None:
+        """
+        Initialize the Subscription object.
+        """
+        self.sender = sender
+        self.callback = callback
+        self.closed = False
+        # The last exception raised by the callback.
+        self.error: Optional[Exception] = None
+
+        self.listen = listen
+        self.listen_th = None
+
+    def start(self) -> None:
+        """
+        Start the listener thread, if the subscription has one.
+        """
+        if self.listen:
+            self.listen_th = threading.Thread(
+                target=self.listen_loop, daemon=True
+            )
+            self.listen_th.start()
+
+    def done(self) -> bool:
+        """
+        Whether the subscription is closed, which ends the listener.
+        """
+        return self.closed
+
+    def listen_loop(self) -> None:
+        """
+        Read the response pipe until the subscription is closed.
+        """
+        self.sender.wait(self)
+
+    def deliver(self, version: int, payload: memoryview) -> None:
+        """
+        Call the callback, keeping what it raises.
+        """
+        try:
+            self.callback(version, payload)
+        except Exception as e:
+            self.error = e
+
+    def close(self) -> None:
+        """
+        Stop receiving broadcasts.
+        """
+        self.closed = True
+        self.sender.unsubscribe(self)
+        if (
+            self.listen_th is not None
+            and self.listen_th is not threading.current_thread()
+        ):
+            self.listen_th.join()
 
 
 class RequestSender:
     """
     A class to handle sending requests to the server and reading responses.
+
+    Every request carries a request id, so many requests can be in flight at
+    once and responses are matched to them in any order. The sender is
+    thread-safe. There is no receiver thread: one of the threads waiting on a
+    result reads the pipe and completes the futures of all responses it sees,
+    so a lone caller gets its response without a thread handoff.
+
+    stream() answers a request with a ResponseStream instead, which is fed
+    chunk by chunk in the same way. Broadcasts of the server go to the
+    callbacks registered with subscribe().
     """
 
-    def __init__(self, pid: int) -> None:
+    # Upper bound for one blocking read of the response pipe.
+    READ_INTERVAL = 0.1
+
+    def __init__(
+        self,
+        pid: int,
+        wait_strategy: Optional[WaitStrategy] = None,
+        transport: str = FIFO_TRANSPORT,
+        register_pipe_path: Optional[Path] = None,
+        channel_id: Optional[str] = None,
+    ) -> None:
         """
         Initialize the RequestSender object.
+
+        Args:
+            pid (int): The client id registered with the server.
+            wait_strategy (WaitStrategy, optional): How to wait for responses.
+            transport (str, optional): "fifo", "shm" or "zmq". With "shm" the
+                sender creates a shared memory ring per direction and the
+                pipes are only used as doorbells. Defaults to "fifo".
+            register_pipe_path (Path, optional): The register path of the
+                server. Only needed by the "seqpacket", "zmq" and "shared"
+                transports, whose channels connect to the socket listening
+                there or to the server's inbound pipe next to it.
+            channel_id (str, optional): A pooled channel handed out by
+                Registrar.acquire(). The sender opens it instead of creating
+                a channel, and leaves it to the server on close.
         """
         self.pid = pid
+        self.channel_id = channel_id
+
+        if channel_id is not None:
+            self.read_pipe, self.write_pipe = get_transport(
+                transport
+            ).attach_channel(channel_id, wait_strategy)
+        else:
+            self.write_pipe_path, self.read_pipe_path = channel_paths(
+                self.pid
+            )
+            self.read_pipe, self.write_pipe = get_transport(
+                transport
+            ).create_channel(self.pid, wait_strategy, register_pipe_path)
+
+        self.lock = threading.Lock()
+        # Writes are serialized apart from `lock`, so a write waiting for
+        # room in the request pipe does not keep responses from completing.
+        self.write_lock = threading.Lock()
+        self.request_ids = itertools.count(1)
+        # Request id -> (future, function turning the response into a result)
+        self.pending: Dict[int, Tuple[Future, Callable[[Frame], Any]]] = dict()
+        # Request id -> streaming response not ended yet.
+        self.streams: Dict[int, ResponseStream] = dict()
 
-        self.write_pipe_path = Path(f"{self.pid}_to_server_pipe")
-        self.read_pipe_path = Path(f"server_to_{self.pid}_pipe")
+        self.subscriptions: List[Subscription] = []
+        # Broadcasts whose payload was dropped before they were read.
+        self.broadcasts_missed = 0
 
-        make_pipe(self.write_pipe_path)
-        make_pipe(self.read_pipe_path)
+        # Set while a thread is reading the response pipe.
+        self.reading = False
+        self.read_cond = threading.Condition()
 
-        self.write_pipe = PIPEWriter(self.write_pipe_path)
-        self.read_pipe = PIPEReader(self.read_pipe_path)
+        self._closed = False
+        self._array_pool = None
+
+    @property
+    def array_pool(self) -> SegmentPool:
+        """
+        The pool of shared memory segments used for array requests.
+        """
+        if self._array_pool is None:
+            self._array_pool = SegmentPool(f"{self.pid}_array")
+        return self._array_pool
 
     def __del__(self) -> None:
         """
         Cleanup the RequestSender object by unlinking the pipe files and lock files.
         """
+        self.close()
+
+    def close(self) -> None:
+        """
+        Fail pending requests and delete the pipes.
+        """
+        if self._closed:
+            return
+        self._closed = True
+
+        for subscription in list(self.subscriptions):
+            subscription.close()
+
+        with self.lock:
+            pending = list(self.pending.values())
+            self.pending.clear()
+            streams = list(self.streams.values())
+            self.streams.clear()
+        for future, _ in pending:
+            future.set_exception(
+                Exception(f"[pid : {self.pid} | client] Sender is closed.")
+            )
+        for stream in streams:
+            stream.fail(
+                Exception(f"[pid : {self.pid} | client] Sender is closed.")
+            )
+
+        self.write_pipe.close()
+        self.read_pipe.close()
+        if self._array_pool is not None:
+            self._array_pool.close()
+
+        if self.channel_id is not None:
+            return
+
         if self.write_pipe_path.exists():
             try:
                 self.write_pipe_path.unlink()
@@ -41,20 +378,282 @@ class RequestSender:
             except FileNotFoundError:
                 pass
 
-    def request(self, data: str) -> int:
+    def init(self) -> None:
+        """
+        Send the init request, which completes once the server has opened
+        both pipes.
+        """
+        self._submit(OP_INIT, b"", self.read_response).result()
+
+    def request(self, data: int) -> int:
         """
         Send a request to the server and read the response.
 
         Returns:
             The response received from the server.
         """
-        self.write_pipe.write(data)
-        response = self.read_response(data)
-        return response
+        return self.submit(data).result()
+
+    def submit(self, data: int) -> Future:
+        """
+        Send a request to the server without waiting for the response.
+
+        Returns:
+            A future completed with the response received from the server.
+        """
+        return self._submit(
+            OP_REQUEST,
+            VALUE.pack(data),
+            functools.partial(self.read_response, org_data=data),
+        )
 
-    def read_response(self, org_data) -> int:
+    def request_many(self, values: Sequence[int]) -> List[int]:
         """
-        Read the response from the server and validate it.
+        Send many integers in one batch request and read all responses.
+
+        Returns:
+            The responses received from the server, in the order of `values`.
+        """
+        return self.submit_many(values).result()
+
+    def submit_many(self, values: Sequence[int]) -> Future:
+        """
+        Send a batch request without waiting for the response.
+
+        The whole batch travels as one frame and is processed by the server
+        in one call, so the pipe syscalls and parsing are paid once.
+
+        Returns:
+            A future completed with the list of responses.
+        """
+        return self._submit(
+            OP_BATCH,
+            pack_values(values),
+            functools.partial(self.read_batch_response, count=len(values)),
+        )
+
+    def stream(self, values: Sequence[int], window: int = 8) -> ResponseStream:
+        """
+        Send a stream request and iterate over its response chunk by chunk.
+
+        The server processes the values a chunk at a time and sends at most
+        `window` chunks ahead of the consumer, so neither side holds the
+        whole result, and the first chunk can be used before the last one
+        is computed.
+
+        Returns:
+            A ResponseStream yielding the responses as lists of values.
+        """
+        if window <= 0:
+            raise ValueError(f"window must be positive: {window}")
+        with self.lock:
+            if self._closed:
+                raise Exception(
+                    f"[pid : {self.pid} | client] Sender is closed."
+                )
+            request_id = next(self.request_ids)
+            stream = ResponseStream(self, request_id, window)
+            self.streams[request_id] = stream
+        with self.write_lock:
+            self.write_pipe.write_frame(
+                OP_STREAM,
+                pack_stream_request(values, window),
+                request_id,
+                time.perf_counter_ns(),
+            )
+        return stream
+
+    def subscribe(
+        self, callback: Callable[[int, memoryview], None], listen: bool = True
+    ) -> Subscription:
+        """
+        Call `callback(version, payload)` for every broadcast of the server.
+
+        Returns:
+            The Subscription, to close() when no longer needed.
+        """
+        subscription = Subscription(self, callback, listen)
+        with self.lock:
+            self.subscriptions.append(subscription)
+        subscription.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """
+        Stop calling the callback of `subscription`.
+        """
+        with self.lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+
+    def deliver(self, notice: bytes) -> None:
+        """
+        Hand a broadcast to every subscription.
+        """
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        if not subscriptions:
+            return
+        try:
+            with open_notice(notice) as (version, payload):
+                for subscription in subscriptions:
+                    subscription.deliver(version, payload)
+        except FileNotFoundError:
+            self.broadcasts_missed += 1
+
+    def send_control(
+        self, opcode: int, payload: bytes, request_id: int
+    ) -> None:
+        """
+        Send a frame that is not answered, such as a stream credit.
+        """
+        with self.write_lock:
+            self.write_pipe.write_frame(opcode, payload, request_id)
+
+    def drop_stream(self, request_id: int) -> bool:
+        """
+        Stop routing the frames of a stream to it.
+
+        Returns:
+            Whether the stream had not ended yet.
+        """
+        with self.lock:
+            return self.streams.pop(request_id, None) is not None
+
+    def request_array(self, array, out_nbytes: Optional[int] = None):
+        """
+        Send a NumPy array through shared memory and wait for the result.
+
+        Returns:
+            An ArrayLease whose `array` views the result in shared memory.
+        """
+        return self.submit_array(array, out_nbytes).result()
+
+    def submit_array(self, array, out_nbytes: Optional[int] = None) -> Future:
+        """
+        Send a NumPy array through shared memory without waiting.
+
+        Only a descriptor (segment name, dtype, shape, strides) goes through
+        the pipe. An array allocated with `self.array_pool.ndarray()` is sent
+        without any copy; any other array is copied into a pooled segment.
+        The server writes the result into another pooled segment of
+        `out_nbytes` bytes, which defaults to the size of the input.
+
+        Returns:
+            A future completed with an ArrayLease of the result.
+        """
+        require_numpy()
+        if array.dtype.hasobject:
+            raise ValueError("Arrays of Python objects cannot be shared.")
+
+        located = self.array_pool.locate(array)
+        in_shm = None
+        if located is None:
+            in_shm, staged = self.array_pool.ndarray(array.shape, array.dtype)
+            staged[...] = array
+            array = staged
+            located = (in_shm.name, 0)
+        name, offset = located
+
+        out_shm = self.array_pool.acquire(
+            array.nbytes if out_nbytes is None else out_nbytes
+        )
+        out = ArrayDescriptor(out_shm.name, "|u1", (out_shm.size,), (1,), 0)
+        payload = pack_descriptor(describe(array, name, offset))
+        payload += pack_descriptor(out)
+
+        return self._submit(
+            OP_ARRAY,
+            payload,
+            functools.partial(
+                self.read_array_response, out_shm=out_shm, in_shm=in_shm
+            ),
+        )
+
+    def _submit(
+        self, opcode: int, payload: bytes, parse: Callable[[Frame], Any]
+    ) -> Future:
+        """
+        Register a future for a new request id and send the request.
+        """
+        future = ResponseFuture(self)
+        with self.lock:
+            if self._closed:
+                raise Exception(
+                    f"[pid : {self.pid} | client] Sender is closed."
+                )
+            request_id = next(self.request_ids)
+            self.pending[request_id] = (future, parse)
+        with self.write_lock:
+            self.write_pipe.write_frame(
+                opcode, payload, request_id, time.perf_counter_ns()
+            )
+
+        return future
+
+    def wait(self, future: Future, timeout: Optional[float] = None) -> None:
+        """
+        Wait until `future` is done or `timeout` expires.
+
+        If no other thread is reading the response pipe, this thread reads it
+        and completes every response it sees. Otherwise it sleeps until the
+        reading thread has completed a batch of responses.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while not future.done():
+            if deadline is None:
+                remaining = self.READ_INTERVAL
+            else:
+                remaining = min(deadline - time.monotonic(), self.READ_INTERVAL)
+                if remaining <= 0:
+                    return
+
+            with self.read_cond:
+                if self.reading:
+                    self.read_cond.wait(remaining)
+                    continue
+                self.reading = True
+
+            try:
+                responses = self.read_pipe.read_frames(timeout=remaining)
+                for response in responses:
+                    self.complete(response)
+            finally:
+                with self.read_cond:
+                    self.reading = False
+                    self.read_cond.notify_all()
+
+    def complete(self, response: Frame) -> None:
+        """
+        Validate a response and complete the future of its request, or hand
+        it to its stream. Broadcasts go to the subscriptions.
+        """
+        if response.opcode == OP_BROADCAST:
+            self.deliver(response.payload)
+            return
+        with self.lock:
+            stream = self.streams.get(response.request_id)
+            if stream is not None and response.opcode != OP_CHUNK:
+                del self.streams[response.request_id]
+            entry = self.pending.pop(response.request_id, None)
+        if stream is not None:
+            stream.feed(response)
+            return
+        if entry is None:
+            return
+        future, parse = entry
+
+        try:
+            future.set_result(parse(response))
+        except Exception as e:
+            future.set_exception(e)
+
+    def read_response(
+        self, response: Frame, org_data: Optional[int] = None
+    ) -> int:
+        """
+        Read the value of a response from the server and validate it.
 
         Returns:
             The validated response received from the server.
@@ -62,26 +661,75 @@ class RequestSender:
         Raises:
             Exception: If the response data is not correct.
         """
-        response = self.read_pipe.read()
-        if len(response) != 1:
+        self.check_response(response)
+
+        value = VALUE.unpack(response.payload)[0]
+        if org_data is not None and value != org_data * 2:
             raise Exception(
-                "[pid : {self.pid} | client] Response is not correct."
+                f"[pid : {self.pid} | client] "
+                f"Response data is not correct. "
+                f"Expected: {org_data * 2}, "
+                f"Received: {value}"
+            )
+
+        return value
+
+    def read_batch_response(self, response: Frame, count: int) -> List[int]:
+        """
+        Read the values of a batch response from the server.
+
+        Returns:
+            The responses received from the server.
+
+        Raises:
+            Exception: If the response does not hold `count` values.
+        """
+        self.check_response(response)
+
+        values = unpack_values(response.payload)
+        if len(values) != count:
+            raise Exception(
+                f"[pid : {self.pid} | client] "
+                f"Batch response is not correct. "
+                f"Expected {count} values, "
+                f"Received: {len(values)}"
+            )
+
+        return values.tolist()
+
+    def read_array_response(
+        self, response: Frame, out_shm, in_shm=None
+    ) -> ArrayLease:
+        """
+        Map the result array of an array response without copying it.
+
+        Returns:
+            An ArrayLease of the result.
+        """
+        if in_shm is not None:
+            self.array_pool.release(in_shm)
+        try:
+            self.check_response(response, OP_ARRAY)
+        except Exception:
+            self.array_pool.release(out_shm)
+            raise
+
+        descriptor, _ = unpack_descriptor(response.payload)
+        return ArrayLease(self.array_pool, out_shm, view(out_shm, descriptor))
+
+    def check_response(
+        self, response: Frame, opcode: int = OP_RESPONSE
+    ) -> None:
+        """
+        Raise if the response is an error or its opcode is not `opcode`.
+        """
+        if response.opcode == OP_ERROR:
+            raise Exception(
+                f"[pid : {self.pid} | client] "
+                f"Server error: {bytes(response.payload).decode()}"
+            )
+        if response.opcode != opcode:
+            raise Exception(
+                f"[pid : {self.pid} | client] "
+                f"Unexpected opcode: {response.opcode}"
             )
-        response = response[0]
-        org_data_split = org_data.split(" ")
-        if org_data_split[1] == "init":
-            return
-        else:
-            org_data = int(org_data_split[1])
-        while True:
-            if response:
-                if int(response) != org_data * 2:
-                    raise Exception(
-                        f"[pid : {self.pid} | client] "
-                        f"Response data is not correct. "
-                        f"Expected: {org_data * 2}, "
-                        f"Received: {response}"
-                    )
-                break
-
-        return int(response)
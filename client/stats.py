@@ -0,0 +1,27 @@
+"""
+Print a snapshot of a running server's stats as JSON.
+
+    python3 -m client.stats --register-pipe register_pipe
+"""
+import argparse
+import json
+import os
+from pathlib import Path
+
+from client.registrar import Registrar
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--register-pipe", type=Path, default=Path("register_pipe")
+    )
+    parser.add_argument("--timeout", type=float, default=1.0)
+    args = parser.parse_args()
+
+    registrar = Registrar(os.getpid(), args.register_pipe)
+    print(json.dumps(registrar.stats(args.timeout), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+from server.registration_handler import RegistrationHandler
+
+
+class AsyncServer:
+    """
+    A class representing the server running on an asyncio event loop.
+
+    The register pipe and every client pipe are watched with loop.add_reader(),
+    so the server shares the loop with the rest of the application.
+    """
+
+    def __init__(self, register_pipe_path: Path) -> None:
+        """
+        Initialize the AsyncServer object.
+        """
+        self.register_pipe_path = register_pipe_path
+
+        self.registration_handler: Optional[RegistrationHandler] = None
+        self._stop_event: Optional[asyncio.Event] = None
+
+    async def start(self) -> None:
+        """
+        Start serving clients on the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        self.registration_handler = RegistrationHandler(
+            self.register_pipe_path, reactor=loop
+        )
+        self.registration_handler.start()
+
+    def stop(self) -> None:
+        """
+        Stop serving clients.
+        """
+        if self.registration_handler is not None:
+            self.registration_handler.stop()
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+    async def serve_forever(self) -> None:
+        """
+        Start the server and wait until stop() is called.
+        """
+        await self.start()
+        await self._stop_event.wait()
+
+
+def start_async_server(register_pipe_path, timeout=None) -> None:
+    """
+    Start the server on a new event loop.
+    """
+
+    async def main() -> None:
+        server = AsyncServer(register_pipe_path)
+        if timeout:
+            asyncio.get_running_loop().call_later(timeout, server.stop)
+        await server.serve_forever()
+
+    asyncio.run(main())
@@ -0,0 +1,148 @@
+import collections
+import itertools
+import os
+import threading
+from typing import List, Optional
+
+from utils.frame import FrameDecoder
+from utils.pipe_reader import PIPEReader, WaitStrategy
+from utils.pipe_writer import PIPEWriter
+from utils.transport import channel_paths
+from utils.utils import make_pipe
+
+
+class PooledChannel:
+    """
+    A FIFO channel created and opened by the server ahead of time.
+
+    `channel_id` takes the place of the client id in the pipe names, so the
+    client opens it with Transport.attach_channel().
+    """
+
+    def __init__(
+        self,
+        pool: "ChannelPool",
+        channel_id: str,
+        wait_strategy: Optional[WaitStrategy] = None,
+    ) -> None:
+        """
+        Initialize the PooledChannel object.
+        """
+        self.pool = pool
+        self.channel_id = channel_id
+        self.read_pipe_path, self.write_pipe_path = channel_paths(channel_id)
+
+        make_pipe(self.read_pipe_path)
+        make_pipe(self.write_pipe_path)
+        self.reader = PIPEReader(self.read_pipe_path, wait_strategy)
+        self.writer = PIPEWriter(self.write_pipe_path, persistent=True)
+        self.writer.preopen()
+
+    def release(self) -> None:
+        """
+        Give the channel back to its pool.
+        """
+        self.pool.release(self)
+
+    def reset(self) -> None:
+        """
+        Drop whatever the previous client left in the channel.
+        """
+        self.reader.read_frames(busy_wait=False)
+        self.reader.partial = b""
+        self.reader.decoder = FrameDecoder()
+        self.writer.drain()
+
+    def close(self) -> None:
+        """
+        Close the pipes and delete them.
+        """
+        self.reader.close()
+        self.writer.close()
+        for path in (self.read_pipe_path, self.write_pipe_path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class ChannelPool:
+    """
+    A pool of FIFO channels kept open by the server.
+
+    A client registering with `acquire <pid>` is handed a free channel whose
+    server ends are already open, and gets its id in the ack; so neither
+    side waits on the other to open a pipe, and the first request needs no
+    init round trip. Unregistering returns the channel to the pool. When no
+    channel is free a new one is created.
+    """
+
+    def __init__(
+        self, size: int, wait_strategy: Optional[WaitStrategy] = None
+    ) -> None:
+        """
+        Initialize the ChannelPool object and create `size` channels.
+        """
+        self.wait_strategy = wait_strategy
+        self.lock = threading.Lock()
+        self.slots = itertools.count()
+        self.channels: List[PooledChannel] = []
+        self.free = collections.deque()
+        self.closed = False
+
+        # Channels created because the pool was empty.
+        self.grown = 0
+
+        for _ in range(size):
+            self.free.append(self._create())
+
+    def _create(self) -> PooledChannel:
+        channel = PooledChannel(
+            self,
+            f"pool_{os.getpid()}_{next(self.slots)}",
+            self.wait_strategy,
+        )
+        self.channels.append(channel)
+        return channel
+
+    def acquire(self) -> PooledChannel:
+        """
+        Take a free channel, creating one if none is left.
+        """
+        with self.lock:
+            if self.free:
+                return self.free.popleft()
+            self.grown += 1
+            return self._create()
+
+    def release(self, channel: PooledChannel) -> None:
+        """
+        Put a channel back once its request handler is done with it.
+        """
+        with self.lock:
+            if self.closed:
+                return
+            channel.reset()
+            self.free.append(channel)
+
+    def stats(self) -> dict:
+        """
+        Return the size, free count and growth of the pool.
+        """
+        with self.lock:
+            return {
+                "size": len(self.channels),
+                "free": len(self.free),
+                "grown": self.grown,
+            }
+
+    def close(self) -> None:
+        """
+        Close and delete every channel.
+        """
+        with self.lock:
+            self.closed = True
+            for channel in self.channels:
+                channel.close()
+            self.channels.clear()
+            self.free.clear()
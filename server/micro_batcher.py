@@ -0,0 +1,282 @@
+import functools
+import threading
+import time
+from array import array
+from concurrent.futures import Executor, Future
+from typing import Dict, List, NamedTuple, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from utils.frame import BATCH_TYPECODE
+from utils.histogram import Histogram
+from utils.placement import Placement
+
+
+class Pending(NamedTuple):
+    """
+    A single request waiting for its batch.
+    """
+
+    handler: object
+    value: int
+    request_id: int
+    key: object
+    received: int
+
+
+class MicroBatcher:
+    """
+    A class collecting the single requests of every client of a server and
+    processing them together.
+
+    Requests are held until `max_batch` of them are waiting or the oldest
+    has waited `window` seconds, then their values go through one
+    process_batch() call, on the handler of the first request, which is a
+    single NumPy operation for handlers that support it, and each response
+    is written to the client that sent the request. With an executor, the
+    batch is processed on it instead of the dispatcher thread.
+
+    Handlers of different classes are batched separately. Batch and array
+    requests are not batched; they already carry many values.
+    """
+
+    # How often the dispatcher wakes up to check whether it should stop.
+    STOP_CHECK_INTERVAL = 0.1
+
+    def __init__(
+        self,
+        window: float = 0.0005,
+        max_batch: int = 256,
+        executor: Optional[Executor] = None,
+        placement: Optional[Placement] = None,
+    ) -> None:
+        """
+        Initialize the MicroBatcher object.
+
+        Args:
+            window (float): Seconds a request waits at most for others to
+                join its batch. Defaults to 0.5 ms.
+            max_batch (int): Requests that make a batch full, which is
+                processed without waiting for the window. Defaults to 256.
+            executor (Executor, optional): If given, batches are processed
+                on it. Defaults to None.
+            placement (Placement, optional): The cores and scheduling of the
+                dispatcher thread. Defaults to None.
+        """
+        if window < 0:
+            raise ValueError(f"window must not be negative: {window}")
+        if max_batch <= 0:
+            raise ValueError(f"max_batch must be positive: {max_batch}")
+
+        self.window = window
+        self.max_batch = max_batch
+        self.executor = executor
+        self.placement = placement
+        self.placement_report = None
+
+        self.cond = threading.Condition()
+        # Handler class -> requests waiting, oldest first.
+        self.pending: Dict[type, List[Pending]] = dict()
+        self.num_pending = 0
+
+        self._stop = False
+        self.dispatch_th = None
+
+        self.batches = 0
+        self.batched = 0
+        self.full = 0
+        self.sizes = Histogram()
+        # Time from a request being received to its batch being processed.
+        self.wait = Histogram()
+        self.process = Histogram()
+
+    def start(self) -> None:
+        """
+        Start the dispatcher thread.
+        """
+        self.dispatch_th = threading.Thread(target=self.dispatch_loop)
+        self.dispatch_th.start()
+
+    def stop(self) -> None:
+        """
+        Process what is waiting and stop the dispatcher thread.
+        """
+        with self.cond:
+            self._stop = True
+            self.cond.notify()
+        if self.dispatch_th is not None:
+            self.dispatch_th.join()
+
+    def submit(self, handler, value: int, request_id: int, key=None) -> None:
+        """
+        Add the request `request_id` of `handler` to the next batch.
+
+        The response is sent with handler.send_response() and cached under
+        `key` if one is given.
+        """
+        entry = Pending(
+            handler, value, request_id, key, time.perf_counter_ns()
+        )
+        with self.cond:
+            self.pending.setdefault(type(handler), []).append(entry)
+            self.num_pending += 1
+            # Wake the dispatcher to start the window, or when a batch fills.
+            if self.num_pending == 1 or self.num_pending >= self.max_batch:
+                self.cond.notify()
+
+    def dispatch_loop(self) -> None:
+        """
+        Continuously wait for batches to fill or their window to pass, and
+        process them.
+        """
+        if self.placement is not None:
+            self.placement_report = self.placement.apply()
+        while True:
+            batches = self.next_batches()
+            if batches is None:
+                return
+            for handler_cls, batch in batches:
+                self.run_batch(handler_cls, batch)
+
+    def next_batches(self):
+        """
+        Wait for the pending requests to make a batch and take them.
+
+        Returns:
+            A list of (handler class, requests) pairs, or None once stopped
+            with nothing left to process.
+        """
+        with self.cond:
+            while not self.num_pending:
+                if self._stop:
+                    return None
+                self.cond.wait(self.STOP_CHECK_INTERVAL)
+
+            oldest = min(batch[0].received for batch in self.pending.values())
+            deadline = oldest + int(self.window * 1e9)
+            while self.num_pending < self.max_batch and not self._stop:
+                remaining = deadline - time.perf_counter_ns()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining / 1e9)
+
+            if self.num_pending >= self.max_batch:
+                self.full += 1
+            batches = []
+            for handler_cls, pending in self.pending.items():
+                for pos in range(0, len(pending), self.max_batch):
+                    batches.append(
+                        (handler_cls, pending[pos : pos + self.max_batch])
+                    )
+            self.pending = dict()
+            self.num_pending = 0
+            return batches
+
+    def run_batch(self, handler_cls: type, batch: List[Pending]) -> None:
+        """
+        Process the values of a batch together and send each response.
+        """
+        st = time.perf_counter_ns()
+        for entry in batch:
+            self.wait.record(st - entry.received)
+        self.batches += 1
+        self.batched += len(batch)
+        self.sizes.record(len(batch))
+
+        if np is not None:
+            data = np.fromiter(
+                (entry.value for entry in batch), np.int64, len(batch)
+            )
+        else:
+            data = array(BATCH_TYPECODE, [entry.value for entry in batch])
+
+        try:
+            process = batch[0].handler.processor(
+                "process_batch", self.executor
+            )
+        except TypeError as e:
+            self.fail(batch, e)
+            return
+
+        if self.executor is None:
+            try:
+                responses = process(data)
+            except Exception as e:
+                self.fail(batch, e)
+                return
+            self.process.record(time.perf_counter_ns() - st)
+            self.scatter(batch, responses)
+            return
+
+        try:
+            future = self.executor.submit(process, data)
+        except RuntimeError as e:
+            # The executor is shutting down.
+            self.fail(batch, e)
+            return
+        future.add_done_callback(
+            functools.partial(self.on_processed, batch, st)
+        )
+
+    def on_processed(
+        self, batch: List[Pending], st: int, future: Future
+    ) -> None:
+        """
+        Send the responses of a batch processed on the executor.
+        """
+        self.process.record(time.perf_counter_ns() - st)
+        try:
+            responses = future.result()
+        except Exception as e:
+            self.fail(batch, e)
+            return
+        self.scatter(batch, responses)
+
+    def scatter(self, batch: List[Pending], responses) -> None:
+        """
+        Send each response of a batch to the client that sent its request.
+        """
+        if len(responses) != len(batch):
+            self.fail(
+                batch,
+                ValueError(
+                    f"{len(responses)} results for {len(batch)} requests"
+                ),
+            )
+            return
+        for entry, response in zip(batch, responses):
+            response = int(response)
+            handler = entry.handler
+            if entry.key is not None:
+                handler.cache.put(entry.key, response)
+            handler.stats.completed += 1
+            handler.send_timed(
+                handler.send_response, response, entry.request_id
+            )
+
+    def fail(self, batch: List[Pending], error: Exception) -> None:
+        """
+        Answer every request of a batch with `error`.
+        """
+        for entry in batch:
+            entry.handler.stats.completed += 1
+            entry.handler.fail(error, entry.request_id)
+
+    def stats(self) -> Dict:
+        """
+        Summarize the batches so far, with latencies in microseconds.
+        """
+        return {
+            "window_us": self.window * 1e6,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "requests": self.batched,
+            "full": self.full,
+            "size": self.sizes.summary(scale=1),
+            "wait_us": self.wait.summary(),
+            "process_us": self.process.summary(),
+            "placement": self.placement_report,
+        }
@@ -0,0 +1,111 @@
+import select
+import threading
+from typing import Callable, Dict, Optional
+
+from utils.placement import Placement
+
+
+class Reactor:
+    """
+    A class running a single-threaded epoll event loop.
+
+    Callbacks are registered per file descriptor with add_reader() and are
+    called from the loop thread whenever the descriptor is readable, or with
+    add_writer() to be called whenever it is writable.
+    The add_reader()/remove_reader() and add_writer()/remove_writer() pairs
+    mirror asyncio's event loop API.
+    """
+
+    # How often the loop wakes up to check whether it should stop.
+    STOP_CHECK_INTERVAL = 0.1
+
+    def __init__(self, placement: Optional[Placement] = None) -> None:
+        """
+        Initialize the Reactor object.
+
+        With `placement`, the loop thread applies it when it starts and
+        keeps what it got in `placement_report`.
+        """
+        self.placement = placement
+        self.placement_report = None
+        self.epoll = select.epoll()
+        self.callbacks: Dict[int, Callable[[], None]] = dict()
+        self.writers: Dict[int, Callable[[], None]] = dict()
+
+        self._stop = False
+        self.loop_th = None
+
+    def add_reader(self, fd: int, callback: Callable[[], None]) -> None:
+        """
+        Call `callback` whenever `fd` is readable.
+        """
+        registered = fd in self.callbacks or fd in self.writers
+        self.callbacks[fd] = callback
+        self._update(fd, registered)
+
+    def remove_reader(self, fd: int) -> None:
+        """
+        Stop watching `fd` for reading.
+        """
+        if self.callbacks.pop(fd, None) is not None:
+            self._update(fd, True)
+
+    def add_writer(self, fd: int, callback: Callable[[], None]) -> None:
+        """
+        Call `callback` whenever `fd` is writable.
+        """
+        registered = fd in self.callbacks or fd in self.writers
+        self.writers[fd] = callback
+        self._update(fd, registered)
+
+    def remove_writer(self, fd: int) -> None:
+        """
+        Stop watching `fd` for writing.
+        """
+        if self.writers.pop(fd, None) is not None:
+            self._update(fd, True)
+
+    def _update(self, fd: int, registered: bool) -> None:
+        """
+        Register, modify or unregister `fd` to match its callbacks.
+        """
+        events = (select.EPOLLIN if fd in self.callbacks else 0) | (
+            select.EPOLLOUT if fd in self.writers else 0
+        )
+        if not events:
+            self.epoll.unregister(fd)
+        elif registered:
+            self.epoll.modify(fd, events)
+        else:
+            self.epoll.register(fd, events)
+
+    def start(self) -> None:
+        """
+        Start the event loop in its own thread.
+        """
+        self.loop_th = threading.Thread(target=self.run)
+        self.loop_th.start()
+
+    def stop(self) -> None:
+        """
+        Stop the event loop.
+        """
+        self._stop = True
+
+    def run(self) -> None:
+        """
+        Dispatch readiness events until stop() is called.
+        """
+        if self.placement is not None:
+            self.placement_report = self.placement.apply()
+        while not self._stop:
+            for fd, events in self.epoll.poll(self.STOP_CHECK_INTERVAL):
+                if events & ~select.EPOLLOUT:
+                    callback = self.callbacks.get(fd)
+                    if callback is not None:
+                        callback()
+                if events & (select.EPOLLOUT | select.EPOLLERR):
+                    callback = self.writers.get(fd)
+                    if callback is not None:
+                        callback()
+        self.epoll.close()
@@ -0,0 +1,173 @@
+import os
+import select
+import threading
+from typing import Dict, List, Set
+
+from utils.utils import client_pid
+
+
+def is_alive(pid: int) -> bool:
+    """
+    Return whether a process with this id exists.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # It exists but belongs to someone else.
+        return True
+    return True
+
+
+class Reaper:
+    """
+    A class watching the processes of registered clients so the server can
+    tear down the clients that died without unregistering.
+
+    Every process is watched through a pidfd, which becomes readable when
+    the process exits. All pidfds live in one epoll set, whose descriptor
+    fileno() returns, so a reactor learns about deaths as they happen.
+    Where pidfds are not available, a thread checks the processes every
+    CHECK_INTERVAL seconds instead and rings an eventfd in the same set.
+
+    Several clients may share a process, e.g. ids from new_client_id(), and
+    are all reported when it dies.
+    """
+
+    # How often processes without a pidfd are checked, in seconds.
+    CHECK_INTERVAL = 1.0
+
+    def __init__(self) -> None:
+        """
+        Initialize the Reaper object.
+        """
+        self.lock = threading.Lock()
+        # Process id -> ids of the clients living in it.
+        self.clients: Dict[int, Set[int]] = dict()
+        # pidfd -> process id, and back.
+        self.pids: Dict[int, int] = dict()
+        self.pidfds: Dict[int, int] = dict()
+        # Processes checked by the thread, and those it found dead.
+        self.checked: Set[int] = set()
+        self.found: List[int] = []
+
+        self.wake_fd = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+        self.epoll = select.epoll()
+        self.epoll.register(self.wake_fd, select.EPOLLIN)
+
+        self.closed = threading.Event()
+        self.check_th = None
+
+    def fileno(self) -> int:
+        """
+        Return the descriptor of the epoll set.
+        """
+        return self.epoll.fileno()
+
+    def watch(self, client_id: int) -> None:
+        """
+        Start watching the process of `client_id`.
+        """
+        pid = client_pid(client_id)
+        with self.lock:
+            if pid in self.clients:
+                self.clients[pid].add(client_id)
+                return
+            self.clients[pid] = {client_id}
+
+            try:
+                pidfd = os.pidfd_open(pid)
+            except ProcessLookupError:
+                # Already gone before it was watched.
+                self.found.append(pid)
+                os.eventfd_write(self.wake_fd, 1)
+                return
+            except (AttributeError, OSError):
+                self.checked.add(pid)
+                self._start_checking()
+                return
+
+            self.pids[pidfd] = pid
+            self.pidfds[pid] = pidfd
+            self.epoll.register(pidfd, select.EPOLLIN)
+
+    def unwatch(self, client_id: int) -> None:
+        """
+        Stop watching `client_id`, and its process once no client is left.
+        """
+        pid = client_pid(client_id)
+        with self.lock:
+            clients = self.clients.get(pid)
+            if clients is None:
+                return
+            clients.discard(client_id)
+            if not clients:
+                self._forget(pid)
+
+    def collect(self) -> List[int]:
+        """
+        Return the clients whose process died since the last call, without
+        waiting. They are no longer watched.
+        """
+        try:
+            os.eventfd_read(self.wake_fd)
+        except BlockingIOError:
+            pass
+
+        with self.lock:
+            dead = self.found
+            self.found = []
+            for fd, _ in self.epoll.poll(0):
+                if fd in self.pids:
+                    dead.append(self.pids[fd])
+
+            client_ids = []
+            for pid in dead:
+                client_ids.extend(self.clients.get(pid, ()))
+                self._forget(pid)
+            return client_ids
+
+    def _forget(self, pid: int) -> None:
+        self.clients.pop(pid, None)
+        self.checked.discard(pid)
+        pidfd = self.pidfds.pop(pid, None)
+        if pidfd is not None:
+            del self.pids[pidfd]
+            self.epoll.unregister(pidfd)
+            os.close(pidfd)
+
+    def _start_checking(self) -> None:
+        if self.check_th is None:
+            self.check_th = threading.Thread(
+                target=self._check_loop, daemon=True
+            )
+            self.check_th.start()
+
+    def _check_loop(self) -> None:
+        """
+        Check the processes without a pidfd until the reaper is closed.
+        """
+        while not self.closed.wait(self.CHECK_INTERVAL):
+            with self.lock:
+                dead = [pid for pid in self.checked if not is_alive(pid)]
+                if not dead:
+                    continue
+                self.checked.difference_update(dead)
+                self.found.extend(dead)
+            os.eventfd_write(self.wake_fd, 1)
+
+    def close(self) -> None:
+        """
+        Stop watching every process.
+        """
+        if self.closed.is_set():
+            return
+        self.closed.set()
+        if self.check_th is not None:
+            self.check_th.join()
+        with self.lock:
+            for pid in list(self.clients):
+                self._forget(pid)
+            self.epoll.close()
+            os.close(self.wake_fd)
@@ -1,38 +1,179 @@
+import errno
+import json
+import os
+import select
 import threading
 import time
+from concurrent.futures import Executor
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional, Type
 
+from server.channel_pool import ChannelPool
+from server.micro_batcher import MicroBatcher
+from server.reactor import Reactor
+from server.reaper import Reaper
 from server.request_handler import RequestHandler
-from utils.pipe_reader import PIPEReader
-from utils.utils import make_pipe
+from server.result_cache import ResultCache
+from server.stats import HandlerStats
+from utils.broadcast import Publisher
+from utils.frame import OP_BROADCAST
+from utils.pipe_reader import WaitStrategy
+from utils.pipe_writer import PipeLimits
+from utils.placement import ServerPlacement
+from utils.transport import get_transport
+from utils.utils import FIFO_TRANSPORT, SHARED_TRANSPORT, TRANSPORTS
 
 
 class RegistrationHandler:
     """
     A class to handle client registration and unregistration.
+
+    `stats <pid>` on the register pipe is answered with a JSON snapshot of
+    the server's stats on the pipe `stats_to_<pid>_pipe`, which the asking
+    process creates and reads.
+
+    With a channel pool, `acquire <pid>` registers a client on a pooled
+    channel and is answered with `ack <channel id>` on the pipe
+    `register_to_<pid>_pipe` once its request handler is serving it.
+
+    The process of every registered client is watched, and a client that
+    dies without unregistering is torn down as if it had unregistered.
+    Handlers leave the registry when their client goes; their stats are
+    added to the totals of retired clients.
+
+    With the shared transport, the requests of every client registered over
+    it arrive on one inbound pipe, which is read by the same thread (or
+    reactor callback) as the register pipe and handed to the handler of
+    each client; those handlers have no thread of their own. Their
+    responses are queued on the return pipe of each client process, and the
+    clients of a process that stops reading it are retired.
+
+    broadcast() pushes a payload to every registered client.
     """
 
-    def __init__(self, register_pipe_path: Path) -> None:
+    # How often the loops wake up to check whether they should stop.
+    STOP_CHECK_INTERVAL = 0.1
+
+    # How often the loop retries writing queued shared transport responses.
+    FLUSH_INTERVAL = 0.001
+
+    def __init__(
+        self,
+        register_pipe_path: Path,
+        wait_strategy: Optional[WaitStrategy] = None,
+        reactor: Optional[Reactor] = None,
+        handler_cls: Type[RequestHandler] = RequestHandler,
+        executor: Optional[Executor] = None,
+        cache: Optional[ResultCache] = None,
+        transport: str = FIFO_TRANSPORT,
+        channel_pool: Optional[ChannelPool] = None,
+        pipe_limits: Optional[PipeLimits] = None,
+        placement: Optional[ServerPlacement] = None,
+        batcher: Optional[MicroBatcher] = None,
+        publisher: Optional[Publisher] = None,
+    ) -> None:
         """
         Initialize the RegistrationHandler object.
+
+        Args:
+            register_pipe_path (Path): The path to the register pipe.
+            wait_strategy (WaitStrategy, optional): How the request handlers
+                wait for client requests. Defaults to blocking.
+            reactor (Reactor, optional): If given, the register pipe and all
+                client pipes are served from this event loop instead of
+                one thread each. An asyncio event loop works as well.
+                Defaults to None.
+            handler_cls (type, optional): The RequestHandler subclass
+                serving each client. Defaults to RequestHandler.
+            executor (Executor, optional): If given, requests are processed
+                on this executor instead of the thread reading the client
+                pipe. Defaults to None.
+            cache (ResultCache, optional): The result cache shared by all
+                request handlers. Defaults to None.
+            transport (str, optional): The transport of the register pipe,
+                and of clients that do not name one when they register.
+                Defaults to "fifo".
+            channel_pool (ChannelPool, optional): The pool `acquire`
+                hands channels out from. It is closed by stop().
+                Defaults to None.
+            pipe_limits (PipeLimits, optional): The capacity of FIFO
+                channels and the response queue of each client, which makes
+                response writes non-blocking, or of the return pipes of the
+                shared transport. Defaults to None.
+            placement (ServerPlacement, optional): The cores and scheduling
+                of the register loop and the request handler threads. In
+                reactor mode the reactor places itself. Defaults to None.
+            batcher (MicroBatcher, optional): If given, the single requests
+                of every client are processed together in its batches.
+                Defaults to None.
+            publisher (Publisher, optional): How broadcast() publishes
+                payloads. Defaults to a Publisher with its defaults.
         """
 
         self.pipe_path = register_pipe_path
+        self.wait_strategy = wait_strategy
+        self.reactor = reactor
+        self.handler_cls = handler_cls
+        self.executor = executor
+        self.cache = cache
+        self.transport = transport
+        self.channel_pool = channel_pool
+        self.pipe_limits = pipe_limits
+        self.placement = placement or ServerPlacement()
+        self.batcher = batcher
+        self.publisher = publisher or Publisher()
+        # Handlers created so far, spreading them over the handler cores.
+        self.handlers_placed = 0
+        # What the register loop and the executor workers got.
+        self.placement_reports: Dict = {"registration": None, "workers": None}
 
         self._stop = False
 
         self.register_th = None
 
         self.registration: Dict[int, RequestHandler] = dict()
+        self.reaper = Reaper()
 
-        make_pipe(self.pipe_path)
-        self.pipe_reader = PIPEReader(self.pipe_path)
+        # Stats of the clients that are gone, and how many of them died
+        # without unregistering.
+        self.retired = HandlerStats()
+        self.unregistered = 0
+        self.reaped = 0
+        self.stalled = 0
+
+        self.started = time.monotonic()
+        # Time and request count of the previous stats snapshot.
+        self.last_snapshot = (self.started, 0)
+
+        self.pipe_reader = get_transport(transport).listen(self.pipe_path)
+
+        # The inbound pipe of shared channel clients, read with the
+        # register pipe.
+        self.inbound = None
+        self.returns = None
+        if transport == SHARED_TRANSPORT:
+            self.inbound = get_transport(transport).inbound
+            self.returns = get_transport(transport).returns
+            self.poller = select.poll()
+            self.poller.register(self.pipe_reader.fileno(), select.POLLIN)
+            self.poller.register(self.inbound.fileno(), select.POLLIN)
 
     def start(self) -> None:
         """
         Start the registration handler's main loop.
         """
+        if self.reactor is not None:
+            self.reactor.add_reader(
+                self.pipe_reader.fileno(), self.read_register_pipe
+            )
+            self.reactor.add_reader(self.reaper.fileno(), self.reap)
+            if self.inbound is not None:
+                self.returns.attach(self.reactor)
+                self.reactor.add_reader(
+                    self.inbound.fileno(), self.read_inbound
+                )
+            return
+
         self.register_th = threading.Thread(
             target=self.read_register_pipe_loop
         )
@@ -43,41 +184,322 @@ class RegistrationHandler:
         Stop the registration handler's main loop.
         """
         self._stop = True
+        if self.reactor is not None:
+            self.reactor.remove_reader(self.pipe_reader.fileno())
+            self.reactor.remove_reader(self.reaper.fileno())
+            if self.inbound is not None:
+                self.reactor.remove_reader(self.inbound.fileno())
+            self.shutdown()
+
+    def shutdown(self) -> None:
+        """
+        Close the register pipe, stop the clients still registered and
+        close the channel pool and the inbound pipe.
+        """
+        self.pipe_reader.close()
+        request_handlers = [
+            self.retire(pid) for pid in list(self.registration)
+        ]
+        for request_handler in request_handlers:
+            if (
+                request_handler is not None
+                and request_handler.read_th is not None
+            ):
+                request_handler.read_th.join()
+        self.reaper.close()
+        if self.channel_pool is not None:
+            self.channel_pool.close()
+        self.publisher.close()
+        if self.inbound is not None:
+            self.inbound.close()
+            self.returns.close()
+            try:
+                self.inbound.pipe_path.unlink()
+            except FileNotFoundError:
+                pass
 
     def read_register_pipe_loop(self) -> None:
         """
         Continuously read the register pipe and handle registration messages.
+
+        Dead clients are looked for at least every STOP_CHECK_INTERVAL.
         """
+        if self.placement.registration is not None:
+            self.placement_reports[
+                "registration"
+            ] = self.placement.registration.apply()
         while not self._stop:
-            time.sleep(1e-6)
-            self.read_register_pipe()
+            if self.inbound is None:
+                self.read_register_pipe()
+            else:
+                timeout = (
+                    self.FLUSH_INTERVAL
+                    if self.returns.queued
+                    else self.STOP_CHECK_INTERVAL
+                )
+                self.poller.poll(timeout * 1000)
+                self.returns.flush()
+                self.read_inbound()
+            self.reap()
+        self.shutdown()
 
-    def read_register_pipe(self) -> None:
+    def read_register_pipe(self) -> bool:
         """
         Read messages from the register pipe and handle them.
+
+        Returns:
+            Whether any message was read.
         """
-        msgs = self.pipe_reader.read(busy_wait=False)
+        if self.reactor is not None or self.inbound is not None:
+            msgs = self.pipe_reader.read(busy_wait=False)
+        else:
+            msgs = self.pipe_reader.read(timeout=self.STOP_CHECK_INTERVAL)
         if msgs:
             for msg in msgs:
                 msg_split = msg.split(" ")
-                if len(msg_split) != 2:
+                if len(msg_split) not in (2, 3):
                     continue
                 op = msg_split[0]
                 pid = int(msg_split[1])
-                self.handle_registration(op, pid)
+                transport = (
+                    msg_split[2] if len(msg_split) == 3 else self.transport
+                )
+                self.handle_registration(op, pid, transport)
+        return bool(msgs)
 
-    def handle_registration(self, op, pid) -> None:
+    def read_inbound(self) -> None:
+        """
+        Read the requests on the inbound pipe and hand them to the handlers
+        of their clients.
+
+        A client registers before it sends anything, so the register pipe
+        is drained after reading the requests and before handing them out;
+        requests of clients that are not registered then are dropped.
+        """
+        requests = self.inbound.read_frames(busy_wait=False)
+        while self.read_register_pipe():
+            pass
+
+        cur_time = time.perf_counter_ns()
+        for pid, request in requests:
+            request_handler = self.registration.get(pid)
+            if request_handler is not None:
+                request_handler.handle(request, cur_time=cur_time)
+
+        for pid in self.returns.stalled(list(self.registration)):
+            self.retire(pid)
+            self.stalled += 1
+
+    def handle_registration(self, op, pid, transport=None) -> None:
         """
         Handle registration and unregistration messages.
 
         Args:
-            op (str): The operation type ('register' or 'unregister').
+            op (str): The operation type ('register', 'acquire',
+                'unregister' or 'stats').
             pid (int): The client process ID.
+            transport (str, optional): The transport chosen by the client.
+                Defaults to the transport of the register pipe.
         """
         if op == "register":
-            request_handler = RequestHandler(pid)
-            self.registration[pid] = request_handler
-            request_handler.start()
+            transport = transport or self.transport
+            if transport not in TRANSPORTS:
+                return
+            if transport == SHARED_TRANSPORT and self.inbound is None:
+                # Only a server listening with it has an inbound pipe.
+                return
+            self.serve(
+                pid,
+                self.handler_cls(
+                    pid,
+                    self.wait_strategy,
+                    transport,
+                    self.executor,
+                    self.cache,
+                    pipe_limits=self.pipe_limits,
+                    placement=self.next_handler_placement(),
+                batcher=self.batcher,
+                ),
+            )
+
+        elif op == "acquire":
+            self.acquire_channel(pid)
 
         elif op == "unregister":
-            self.registration[pid].stop()
+            if pid in self.registration:
+                self.retire(pid)
+                self.unregistered += 1
+
+        elif op == "stats":
+            self.send_stats(pid)
+
+    def acquire_channel(self, pid: int) -> None:
+        """
+        Serve `pid` over a pooled channel and send it the channel id.
+
+        Without a pool the client is told so with `nack`.
+        """
+        reply_pipe_path = Path(f"register_to_{pid}_pipe")
+        if self.channel_pool is None:
+            self.send_reply(reply_pipe_path, "nack")
+            return
+
+        channel = self.channel_pool.acquire()
+        self.serve(
+            pid,
+            self.handler_cls(
+                pid,
+                self.wait_strategy,
+                FIFO_TRANSPORT,
+                self.executor,
+                self.cache,
+                channel=channel,
+                pipe_limits=self.pipe_limits,
+                placement=self.next_handler_placement(),
+                batcher=self.batcher,
+            ),
+        )
+        self.send_reply(reply_pipe_path, f"ack {channel.channel_id}")
+
+    def next_handler_placement(self):
+        """
+        Return the placement of the next request handler.
+        """
+        placement = self.placement.handler(self.handlers_placed)
+        self.handlers_placed += 1
+        return placement
+
+    def serve(self, pid: int, request_handler: RequestHandler) -> None:
+        """
+        Register `request_handler` for `pid`, start it and watch the
+        client's process.
+
+        A handler without a read pipe is not started: its requests come
+        from the inbound pipe.
+        """
+        self.registration[pid] = request_handler
+        self.reaper.watch(pid)
+        if request_handler.read_pipe is None:
+            return
+        if self.reactor is not None:
+            request_handler.attach(self.reactor)
+        else:
+            request_handler.start()
+
+    def retire(self, pid: int) -> Optional[RequestHandler]:
+        """
+        Stop the handler of `pid` and remove it from the registry, keeping
+        its stats in the retired totals.
+
+        Returns:
+            The stopped handler, or None if it was already retired, e.g. by
+            the reactor thread while the server stops. In thread mode it
+            cleans up on its own thread, which ends shortly after.
+        """
+        request_handler = self.registration.pop(pid, None)
+        if request_handler is None:
+            return None
+        self.reaper.unwatch(pid)
+        if self.inbound is not None:
+            self.inbound.decoder.forget(pid)
+        request_handler.stop()
+        self.retired.merge(request_handler.stats)
+        return request_handler
+
+    def reap(self) -> None:
+        """
+        Tear down the clients whose process died without unregistering.
+        """
+        for pid in self.reaper.collect():
+            if pid in self.registration:
+                self.retire(pid)
+                self.reaped += 1
+
+    def broadcast(self, payload: bytes) -> int:
+        """
+        Push `payload` to every registered client.
+
+        The payload is published once, see Publisher, and each client is
+        sent a notice of a few bytes for a large payload. Can be called from
+        any thread.
+
+        Returns:
+            The number of clients notified.
+        """
+        notice = self.publisher.publish(payload)
+        request_handlers = list(self.registration.values())
+        for request_handler in request_handlers:
+            request_handler.write_frame(OP_BROADCAST, notice)
+        return len(request_handlers)
+
+    def snapshot(self) -> Dict:
+        """
+        Summarize the stats of every client and of the whole server.
+
+        `qps` is the request rate since the previous snapshot.
+        """
+        now = time.monotonic()
+        total = HandlerStats()
+        total.merge(self.retired)
+        clients = dict()
+        for pid, request_handler in self.registration.items():
+            total.merge(request_handler.stats)
+            clients[str(pid)] = request_handler.stats.snapshot()
+            clients[str(pid)]["placement"] = request_handler.placement_report
+
+        last_time, last_requests = self.last_snapshot
+        self.last_snapshot = (now, total.requests)
+
+        snapshot = total.snapshot()
+        snapshot["uptime"] = now - self.started
+        snapshot["qps"] = (total.requests - last_requests) / max(
+            now - last_time, 1e-9
+        )
+        snapshot["num_clients"] = len(clients)
+        snapshot["unregistered"] = self.unregistered
+        snapshot["reaped"] = self.reaped
+        snapshot["stalled"] = self.stalled
+        snapshot["cache"] = self.cache.stats() if self.cache else None
+        snapshot["channel_pool"] = (
+            self.channel_pool.stats() if self.channel_pool else None
+        )
+        snapshot["broadcast"] = self.publisher.stats()
+        snapshot["batcher"] = self.batcher.stats() if self.batcher else None
+        snapshot["placement"] = dict(
+            self.placement_reports,
+            reactor=getattr(self.reactor, "placement_report", None),
+        )
+        snapshot["clients"] = clients
+        return snapshot
+
+    def send_stats(self, pid: int) -> None:
+        """
+        Write a stats snapshot to the stats pipe of `pid`.
+        """
+        self.send_reply(
+            Path(f"stats_to_{pid}_pipe"), json.dumps(self.snapshot())
+        )
+
+    def send_reply(self, reply_pipe_path: Path, line: str) -> None:
+        """
+        Write one line to a reply pipe created by the asking process.
+
+        Nothing is sent if nobody is reading the pipe anymore, so a client
+        that gave up cannot block the register pipe.
+        """
+        try:
+            fd = os.open(reply_pipe_path, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError as e:
+            if e.errno in (errno.ENXIO, errno.ENOENT):
+                return
+            raise
+
+        try:
+            os.set_blocking(fd, True)
+            data = (line + "\n").encode()
+            while data:
+                data = data[os.write(fd, data) :]
+        except BrokenPipeError:
+            pass
+        finally:
+            os.close(fd)
@@ -1,32 +1,207 @@
+import functools
+import inspect
 import threading
 import time
-import datetime
-from pathlib import Path
-from typing import List, Union
+from array import array
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, Optional
 
-from utils.pipe_reader import PIPEReader
-from utils.pipe_writer import PIPEWriter
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from server.channel_pool import PooledChannel
+from server.micro_batcher import MicroBatcher
+from server.reactor import Reactor
+from server.result_cache import ResultCache
+from server.stats import HandlerStats
+from utils.frame import (
+    BATCH_TYPECODE,
+    CREDIT,
+    OP_ARRAY,
+    OP_BATCH,
+    OP_CANCEL,
+    OP_CHUNK,
+    OP_CREDIT,
+    OP_END,
+    OP_ERROR,
+    OP_INIT,
+    OP_REQUEST,
+    OP_RESPONSE,
+    OP_STREAM,
+    VALUE,
+    Frame,
+    unpack_values,
+)
+from utils.pipe_reader import PIPEReader, WaitStrategy
+from utils.pipe_writer import PIPEWriter, PipeLimits
+from utils.placement import Placement
+from utils.shared_channel import ReturnWriter
+from utils.shm_array import (
+    AttachedSegments,
+    describe,
+    pack_descriptor,
+    unpack_descriptor,
+    view,
+)
+from utils.transport import channel_paths, get_transport
+from utils.utils import FIFO_TRANSPORT
+
+
+class OutboundStream:
+    """
+    A streaming response being sent: the chunks left to send and how many
+    of them the client has room for.
+    """
+
+    def __init__(
+        self, request_id: int, chunks: Iterator, credits: int
+    ) -> None:
+        """
+        Initialize the OutboundStream object.
+        """
+        self.request_id = request_id
+        self.chunks = chunks
+        self.credits = credits
+
+    def close(self) -> None:
+        """
+        Stop producing chunks.
+        """
+        close = getattr(self.chunks, "close", None)
+        if close is not None:
+            close()
 
 
 class RequestHandler:
     """
     A class to handle client requests and send responses.
+
+    Requests are processed inline on the thread reading the client pipe.
+    With an executor, process_request() and process_batch() run on it
+    instead and the responses are written from its completion callbacks.
+    A process pool runs them in a worker process, without the handler, so
+    with one they have to be static or class methods; otherwise they can be
+    ordinary methods.
+
+    Subclasses whose process_request() is a pure function can set
+    `cacheable` to True, so results are memoized in the server's
+    ResultCache, keyed on the opcode and payload of the request.
+
+    With PipeLimits, responses are written to a FIFO channel without
+    blocking: what does not fit in the pipe is queued and written once the
+    client reads, and while the queue is over its limit the client's
+    requests are not read, so a slow client only holds itself back.
+
+    With a MicroBatcher, single requests are handed to it and processed
+    together with those of the server's other clients, through one
+    process_batch() call.
+
+    A stream request is answered chunk by chunk from the iterator returned
+    by process_stream(), on the thread serving the client even with an
+    executor. Chunks are only produced while the client has granted room
+    for them and, with PipeLimits, while the response queue is below its
+    limit, so neither side holds more than a few chunks of the result.
     """
 
-    def __init__(self, pid) -> None:
+    # Whether results may be served from the server's result cache.
+    cacheable = False
+
+    # How often the loop wakes up to check whether it should stop.
+    STOP_CHECK_INTERVAL = 0.1
+
+    # How often the loop retries writing queued responses.
+    FLUSH_INTERVAL = 0.001
+
+    # Values per chunk of the default process_stream().
+    STREAM_CHUNK = 4096
+
+    def __init__(
+        self,
+        pid,
+        wait_strategy: Optional[WaitStrategy] = None,
+        transport: str = FIFO_TRANSPORT,
+        executor: Optional[Executor] = None,
+        cache: Optional[ResultCache] = None,
+        channel: Optional[PooledChannel] = None,
+        pipe_limits: Optional[PipeLimits] = None,
+        placement: Optional[Placement] = None,
+        batcher: Optional[MicroBatcher] = None,
+    ) -> None:
         """
         Initialize the RequestHandler object.
+
+        With `channel`, the client is served over that pooled channel, which
+        goes back to its pool instead of being closed when the handler stops.
+
+        With the shared transport there is no read pipe; the handler is not
+        started and handle() is called for each request of the client.
+
+        With `placement`, the handler's thread applies it when it starts and
+        keeps what it got in `placement_report`. A handler attached to a
+        reactor runs on the reactor's thread instead.
+
+        With `batcher`, single requests are processed in its batches and
+        answered from its dispatcher thread.
         """
         self.pid = pid
+        self.executor = executor
+        self.cache = cache
+        self.batcher = batcher
+        self.stats = HandlerStats()
+        self.placement = placement
+        self.placement_report = None
 
         self.read_th = None
+        self.reactor = None
         self._stop = False
+        # Shared memory segments of the client's array requests.
+        self.segments = AttachedSegments()
 
-        self.read_pipe_path = Path(f"{pid}_to_server_pipe")
-        self.write_pipe_path = Path(f"server_to_{pid}_pipe")
+        # Executor callbacks write responses while the reader thread runs.
+        self.write_lock = threading.Lock()
+        self.closed = False
 
-        self.read_pipe = PIPEReader(self.read_pipe_path)
-        self.write_pipe = PIPEWriter(self.write_pipe_path)
+        # Request id -> streaming response being sent. Only touched by the
+        # thread serving the client.
+        self.streams: Dict[int, OutboundStream] = dict()
+
+        self.channel = channel
+        if channel is not None:
+            self.read_pipe, self.write_pipe = channel.reader, channel.writer
+        else:
+            self.read_pipe_path, self.write_pipe_path = channel_paths(pid)
+            self.read_pipe, self.write_pipe = get_transport(
+                transport
+            ).open_channel(pid, wait_strategy)
+
+        # The response writer when it queues instead of blocking.
+        self.outbound: Optional[PIPEWriter] = None
+        # Whether requests are not read until the client catches up.
+        self.paused = False
+        # Whether the reactor watches the write pipe for room.
+        self.watching = False
+        self.full_events_seen = 0
+        if pipe_limits is not None:
+            self.limit_pipes(pipe_limits)
+
+    def limit_pipes(self, limits: PipeLimits) -> None:
+        """
+        Resize the pipes of a FIFO channel and write responses to it without
+        blocking. The shared transport applies the limits to the return
+        pipes of client processes. Other transports keep their own writes.
+        """
+        if isinstance(self.write_pipe, ReturnWriter):
+            self.write_pipe.limit(limits)
+            return
+        if type(self.write_pipe) is not PIPEWriter:
+            return
+        if limits.capacity is not None and type(self.read_pipe) is PIPEReader:
+            self.read_pipe.set_capacity(limits.capacity)
+        self.write_pipe.limit(limits)
+        self.outbound = self.write_pipe
+        self.full_events_seen = self.outbound.full_events
 
     def __del__(self) -> None:
         """
@@ -41,27 +216,171 @@ class RequestHandler:
         self.read_th = threading.Thread(target=self.read_client_pipe_loop)
         self.read_th.start()
 
+    def attach(self, reactor: Reactor) -> None:
+        """
+        Serve the client from `reactor` instead of a dedicated thread.
+
+        Any object with add_reader()/remove_reader(), such as an asyncio
+        event loop, can be used as the reactor.
+        """
+        self.reactor = reactor
+        self.reactor.add_reader(self.read_pipe.fileno(), self.on_readable)
+        # Serve whatever the client sent before the handler was attached.
+        self.on_readable()
+
     def stop(self) -> None:
         """
         Stop the request handler.
         """
         self._stop = True
+        self.stats.outbound_queued = 0
+        if self.reactor is not None:
+            self.reactor.remove_reader(self.read_pipe.fileno())
+            with self.write_lock:
+                if self.watching:
+                    self.reactor.remove_writer(self.outbound.pipe_fd)
+                    self.watching = False
+            self.cleanup()
+        elif self.read_th is None:
+            # Never started: its requests were handed to it by whoever
+            # reads the shared inbound pipe.
+            self.cleanup()
+
+    def on_readable(self) -> None:
+        """
+        Handle the requests available on the read pipe without waiting.
+        """
+        if self.outbound is not None and self.outbound.backlogged:
+            self.pause()
+            return
+        for request in self.read_pipe.read_frames(busy_wait=False):
+            self.handle(request, cur_time=time.perf_counter_ns())
+
+    def on_writable(self) -> None:
+        """
+        Write the queued responses the pipe has room for, and read requests
+        again once the queue is below its limit.
+        """
+        with self.write_lock:
+            if self.closed:
+                return
+            self.outbound.flush()
+            self.track_outbound()
+            resume = self.paused and not self.outbound.backlogged
+        if resume:
+            self.resume()
+        if self.streams:
+            self.pump_streams()
+
+    def pause(self) -> None:
+        """
+        Stop reading requests until the client reads its responses.
+        """
+        if self.paused:
+            return
+        self.paused = True
+        self.stats.paused += 1
+        if self.reactor is not None:
+            self.reactor.remove_reader(self.read_pipe.fileno())
+            with self.write_lock:
+                self.track_outbound()
+
+    def resume(self) -> None:
+        """
+        Read requests again.
+        """
+        self.paused = False
+        if self.reactor is not None and not self._stop:
+            self.reactor.add_reader(self.read_pipe.fileno(), self.on_readable)
+            self.on_readable()
+
+    def flush_outbound(self) -> None:
+        """
+        Write the queued responses the pipe has room for.
+        """
+        with self.write_lock:
+            if not self.closed:
+                self.outbound.flush()
+                self.track_outbound()
+
+    def track_outbound(self) -> None:
+        """
+        Record the state of the response queue and, in reactor mode, watch
+        the pipe for room while something is queued. Called with the write
+        lock held.
+        """
+        outbound = self.outbound
+        self.stats.outbound_queued = outbound.queued
+        self.stats.max_outbound_queued = max(
+            self.stats.max_outbound_queued, outbound.queued
+        )
+        self.stats.full_pipe += outbound.full_events - self.full_events_seen
+        self.full_events_seen = outbound.full_events
+
+        if self.reactor is None:
+            return
+        # A paused client is resumed from on_writable().
+        watch = bool(outbound.queued) or self.paused
+        if watch and not self.watching:
+            self.reactor.add_writer(outbound.pipe_fd, self.on_writable)
+            self.watching = True
+        elif not watch and self.watching:
+            self.reactor.remove_writer(outbound.pipe_fd)
+            self.watching = False
 
     def read_client_pipe_loop(self) -> None:
         """
         Continuously read client requests and handle them.
 
+        While responses are queued, they are written as the client makes
+        room, and requests are not read while the queue is over its limit.
+
         If _stop is set to True, the read pipe and write pipe are deleted.
         """
+        if self.placement is not None:
+            self.placement_report = self.placement.apply()
         while not self._stop:
-            requests = self.read_pipe.read(busy_wait=False)
-            if requests:
-                for request in requests:
-                    # print(
-                    #     f"[{datetime.datetime.now()}] get request: {request}"
-                    # )
-                    self.handle(request, cur_time=time.perf_counter_ns())
-            time.sleep(1e-6)
+            timeout = self.STOP_CHECK_INTERVAL
+            if self.outbound is not None and self.outbound.queued:
+                if self.outbound.backlogged:
+                    self.pause()
+                    self.outbound.wait_writable(self.STOP_CHECK_INTERVAL)
+                    self.flush_outbound()
+                    continue
+                self.flush_outbound()
+                timeout = self.FLUSH_INTERVAL
+            if self.paused:
+                self.resume()
+            if self.streams:
+                self.pump_streams()
+
+            requests = self.read_pipe.read_frames(timeout=timeout)
+            for request in requests:
+                self.handle(request, cur_time=time.perf_counter_ns())
+
+        self.cleanup()
+
+    def cleanup(self) -> None:
+        """
+        Close the pipes and delete them, or give a pooled channel back.
+        """
+        for stream in self.streams.values():
+            stream.close()
+        self.streams.clear()
+
+        if self.channel is not None:
+            with self.write_lock:
+                self.closed = True
+            self.segments.close()
+            self.channel.release()
+            return
+
+        with self.write_lock:
+            self.closed = True
+            self.write_pipe.close()
+        if self.read_pipe is not None:
+            self.read_pipe.close()
+        self.segments.close()
 
         if self.write_pipe_path.exists():
             try:
@@ -75,40 +394,412 @@ class RequestHandler:
             except FileNotFoundError:
                 pass
 
-    def handle(self, request: str, cur_time=None) -> None:
+    def handle(self, request: Frame, cur_time=None) -> None:
         """
         Handle a client request.
+
+        A request that fails to be parsed, processed or answered is answered
+        with an error frame instead, so the client's future completes and
+        the handler keeps serving.
+        """
+        self.stats.requests += 1
+        if cur_time is not None and request.timestamp > 0:
+            self.stats.queue_wait.record(cur_time - request.timestamp)
+
+        try:
+            self.handle_opcode(request)
+        except Exception as e:
+            self.fail(e, request.request_id)
+
+    def handle_opcode(self, request: Frame) -> None:
+        """
+        Answer a request according to its opcode.
+        """
+        if request.opcode == OP_INIT:
+            self.send_response(-1, request.request_id)
+            return
+
+        if request.opcode == OP_BATCH:
+            self.respond(
+                request,
+                self.parse_batch,
+                self.processor("process_batch"),
+                self.send_batch_response,
+            )
+            return
+
+        if request.opcode == OP_ARRAY:
+            self.handle_array(request)
+            return
+
+        if request.opcode == OP_STREAM:
+            self.open_stream(request)
+            return
+
+        if request.opcode == OP_CREDIT:
+            stream = self.streams.get(request.request_id)
+            if stream is not None:
+                stream.credits += CREDIT.unpack(request.payload)[0]
+                self.pump_streams()
+            return
+
+        if request.opcode == OP_CANCEL:
+            stream = self.streams.pop(request.request_id, None)
+            if stream is not None:
+                stream.close()
+            return
+
+        if request.opcode != OP_REQUEST:
+            self.send_error(
+                f"Unknown opcode: {request.opcode}", request.request_id
+            )
+            return
+
+        self.respond(
+            request,
+            self.parse_request,
+            self.processor("process_request"),
+            self.send_response,
+            batched=self.batcher is not None,
+        )
+
+    def respond(
+        self,
+        request: Frame,
+        parse: Callable,
+        process: Callable,
+        send: Callable,
+        batched: bool = False,
+    ) -> None:
+        """
+        Parse, process and answer a request, going through the result cache
+        and the executor when the server has them.
+
+        With `batched`, a request missing from the cache is handed to the
+        batcher, which processes and answers it with others.
+        """
+        key = None
+        if self.cache is not None and self.cacheable:
+            key = (request.opcode, bytes(request.payload))
+            response = self.cache.get(key)
+            if response is not None:
+                if self.executor is None:
+                    self.send_timed(send, response, request.request_id)
+                else:
+                    # The write histogram belongs to the callback thread.
+                    send(response, request.request_id)
+                return
+
+        data = parse(request)
+        if batched:
+            self.stats.submitted += 1
+            self.batcher.submit(self, data, request.request_id, key)
+            return
+        if self.executor is not None:
+            self.dispatch(process, data, send, request.request_id, key)
+            return
+
+        st = time.perf_counter_ns()
+        response = process(data)
+        self.stats.process.record(time.perf_counter_ns() - st)
+        if key is not None:
+            self.cache.put(key, response)
+        self.send_timed(send, response, request.request_id)
+
+    def dispatch(
+        self,
+        process: Callable,
+        data,
+        send: Callable,
+        request_id: int,
+        key=None,
+    ) -> None:
+        """
+        Run `process(data)` on the executor and `send` its result
+        once it is done. The result is cached under `key` if one is given.
         """
-        req_time, data = self.parse_request(request)
-        if cur_time is not None and int(req_time) >= 0:
-            print(
-                f"[{datetime.datetime.now()}] ipc overhead: {(cur_time - int(req_time)) / 1000} us"
+        submitted = time.perf_counter_ns()
+        try:
+            future = self.executor.submit(process, data)
+        except RuntimeError as e:
+            # The executor is shutting down.
+            self.send_error(str(e), request_id)
+            return
+        self.stats.submitted += 1
+        future.add_done_callback(
+            functools.partial(
+                self.on_processed, send, request_id, key, submitted
             )
-        # print(f"[{datetime.datetime.now()}] parse request: {request}")
-        response = self.process_request(data)
-        # print(
-        #     f"[{datetime.datetime.now()}] process request: {request} -> {response}"
-        # )
-        self.send_response(response)
-        # print(f"[{datetime.datetime.now()}] send response: {response}")
+        )
 
-    def parse_request(self, request_data: str) -> List[str]:
+    def on_processed(
+        self,
+        send: Callable,
+        request_id: int,
+        key,
+        submitted: int,
+        future: Future,
+    ) -> None:
         """
-        Parse the request data.
+        Send the result of a request processed on the executor.
         """
-        return request_data.split(" ")
+        self.stats.process.record(time.perf_counter_ns() - submitted)
+        self.stats.completed += 1
+        try:
+            response = future.result()
+        except Exception as e:
+            self.fail(e, request_id)
+            return
+        if key is not None:
+            self.cache.put(key, response)
+        self.send_timed(send, response, request_id)
 
-    def process_request(self, data: str) -> int:
+    def send_timed(self, send: Callable, response, request_id: int) -> None:
+        """
+        Send a response and record how long writing it took.
+        """
+        st = time.perf_counter_ns()
+        try:
+            send(response, request_id)
+        except Exception as e:
+            # Such as a result that does not fit in its response.
+            self.fail(e, request_id)
+            return
+        self.stats.write.record(time.perf_counter_ns() - st)
+
+    def open_stream(self, request: Frame) -> None:
+        """
+        Start answering a stream request and send the chunks the client has
+        room for.
+        """
+        self.stats.streams += 1
+        credits = CREDIT.unpack_from(request.payload)[0]
+        try:
+            chunks = iter(self.process_stream(self.parse_stream(request)))
+        except Exception as e:
+            self.fail(e, request.request_id)
+            return
+        self.streams[request.request_id] = OutboundStream(
+            request.request_id, chunks, credits
+        )
+        self.pump_streams()
+
+    def pump_streams(self) -> None:
+        """
+        Send the next chunks of the open streams, as many as each client has
+        granted, and end the streams whose iterator is exhausted.
+
+        Stops early while the response queue is over its limit; it is called
+        again once the client has read some of it.
+        """
+        for stream in list(self.streams.values()):
+            while stream.credits > 0:
+                if self.outbound is not None and self.outbound.backlogged:
+                    return
+                try:
+                    chunk = next(stream.chunks)
+                    self.send_chunk(chunk, stream.request_id)
+                except StopIteration:
+                    del self.streams[stream.request_id]
+                    self.write_frame(OP_END, b"", stream.request_id)
+                    break
+                except Exception as e:
+                    del self.streams[stream.request_id]
+                    stream.close()
+                    self.fail(e, stream.request_id)
+                    break
+                stream.credits -= 1
+                self.stats.chunks += 1
+
+    def handle_array(self, request: Frame) -> None:
+        """
+        Handle an array request whose data lives in shared memory.
+
+        The payload holds the descriptor of the input array followed by the
+        descriptor of a byte buffer the result has to be written into.
+        """
+        if np is None:
+            self.send_error(
+                "NumPy is required for array requests", request.request_id
+            )
+            return
+
+        in_desc, pos = unpack_descriptor(request.payload)
+        out_desc, _ = unpack_descriptor(request.payload, pos)
+
+        data = view(self.segments.get(in_desc.name), in_desc)
+        response = np.asarray(self.process_array(data))
+        if response.nbytes > out_desc.shape[0]:
+            self.send_error(
+                f"Result of {response.nbytes} bytes does not fit in "
+                f"{out_desc.shape[0]} bytes",
+                request.request_id,
+            )
+            return
+
+        out_shm = self.segments.get(out_desc.name)
+        out = np.ndarray(
+            response.shape,
+            response.dtype,
+            buffer=out_shm.buf,
+            offset=out_desc.offset,
+        )
+        out[...] = response
+        self.write_frame(
+            OP_ARRAY,
+            pack_descriptor(describe(out, out_desc.name, out_desc.offset)),
+            request.request_id,
+        )
+
+    def parse_request(self, request: Frame) -> int:
+        """
+        Parse the request payload.
+        """
+        return VALUE.unpack(request.payload)[0]
+
+    def parse_stream(self, request: Frame):
+        """
+        Parse the values of a stream request like those of a batch.
+        """
+        payload = memoryview(request.payload)[CREDIT.size :]
+        if np is not None:
+            return np.frombuffer(payload, dtype=np.int64)
+        return unpack_values(payload)
+
+    def parse_batch(self, request: Frame):
+        """
+        Parse a batch payload into a NumPy array, or an array.array
+        if NumPy is not installed.
+        """
+        if np is not None:
+            return np.frombuffer(request.payload, dtype=np.int64)
+        return unpack_values(request.payload)
+
+    def processor(
+        self, name: str, executor: Optional[Executor] = None
+    ) -> Callable:
+        """
+        Return the processing method `name` to run inline or on `executor`,
+        the handler's own by default.
+
+        On a process pool the method is taken from the class, as the handler
+        does not reach the worker processes.
+
+        Raises:
+            TypeError: If the method has to run on a process pool and is
+                neither a static nor a class method.
+        """
+        executor = executor or self.executor
+        if not isinstance(executor, ProcessPoolExecutor):
+            return getattr(self, name)
+
+        handler_cls = type(self)
+        method = inspect.getattr_static(handler_cls, name)
+        if isinstance(method, (staticmethod, classmethod)):
+            return getattr(handler_cls, name)
+        if method is RequestHandler.__dict__[name]:
+            # The default only goes through process_request(), which is
+            # checked in turn.
+            self.processor("process_request", executor)
+            return functools.partial(method, handler_cls)
+        raise TypeError(
+            f"{handler_cls.__name__}.{name}() must be a static or class "
+            f"method to run on a process pool"
+        )
+
+    @staticmethod
+    def process_request(data: int) -> int:
         """
         Process the request data.
         """
-        if data == "init":
-            return -1
-        return int(data) * 2
+        return data * 2
+
+    def process_batch(self, data):
+        """
+        Process a whole batch of request data.
+
+        The default doubling is done as one array operation. Subclasses that
+        override only process_request() get it applied to every value.
+        """
+        if (
+            inspect.getattr_static(self, "process_request")
+            is not RequestHandler.__dict__["process_request"]
+        ):
+            return array(
+                BATCH_TYPECODE, [self.process_request(int(v)) for v in data]
+            )
+        if np is not None:
+            return data * 2
+        return array(BATCH_TYPECODE, [v * 2 for v in data])
+
+    def process_stream(self, data) -> Iterator:
+        """
+        Yield the results of a stream request one chunk at a time, each an
+        array or bytes-like object sent as one frame.
+
+        The default processes the values with process_batch(), STREAM_CHUNK
+        of them at a time. Subclasses can yield results as they compute
+        them, or results much larger than the request.
+        """
+        for pos in range(0, len(data), self.STREAM_CHUNK):
+            yield self.process_batch(data[pos : pos + self.STREAM_CHUNK])
+
+    def process_array(self, data):
+        """
+        Process the array of an array request.
 
-    def send_response(self, response: int) -> None:
+        `data` is a view of the client's shared memory; the returned array
+        is copied into the result segment.
+        """
+        return data * 2
+
+    def write_frame(
+        self, opcode: int, payload: bytes = b"", request_id: int = 0
+    ) -> None:
+        """
+        Write a frame to the client unless the handler is closed.
+        """
+        with self.write_lock:
+            if not self.closed:
+                self.write_pipe.write_frame(opcode, payload, request_id)
+                if self.outbound is not None:
+                    self.track_outbound()
+
+    def send_response(self, response: int, request_id: int = 0) -> None:
         """
         Send the response to the client.
         """
-        msg = f"{response}"
-        self.write_pipe.write(msg)
+        self.write_frame(OP_RESPONSE, VALUE.pack(response), request_id)
+
+    def send_batch_response(self, response, request_id: int = 0) -> None:
+        """
+        Send the responses of a batch request to the client in one frame.
+
+        The array is sent as it is, so transports that do not copy large
+        payloads do not copy it.
+        """
+        self.write_frame(
+            OP_RESPONSE, memoryview(response).cast("B"), request_id
+        )
+
+    def send_chunk(self, chunk, request_id: int = 0) -> None:
+        """
+        Send one chunk of a streaming response to the client.
+        """
+        self.write_frame(OP_CHUNK, memoryview(chunk).cast("B"), request_id)
+
+    def fail(self, error: Exception, request_id: int = 0) -> None:
+        """
+        Answer a request that failed with an error frame, unless the client
+        cannot be written to either.
+        """
+        try:
+            self.send_error(f"{type(error).__name__}: {error}", request_id)
+        except OSError:
+            pass
+
+    def send_error(self, message: str, request_id: int = 0) -> None:
+        """
+        Send an error frame to the client.
+        """
+        self.write_frame(OP_ERROR, message.encode(), request_id)
@@ -0,0 +1,93 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+
+
+class ResultCache:
+    """
+    A class memoizing request results, shared by the request handlers of a
+    server.
+
+    At most `maxsize` results are kept; the least recently used one is
+    evicted first. With `ttl`, results older than `ttl` seconds are treated
+    as missing and dropped. All methods are safe to call from the handler
+    threads, executor callbacks and an event loop at the same time.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None) -> None:
+        """
+        Initialize the ResultCache object.
+
+        Args:
+            maxsize (int): The maximum number of cached results.
+            ttl (float, optional): Seconds a result stays valid.
+                Defaults to None, which keeps results until evicted.
+        """
+        if maxsize <= 0:
+            raise ValueError(f"maxsize must be positive: {maxsize}")
+
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self.lock = threading.Lock()
+        # Key -> (time the result was stored, result), oldest use first.
+        self.entries: OrderedDict = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default=None):
+        """
+        Return the result cached for `key`, or `default` if there is none.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self.ttl is not None:
+                if time.monotonic() - entry[0] > self.ttl:
+                    del self.entries[key]
+                    entry = None
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, result) -> None:
+        """
+        Cache `result` for `key`, evicting the least recently used result
+        if the cache is full.
+        """
+        with self.lock:
+            self.entries[key] = (time.monotonic(), result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Drop every cached result. The counters are kept.
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the size of the cache and its hit, miss and eviction counts.
+        """
+        with self.lock:
+            return {
+                "size": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self) -> int:
+        with self.lock:
+            return len(self.entries)
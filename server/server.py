@@ -1,43 +1,229 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
 from pathlib import Path
 import time
+from typing import Optional, Type
 
+from server.channel_pool import ChannelPool
+from server.micro_batcher import MicroBatcher
+from server.reactor import Reactor
 from server.registration_handler import RegistrationHandler
+from server.request_handler import RequestHandler
+from server.result_cache import ResultCache
+from utils.broadcast import Publisher
+from utils.pipe_reader import WaitStrategy
+from utils.pipe_writer import PipeLimits
+from utils.placement import ServerPlacement, current_placement
+from utils.utils import FIFO_TRANSPORT
 
 
 class Server:
     """
     A class representing the server.
+
+    In "thread" mode every client is served by its own RequestHandler thread.
+    In "reactor" mode one epoll loop serves the register pipe and all clients.
+
+    With `workers`, requests are processed on a pool of that many worker
+    processes, so CPU-bound handlers are not serialized by the GIL. Any other
+    executor, such as a thread pool on a free-threaded build, can be passed
+    as `executor` instead.
+
+    `transport` ("fifo", "shm" or "zmq") is used for the register pipe and
+    for clients that do not choose one when they register.
+
+    With `cache`, results of handlers marked `cacheable` are memoized in it
+    and shared by every client.
+
+    With `channel_pool`, that many FIFO channels are created and opened up
+    front and handed out to clients registering with `acquire`.
+
+    With `pipe_limits`, FIFO channels get that pipe capacity and responses
+    are written without blocking; a client that does not read them has them
+    queued, up to a limit past which its requests are not read.
+
+    With `placement`, the register loop (or the reactor), the request handler
+    threads and the worker processes run on the cores and with the
+    scheduling it gives; the stats snapshot reports what each got.
+
+    With `batcher`, the single requests of all clients are collected over
+    its window and processed together, on the executor if there is one.
+
+    broadcast() pushes a payload to every registered client; `publisher`
+    sets how payloads are published.
     """
 
-    def __init__(self, register_pipe_path: Path) -> None:
+    THREAD_MODE = "thread"
+    REACTOR_MODE = "reactor"
+
+    MODES = (THREAD_MODE, REACTOR_MODE)
+
+    def __init__(
+        self,
+        register_pipe_path: Path,
+        wait_strategy: Optional[WaitStrategy] = None,
+        mode: str = THREAD_MODE,
+        handler_cls: Type[RequestHandler] = RequestHandler,
+        workers: Optional[int] = None,
+        executor: Optional[Executor] = None,
+        cache: Optional[ResultCache] = None,
+        transport: str = FIFO_TRANSPORT,
+        channel_pool: Optional[int] = None,
+        pipe_limits: Optional[PipeLimits] = None,
+        placement: Optional[ServerPlacement] = None,
+        batcher: Optional[MicroBatcher] = None,
+        publisher: Optional[Publisher] = None,
+    ) -> None:
         """
         Initialize the Server object.
         """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown server mode: {mode}")
+        if workers is not None and executor is not None:
+            raise ValueError("Pass either workers or executor, not both.")
+
         self.register_pipe_path = register_pipe_path
+        self.mode = mode
+
+        placement = placement or ServerPlacement()
+        self.placement = placement
+
+        self.reactor = (
+            Reactor(placement.registration)
+            if mode == self.REACTOR_MODE
+            else None
+        )
+
+        # Only an executor created here is shut down by stop().
+        self.own_executor = workers is not None
+        if workers is not None:
+            executor = ProcessPoolExecutor(
+                workers,
+                initializer=(
+                    placement.workers.apply
+                    if placement.workers is not None
+                    else None
+                ),
+            )
+        self.executor = executor
+        self.workers = workers
+        self.cache = cache
+        self.batcher = batcher
+        if batcher is not None and batcher.executor is None:
+            batcher.executor = executor
+        self.channel_pool = (
+            ChannelPool(channel_pool, wait_strategy)
+            if channel_pool is not None
+            else None
+        )
 
         self.registration_handler = RegistrationHandler(
-            self.register_pipe_path
+            self.register_pipe_path,
+            wait_strategy,
+            self.reactor,
+            handler_cls,
+            self.executor,
+            self.cache,
+            transport,
+            self.channel_pool,
+            pipe_limits,
+            placement,
+            batcher,
+            publisher,
         )
 
     def start(self):
         """
         Start the server.
         """
+        if self.own_executor:
+            # Start the worker processes before the first request needs them.
+            futures = [
+                self.executor.submit(current_placement)
+                for _ in range(self.workers)
+            ]
+            self.registration_handler.placement_reports["workers"] = [
+                future.result() for future in futures
+            ]
+        if self.batcher is not None:
+            self.batcher.start()
         self.registration_handler.start()
+        if self.reactor is not None:
+            self.reactor.start()
+
+    def broadcast(self, payload: bytes) -> int:
+        """
+        Push `payload`, such as a config update or a model version, to
+        every registered client.
+
+        Returns:
+            The number of clients notified.
+        """
+        return self.registration_handler.broadcast(payload)
 
     def stop(self):
         """
         Stop the server.
         """
         self.registration_handler.stop()
+        if self.reactor is not None:
+            self.reactor.stop()
+        if self.batcher is not None:
+            self.batcher.stop()
+        if self.own_executor:
+            self.executor.shutdown()
 
 
-def start_server(register_pipe_path, timeout=None) -> None:
+def start_server(
+    register_pipe_path,
+    timeout=None,
+    wait_strategy=None,
+    mode=Server.THREAD_MODE,
+    stop_event=None,
+    handler_cls=RequestHandler,
+    workers=None,
+    cache_size=None,
+    cache_ttl=None,
+    transport=FIFO_TRANSPORT,
+    channel_pool=None,
+    pipe_limits=None,
+    placement=None,
+    batch_window=None,
+    max_batch=256,
+) -> None:
     """
     Start the server.
+
+    The server is stopped after `timeout` seconds, or once `stop_event` is set.
+    With `cache_size`, results are memoized in a ResultCache of that size.
+    With `channel_pool`, that many channels are kept open for `acquire`.
+    With `pipe_limits`, responses are written without blocking.
+    With `placement`, the server's threads are pinned and scheduled by it.
+    With `batch_window`, single requests are batched across clients for up
+    to that many seconds, or until `max_batch` of them are waiting.
     """
-    server = Server(register_pipe_path)
+    cache = ResultCache(cache_size, cache_ttl) if cache_size else None
+    batcher = (
+        MicroBatcher(batch_window, max_batch)
+        if batch_window is not None
+        else None
+    )
+    server = Server(
+        register_pipe_path,
+        wait_strategy,
+        mode,
+        handler_cls,
+        workers,
+        cache=cache,
+        transport=transport,
+        channel_pool=channel_pool,
+        pipe_limits=pipe_limits,
+        placement=placement,
+        batcher=batcher,
+    )
     server.start()
     if timeout:
         time.sleep(timeout)
         server.stop()
+    elif stop_event is not None:
+        stop_event.wait()
+        server.stop()
@@ -0,0 +1,105 @@
+import time
+from typing import Dict
+
+from utils.histogram import Histogram
+
+
+class HandlerStats:
+    """
+    A class collecting the latencies of one client's requests, in
+    nanoseconds:
+
+        queue_wait   from the client stamping the request to the server
+                     reading it
+        process      processing, including the wait for an executor worker
+        write        writing the response
+
+    Each histogram is only recorded from one thread: the thread reading the
+    client pipe, or the executor's callback thread for process and write.
+
+    With non-blocking response writes, it also counts the bytes of responses
+    queued because the client's pipe was full, their peak, how often the
+    pipe was found full and how often reading requests was paused.
+
+    Stream requests and the chunks sent for them are counted as well.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize the HandlerStats object.
+        """
+        self.started = time.monotonic()
+        self.requests = 0
+        # Requests handed to the executor and completed by it; the
+        # difference is the number of requests waiting on the executor.
+        self.submitted = 0
+        self.completed = 0
+
+        self.outbound_queued = 0
+        self.max_outbound_queued = 0
+        self.full_pipe = 0
+        self.paused = 0
+
+        # Stream requests and the chunks sent for them.
+        self.streams = 0
+        self.chunks = 0
+
+        self.queue_wait = Histogram()
+        self.process = Histogram()
+        self.write = Histogram()
+
+    @property
+    def queue_depth(self) -> int:
+        """
+        The number of requests waiting on the executor.
+        """
+        return self.submitted - self.completed
+
+    def histograms(self) -> Dict[str, Histogram]:
+        """
+        Return the histograms by name.
+        """
+        return {
+            "queue_wait": self.queue_wait,
+            "process": self.process,
+            "write": self.write,
+        }
+
+    def merge(self, other: "HandlerStats") -> None:
+        """
+        Add the counts of `other` to these stats.
+        """
+        self.requests += other.requests
+        self.submitted += other.submitted
+        self.completed += other.completed
+        self.outbound_queued += other.outbound_queued
+        self.max_outbound_queued = max(
+            self.max_outbound_queued, other.max_outbound_queued
+        )
+        self.full_pipe += other.full_pipe
+        self.paused += other.paused
+        self.streams += other.streams
+        self.chunks += other.chunks
+        for name, histogram in self.histograms().items():
+            histogram.merge(other.histograms()[name])
+
+    def snapshot(self) -> Dict:
+        """
+        Summarize the stats, with latencies in microseconds.
+        """
+        return {
+            "uptime": time.monotonic() - self.started,
+            "requests": self.requests,
+            "queue_depth": self.queue_depth,
+            "outbound": {
+                "queued_bytes": self.outbound_queued,
+                "max_queued_bytes": self.max_outbound_queued,
+                "full_pipe": self.full_pipe,
+                "paused": self.paused,
+            },
+            "streams": {"opened": self.streams, "chunks": self.chunks},
+            "latency_us": {
+                name: histogram.summary()
+                for name, histogram in self.histograms().items()
+            },
+        }
@@ -1,17 +1,54 @@
-from multiprocessing import Process
+import argparse
+import resource
+import time
+from multiprocessing import Event, Process, Queue
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Type
 
+from benchmark.common import format_summary, summarize
 from client.client import start_client
-from server.server import start_server
+from server.request_handler import RequestHandler
+from server.server import Server, start_server
+from utils.pipe_reader import WaitStrategy
+from utils.pipe_writer import PipeLimits
+from utils.placement import Placement, ServerPlacement, parse_cpus
+from utils.transport import parse_url
+from utils.utils import FIFO_TRANSPORT, TRANSPORTS
 
 
-def start_server_proc(register_pipe_path, timeout) -> Process:
+def start_server_proc(
+    register_pipe_path,
+    timeout,
+    wait_strategy=None,
+    mode=Server.THREAD_MODE,
+    stop_event=None,
+    handler_cls=RequestHandler,
+    workers=None,
+    transport=FIFO_TRANSPORT,
+    channel_pool=None,
+    pipe_limits=None,
+    placement=None,
+    batch_window=None,
+    max_batch=256,
+) -> Process:
     proc = Process(
         target=start_server,
         args=(
             register_pipe_path,
             timeout,
+            wait_strategy,
+            mode,
+            stop_event,
+            handler_cls,
+            workers,
+        ),
+        kwargs=dict(
+            transport=transport,
+            channel_pool=channel_pool,
+            pipe_limits=pipe_limits,
+            placement=placement,
+            batch_window=batch_window,
+            max_batch=max_batch,
         ),
     )
     proc.start()
@@ -19,35 +56,279 @@ def start_server_proc(register_pipe_path, timeout) -> Process:
     return proc
 
 
-def main() -> None:
-    register_pipe_path = Path("register_pipe")
+def run(
+    num_clients: int = 5,
+    wait_strategy: Optional[WaitStrategy] = None,
+    verbose: bool = True,
+    mode: str = Server.THREAD_MODE,
+    num_iter: int = 100,
+    interval: float = 1e-2,
+    transport: str = FIFO_TRANSPORT,
+    handler_cls: Type[RequestHandler] = RequestHandler,
+    workers: Optional[int] = None,
+    register_pipe_path: Path = Path("register_pipe"),
+    channel_pool: Optional[int] = None,
+    pipe_limits: Optional[PipeLimits] = None,
+    placement: Optional[ServerPlacement] = None,
+    client_placement: Optional[Placement] = None,
+    batch_window: Optional[float] = None,
+    max_batch: int = 256,
+) -> Dict:
+    """
+    Run one server and `num_clients` clients and collect their results.
+
+    The server is stopped as soon as every client has finished. With
+    `channel_pool`, clients register on the server's pooled channels. With
+    `pipe_limits`, the server writes responses without blocking. With
+    `placement` and `client_placement`, the server's threads and the clients
+    are pinned and scheduled by them, each client on one of the client cores
+    in turn. With `batch_window`, the server processes the clients' requests
+    in batches collected over that many seconds, or of `max_batch` requests.
 
-    server_proc = start_server_proc(register_pipe_path, timeout=5)
+    Returns:
+        The request latency summary, the request throughput and the CPU time
+        used by all processes.
+    """
+    usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    stop_event = Event()
+    server_proc = start_server_proc(
+        register_pipe_path,
+        None,
+        wait_strategy,
+        mode,
+        stop_event,
+        handler_cls,
+        workers,
+        transport,
+        channel_pool,
+        pipe_limits,
+        placement,
+        batch_window,
+        max_batch,
+    )
+    # Let the server create the register pipe before clients write to it.
+    while not register_pipe_path.exists():
+        if not server_proc.is_alive():
+            raise RuntimeError("The server exited before it was ready.")
+        time.sleep(1e-3)
 
+    result_queue = Queue()
     client_procs: List[Process] = []
-    for _ in range(5):
-        client_proc = Process(target=start_client, args=(register_pipe_path,))
+    for i in range(num_clients):
+        client_proc = Process(
+            target=start_client,
+            args=(
+                register_pipe_path,
+                wait_strategy,
+                result_queue,
+                verbose,
+                num_iter,
+                interval,
+                transport,
+                channel_pool is not None,
+                client_placement and client_placement.pinned(i),
+            ),
+        )
         client_procs.append(client_proc)
 
+    st = time.perf_counter()
     for client_proc in client_procs:
         client_proc.start()
 
+    durations: List[float] = []
+    for _ in client_procs:
+        durations.extend(result_queue.get())
+    elapsed = time.perf_counter() - st
+
     for client_proc in client_procs:
         client_proc.join()
 
+    stop_event.set()
     try:
         server_proc.join()
-        if Path("register_pipe").exists():
-            Path("register_pipe").unlink()
+        if register_pipe_path.exists():
+            register_pipe_path.unlink()
         if Path("register_pipe.lock").exists():
             Path("register_pipe.lock").unlink()
 
     except KeyboardInterrupt:
-        if Path("register_pipe").exists():
-            Path("register_pipe").unlink()
+        if register_pipe_path.exists():
+            register_pipe_path.unlink()
         if Path("register_pipe.lock").exists():
             Path("register_pipe.lock").unlink()
 
+    usage_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {
+        "latency": summarize(durations),
+        "throughput": len(durations) / elapsed,
+        "cpu_user": usage_after.ru_utime - usage_before.ru_utime,
+        "cpu_sys": usage_after.ru_stime - usage_before.ru_stime,
+    }
+
+
+def placements(args):
+    """
+    Build the server and client placements of the command line options,
+    or None for those left alone.
+    """
+
+    def placement(cpus) -> Optional[Placement]:
+        options = (parse_cpus(cpus), args.fifo_priority, args.nice)
+        if all(option is None for option in options):
+            return None
+        return Placement(*options)
+
+    server_placement = ServerPlacement(
+        placement(args.registration_cpus),
+        placement(args.handler_cpus),
+        placement(args.worker_cpus),
+    )
+    if server_placement == ServerPlacement():
+        server_placement = None
+    return server_placement, placement(args.client_cpus)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--wait-strategy", choices=WaitStrategy.MODES, default="block"
+    )
+    parser.add_argument("--spin-count", type=int, default=1000)
+    parser.add_argument("--num-clients", type=int, default=5)
+    parser.add_argument(
+        "--mode", choices=Server.MODES, default=Server.THREAD_MODE
+    )
+    parser.add_argument(
+        "--transport", choices=TRANSPORTS, default=FIFO_TRANSPORT
+    )
+    parser.add_argument(
+        "--url",
+        default=None,
+        help="register pipe as a URL such as fifo://register_pipe or "
+        "zmq+ipc://register_pipe, overriding --transport",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="process requests on a pool of this many worker processes",
+    )
+    parser.add_argument(
+        "--channel-pool",
+        type=int,
+        default=None,
+        help="keep this many channels open on the server and register "
+        "clients on them",
+    )
+    parser.add_argument(
+        "--pipe-capacity",
+        type=int,
+        default=None,
+        help="kernel buffer of client pipes in bytes; any of the pipe "
+        "options makes the server write responses without blocking",
+    )
+    parser.add_argument(
+        "--max-pipe-capacity",
+        type=int,
+        default=None,
+        help="grow a full response pipe up to this many bytes",
+    )
+    parser.add_argument(
+        "--max-queued",
+        type=int,
+        default=None,
+        help="bytes of queued responses at which a client's requests are "
+        "no longer read",
+    )
+    parser.add_argument(
+        "--registration-cpus",
+        nargs="+",
+        default=None,
+        help="cores of the server's register loop or reactor, e.g. 0 or 0-1",
+    )
+    parser.add_argument(
+        "--handler-cpus",
+        nargs="+",
+        default=None,
+        help="cores of the request handler threads, one each in turn",
+    )
+    parser.add_argument(
+        "--worker-cpus",
+        nargs="+",
+        default=None,
+        help="cores of the worker processes",
+    )
+    parser.add_argument(
+        "--client-cpus",
+        nargs="+",
+        default=None,
+        help="cores of the clients, one each in turn",
+    )
+    parser.add_argument(
+        "--fifo-priority",
+        type=int,
+        default=None,
+        help="run the server and clients under SCHED_FIFO at this priority "
+        "when permitted",
+    )
+    parser.add_argument(
+        "--nice",
+        type=int,
+        default=None,
+        help="nice level of the server and clients",
+    )
+    parser.add_argument(
+        "--batch-window",
+        type=float,
+        default=None,
+        help="seconds the server collects requests of all clients to "
+        "process them in one batch",
+    )
+    parser.add_argument(
+        "--max-batch",
+        type=int,
+        default=256,
+        help="requests that fill a batch before its window is over",
+    )
+    args = parser.parse_args()
+
+    placement, client_placement = placements(args)
+
+    pipe_limits = None
+    pipe_options = (args.pipe_capacity, args.max_pipe_capacity, args.max_queued)
+    if any(option is not None for option in pipe_options):
+        pipe_limits = PipeLimits(
+            args.pipe_capacity,
+            args.max_pipe_capacity,
+            args.max_queued or PipeLimits().max_queued,
+        )
+
+    transport, register_pipe_path = args.transport, Path("register_pipe")
+    if args.url is not None:
+        transport, register_pipe_path = parse_url(args.url)
+
+    result = run(
+        num_clients=args.num_clients,
+        wait_strategy=WaitStrategy(args.wait_strategy, args.spin_count),
+        mode=args.mode,
+        transport=transport,
+        workers=args.workers,
+        register_pipe_path=register_pipe_path,
+        channel_pool=args.channel_pool,
+        pipe_limits=pipe_limits,
+        placement=placement,
+        client_placement=client_placement,
+        batch_window=args.batch_window,
+        max_batch=args.max_batch,
+    )
+    print(format_summary("request", result["latency"]))
+    print(f"throughput: {result['throughput']:.1f} req/s")
+    print(
+        f"cpu time: user {result['cpu_user']:.3f} s, "
+        f"sys {result['cpu_sys']:.3f} s"
+    )
+
 
 if __name__ == "__main__":
     main()
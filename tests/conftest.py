@@ -0,0 +1,68 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Run from the repository root, as test.py and the benchmarks do.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmark.common import running_server  # noqa: E402
+from client.registrar import Registrar  # noqa: E402
+from client.request_sender import RequestSender  # noqa: E402
+from utils.utils import new_client_id  # noqa: E402
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """
+    Create the pipes of the test in a directory of its own.
+    """
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def server(workdir):
+    """
+    Start a server in a child process, returning a function that starts
+    another one with the given start_server() options.
+    """
+    register_pipe_path = Path(f"{os.getpid()}_register_pipe")
+    servers = []
+
+    def start(**kwargs):
+        context = running_server(register_pipe_path, **kwargs)
+        context.__enter__()
+        servers.append(context)
+        return register_pipe_path
+
+    yield start
+    for context in reversed(servers):
+        context.__exit__(None, None, None)
+
+
+@pytest.fixture
+def connect():
+    """
+    Return a function registering a client and returning its sender.
+    """
+    clients = []
+
+    def connect(register_pipe_path, transport="fifo"):
+        client_id = new_client_id()
+        registrar = Registrar(client_id, register_pipe_path, transport)
+        sender = RequestSender(
+            client_id,
+            transport=transport,
+            register_pipe_path=register_pipe_path,
+        )
+        registrar.register()
+        sender.init()
+        clients.append((registrar, sender))
+        return sender
+
+    yield connect
+    for registrar, sender in clients:
+        registrar.unregister()
+        sender.close()
@@ -0,0 +1,54 @@
+import pytest
+
+from server.request_handler import RequestHandler
+
+# Doubling this value overflows the signed 64-bit response.
+TOO_LARGE = 2**62
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        dict(),
+        dict(mode="reactor"),
+        dict(workers=2),
+    ],
+    ids=["thread", "reactor", "executor"],
+)
+def test_failed_request_is_answered_with_error(server, connect, options):
+    sender = connect(server(**options))
+
+    with pytest.raises(Exception, match="Server error: .*out of range"):
+        sender.request(TOO_LARGE)
+    # The handler survives and keeps answering.
+    assert sender.request(3) == 6
+
+
+class StatefulHandler(RequestHandler):
+    """
+    A handler overriding process_request() as an ordinary method.
+    """
+
+    factor = 2
+
+    def process_request(self, data: int) -> int:
+        return data * self.factor
+
+
+@pytest.mark.parametrize(
+    "options",
+    [dict(), dict(mode="reactor"), dict(batch_window=0.0001)],
+    ids=["thread", "reactor", "batched"],
+)
+def test_instance_process_request(server, connect, options):
+    sender = connect(server(handler_cls=StatefulHandler, **options))
+
+    assert sender.request(3) == 6
+    assert list(sender.request_many([1, 2, 3])) == [2, 4, 6]
+
+
+def test_instance_process_request_on_process_pool(server, connect):
+    sender = connect(server(handler_cls=StatefulHandler, workers=1))
+
+    with pytest.raises(Exception, match="must be a static or class method"):
+        sender.request(3)
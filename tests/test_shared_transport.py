@@ -0,0 +1,59 @@
+import time
+from multiprocessing import Event, Process
+
+from client.registrar import Registrar
+from client.request_sender import RequestSender
+from utils.pipe_writer import PipeLimits
+from utils.utils import SHARED_TRANSPORT, new_client_id
+
+
+def flood_without_reading(register_pipe_path, sent, done) -> None:
+    """
+    Send batch requests whose responses overflow the return pipe, and never
+    read them.
+    """
+    client_id = new_client_id()
+    registrar = Registrar(client_id, register_pipe_path, SHARED_TRANSPORT)
+    sender = RequestSender(
+        client_id,
+        transport=SHARED_TRANSPORT,
+        register_pipe_path=register_pipe_path,
+    )
+    registrar.register()
+    for _ in range(32):
+        sender.submit_many(range(8192))
+    sent.set()
+    done.wait(30)
+    registrar.unregister()
+    sender.close()
+
+
+def test_stalled_process_does_not_block_others(server, connect):
+    register_pipe_path = server(
+        transport=SHARED_TRANSPORT,
+        pipe_limits=PipeLimits(max_queued=256 * 1024),
+    )
+    sent, done = Event(), Event()
+    flooder = Process(
+        target=flood_without_reading, args=(register_pipe_path, sent, done)
+    )
+    flooder.start()
+    try:
+        assert sent.wait(30)
+        sender = connect(register_pipe_path, SHARED_TRANSPORT)
+        st = time.monotonic()
+        for value in range(100):
+            assert sender.submit(value).result(timeout=5) == value * 2
+        assert time.monotonic() - st < 5
+    finally:
+        done.set()
+        flooder.join()
+
+
+def test_many_clients_register_right_after_start(server, connect):
+    register_pipe_path = server(transport=SHARED_TRANSPORT)
+
+    senders = [connect(register_pipe_path, SHARED_TRANSPORT) for _ in range(8)]
+    assert [sender.request(i) for i, sender in enumerate(senders)] == [
+        i * 2 for i in range(8)
+    ]
@@ -0,0 +1,34 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+
+def test_request_array_round_trip(server, connect):
+    sender = connect(server())
+
+    data = np.arange(1000, dtype=np.int64)
+    lease = sender.request_array(data)
+    try:
+        np.testing.assert_array_equal(lease.array.view(np.int64), data * 2)
+    finally:
+        lease.release()
+
+
+def test_request_array_from_pool_without_copy(server, connect):
+    sender = connect(server())
+
+    _, data = sender.array_pool.ndarray((64, 8), np.float64)
+    data[...] = np.arange(512).reshape(64, 8)
+    with sender.request_array(data) as result:
+        np.testing.assert_array_equal(
+            result.view(np.float64).reshape(64, 8), data * 2
+        )
+
+
+def test_request_array_result_too_large(server, connect):
+    sender = connect(server())
+
+    # Result segments are at least SegmentPool.MIN_SEGMENT_SIZE bytes.
+    data = np.arange(1024, dtype=np.int64)
+    with pytest.raises(Exception, match="does not fit"):
+        sender.request_array(data, out_nbytes=8)
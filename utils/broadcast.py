@@ -0,0 +1,150 @@
+import collections
+import itertools
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from multiprocessing.shared_memory import SharedMemory
+from typing import Deque, Dict, Iterator, Optional
+
+from utils.shm_ring import attach_shared_memory, create_shared_memory
+
+# Broadcast notice header: where the payload is, version, payload size.
+NOTICE = struct.Struct("<BQQ")
+
+# The payload follows the header / lives in the shared memory segment whose
+# name follows the header.
+INLINE = 0
+SHARED = 1
+
+
+class Publisher:
+    """
+    A class publishing broadcast payloads once for every client.
+
+    publish() returns the notice sent to each client. A payload smaller than
+    `inline_limit` travels in the notice. A larger one is written once into
+    a shared memory segment of its own and the notice only names it, so the
+    bytes written per client stay constant however large the payload is.
+
+    The segments of the last `keep` broadcasts are kept; a client that reads
+    a notice after its segment was dropped misses that broadcast.
+    """
+
+    def __init__(
+        self,
+        prefix: Optional[str] = None,
+        inline_limit: int = 4096,
+        keep: int = 4,
+    ) -> None:
+        """
+        Initialize the Publisher object.
+
+        Args:
+            prefix (str, optional): Prefix of the segment names.
+                Defaults to "<pid>_broadcast".
+            inline_limit (int): Payloads of at least this many bytes go
+                through shared memory. Defaults to 4096.
+            keep (int): Segments of recent broadcasts kept for clients
+                still to read them. Defaults to 4.
+        """
+        if keep <= 0:
+            raise ValueError(f"keep must be positive: {keep}")
+
+        self.prefix = prefix or f"{os.getpid()}_broadcast"
+        self.inline_limit = inline_limit
+        self.keep = keep
+
+        self.lock = threading.Lock()
+        self.versions = itertools.count(1)
+        self.segments: Deque[SharedMemory] = collections.deque()
+
+        self.published = 0
+        self.published_bytes = 0
+        self.shared = 0
+
+    def publish(self, payload: bytes) -> bytes:
+        """
+        Publish `payload` as the next version.
+
+        Returns:
+            The notice to send to every client.
+        """
+        size = memoryview(payload).nbytes
+        with self.lock:
+            version = next(self.versions)
+            self.published += 1
+            self.published_bytes += size
+            if size < self.inline_limit:
+                return NOTICE.pack(INLINE, version, size) + bytes(payload)
+
+            self.shared += 1
+            shm = create_shared_memory(
+                f"{self.prefix}_{version}", max(size, 1)
+            )
+            shm.buf[:size] = payload
+            self.segments.append(shm)
+            while len(self.segments) > self.keep:
+                self.drop(self.segments.popleft())
+        return NOTICE.pack(SHARED, version, size) + shm.name.encode()
+
+    def drop(self, shm: SharedMemory) -> None:
+        """
+        Close and unlink the segment of an old broadcast.
+        """
+        shm.close()
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    def close(self) -> None:
+        """
+        Unlink the segments still kept.
+        """
+        with self.lock:
+            while self.segments:
+                self.drop(self.segments.popleft())
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Return the number of broadcasts, their bytes, how many went
+        through shared memory and how many segments are kept.
+        """
+        with self.lock:
+            return {
+                "published": self.published,
+                "bytes": self.published_bytes,
+                "shared": self.shared,
+                "segments": len(self.segments),
+            }
+
+
+@contextmanager
+def open_notice(notice: bytes) -> Iterator:
+    """
+    Yield the version and payload of a broadcast notice.
+
+    The payload is a memoryview, of the shared memory segment for a large
+    broadcast, and is only valid inside the block.
+
+    Raises:
+        FileNotFoundError: If the segment was dropped by the publisher.
+    """
+    kind, version, size = NOTICE.unpack_from(notice)
+    rest = memoryview(notice)[NOTICE.size :]
+    if kind == INLINE:
+        yield version, rest[:size]
+        return
+
+    shm = attach_shared_memory(bytes(rest).decode())
+    payload = shm.buf[:size]
+    try:
+        yield version, payload
+    finally:
+        try:
+            payload.release()
+            shm.close()
+        except BufferError:
+            # The subscriber kept a view; the mapping goes with it.
+            pass
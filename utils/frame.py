@@ -0,0 +1,137 @@
+import struct
+from array import array
+from typing import Iterable, List, NamedTuple
+
+# Frame header: payload length, request id, opcode, timestamp (ns).
+HEADER = struct.Struct("<IIBq")
+
+# Payload of a single integer request or response.
+VALUE = struct.Struct("<q")
+
+# Payload of a batch request or response: native-endian int64 values.
+BATCH_TYPECODE = "q"
+
+# Chunks a stream may be sent ahead of the client, in front of the values of
+# a stream request, and the chunks granted by a credit frame.
+CREDIT = struct.Struct("<I")
+
+OP_INIT = 0
+OP_REQUEST = 1
+OP_RESPONSE = 2
+OP_ERROR = 3
+OP_BATCH = 4
+OP_ARRAY = 5
+# A stream request is answered with chunk frames ending with an end frame,
+# or with an error frame. The client grants more chunks with credit frames
+# and stops the stream with a cancel frame.
+OP_STREAM = 6
+OP_CHUNK = 7
+OP_END = 8
+OP_CREDIT = 9
+OP_CANCEL = 10
+# Pushed by the server to every client, with request id 0; the payload is a
+# notice of utils/broadcast.py.
+OP_BROADCAST = 11
+
+
+class Frame(NamedTuple):
+    """
+    A decoded frame.
+
+    `payload` is a memoryview rather than bytes when the transport received
+    it without copying.
+    """
+
+    opcode: int
+    request_id: int
+    timestamp: int
+    payload: bytes
+
+
+def pack_frame(
+    opcode: int, payload: bytes = b"", request_id: int = 0, timestamp: int = 0
+) -> bytes:
+    """
+    Pack a header and a payload into one frame.
+    """
+    return pack_header(opcode, payload, request_id, timestamp) + payload
+
+
+def pack_header(
+    opcode: int, payload: bytes = b"", request_id: int = 0, timestamp: int = 0
+) -> bytes:
+    """
+    Pack the header of a frame, for transports sending the payload apart.
+    """
+    return HEADER.pack(
+        memoryview(payload).nbytes, request_id, opcode, timestamp
+    )
+
+
+def unpack_header(header: bytes, payload: bytes) -> Frame:
+    """
+    Build the frame of a header and a payload received apart.
+    """
+    _, request_id, opcode, timestamp = HEADER.unpack(header)
+    return Frame(opcode, request_id, timestamp, payload)
+
+
+def pack_values(values: Iterable[int]) -> bytes:
+    """
+    Pack integers into a batch payload.
+    """
+    return array(BATCH_TYPECODE, values).tobytes()
+
+
+def pack_stream_request(values: Iterable[int], window: int) -> bytes:
+    """
+    Pack the payload of a stream request allowing `window` chunks ahead.
+    """
+    return CREDIT.pack(window) + pack_values(values)
+
+
+def unpack_values(payload: bytes) -> array:
+    """
+    Unpack a batch payload into an array of integers.
+    """
+    values = array(BATCH_TYPECODE)
+    values.frombytes(payload)
+    return values
+
+
+class FrameDecoder:
+    """
+    A class to reassemble frames from a byte stream.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize the FrameDecoder object.
+        """
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[Frame]:
+        """
+        Add bytes read from the stream and return the completed frames.
+
+        An incomplete frame is kept until the rest of it arrives.
+        """
+        self.buffer += data
+
+        frames = []
+        pos = 0
+        end = len(self.buffer)
+        while end - pos >= HEADER.size:
+            length, request_id, opcode, timestamp = HEADER.unpack_from(
+                self.buffer, pos
+            )
+            start = pos + HEADER.size
+            if end - start < length:
+                break
+            payload = bytes(self.buffer[start : start + length])
+            frames.append(Frame(opcode, request_id, timestamp, payload))
+            pos = start + length
+
+        if pos:
+            del self.buffer[:pos]
+        return frames
@@ -0,0 +1,105 @@
+from array import array
+from typing import Dict, Iterable
+
+# Every power of two is split into 2 ** SUB_BUCKET_BITS buckets, so a value is
+# reported within about 6% of what was recorded.
+SUB_BUCKET_BITS = 4
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+# Values below this get a bucket of their own.
+LINEAR_LIMIT = SUB_BUCKETS << 1
+
+NUM_BUCKETS = (64 - SUB_BUCKET_BITS) * SUB_BUCKETS
+
+
+def bucket_index(value: int) -> int:
+    """
+    Return the bucket of a non-negative integer value.
+    """
+    if value < LINEAR_LIMIT:
+        return value if value > 0 else 0
+    shift = value.bit_length() - SUB_BUCKET_BITS - 1
+    return min(shift * SUB_BUCKETS + (value >> shift), NUM_BUCKETS - 1)
+
+
+def bucket_upper_bound(index: int) -> int:
+    """
+    Return the largest value that falls into bucket `index`.
+    """
+    if index < LINEAR_LIMIT:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return ((index - shift * SUB_BUCKETS + 1) << shift) - 1
+
+
+class Histogram:
+    """
+    A class counting integer values, such as latencies in nanoseconds, in
+    logarithmic buckets.
+
+    The buckets are allocated once, so record() costs a bit_length() and an
+    increment. A histogram must only be recorded from one thread at a time;
+    merge() combines histograms recorded on different threads.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize the Histogram object.
+        """
+        self.counts = array("Q", bytes(8 * NUM_BUCKETS))
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, value: int) -> None:
+        """
+        Count one value.
+        """
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "Histogram") -> None:
+        """
+        Add the counts of `other` to this histogram.
+        """
+        counts = self.counts
+        for i, n in enumerate(other.counts):
+            if n:
+                counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def percentile(self, pct: float) -> int:
+        """
+        Return the upper bound of the bucket holding the `pct` percentile.
+        """
+        if self.count == 0:
+            return 0
+        rank = max(int(round(pct / 100 * self.count)), 1)
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bucket_upper_bound(i), self.max)
+        return self.max
+
+    def summary(
+        self, scale: float = 1e-3, pcts: Iterable[float] = (50, 90, 99)
+    ) -> Dict[str, float]:
+        """
+        Summarize the histogram, multiplying values by `scale`.
+
+        The default scale turns nanoseconds into microseconds.
+        """
+        summary = {
+            "count": self.count,
+            "mean": self.total / self.count * scale if self.count else 0.0,
+        }
+        for pct in pcts:
+            summary[f"p{pct:g}"] = self.percentile(pct) * scale
+        summary["max"] = self.max * scale
+        return summary
@@ -1,7 +1,40 @@
 import os
+import select
 import time
 from pathlib import Path
-from typing import List
+from typing import Callable, List, Optional
+
+from utils.frame import Frame, FrameDecoder
+from utils.utils import set_pipe_capacity
+
+
+class WaitStrategy:
+    """
+    A class describing how a PIPEReader waits for data.
+
+    - "block": sleep in poll() until the pipe is readable.
+    - "spin_then_block": retry the read `spin_count` times, then block.
+    - "spin": retry the read until data arrives, never sleeping.
+        Only useful on cores dedicated to the reader.
+    """
+
+    BLOCK = "block"
+    SPIN_THEN_BLOCK = "spin_then_block"
+    SPIN = "spin"
+
+    MODES = (BLOCK, SPIN_THEN_BLOCK, SPIN)
+
+    def __init__(self, mode: str = BLOCK, spin_count: int = 1000) -> None:
+        """
+        Initialize the WaitStrategy object.
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown wait strategy: {mode}")
+        self.mode = mode
+        self.spin_count = spin_count
+
+    def __repr__(self) -> str:
+        return f"WaitStrategy({self.mode!r}, spin_count={self.spin_count})"
 
 
 class PIPEReader:
@@ -9,37 +42,163 @@ class PIPEReader:
     A class to read data from a named pipe.
     """
 
-    def __init__(self, pipe_path: Path):
+    # Read up to the default pipe capacity at once.
+    READ_SIZE = 65536
+
+    def __init__(
+        self, pipe_path: Path, wait_strategy: Optional[WaitStrategy] = None
+    ):
         """
         Initialize the PIPEReader object.
         """
         self.pipe_path = pipe_path
+        self.wait_strategy = wait_strategy or WaitStrategy()
+
+        self.closed = False
+        self.partial = b""
+        self.decoder = FrameDecoder()
+
         self.pipe_fd = os.open(self.pipe_path, os.O_RDONLY | os.O_NONBLOCK)
+        # Hold a write end ourselves so the pipe never reports EOF/POLLHUP
+        # while no client is connected, which would make poll() spin.
+        self.keepalive_fd = os.open(
+            self.pipe_path, os.O_WRONLY | os.O_NONBLOCK
+        )
 
-    def read(self, busy_wait=True) -> List[str]:
+        self.poller = select.poll()
+        self.poller.register(self.pipe_fd, select.POLLIN)
+
+    def fileno(self) -> int:
+        """
+        Return the read descriptor of the pipe.
+        """
+        return self.pipe_fd
+
+    def set_capacity(self, size: int) -> int:
+        """
+        Resize the kernel buffer of the pipe, see set_pipe_capacity().
+
+        Returns:
+            The capacity of the pipe.
+        """
+        return set_pipe_capacity(self.pipe_fd, size)
+
+    def read(self, busy_wait=True, timeout: Optional[float] = None) -> List[str]:
         """
         Read data from the pipe.
 
         Args:
-            busy_wait (bool, optional): If True, keep trying to read the pipe until data is available.
+            busy_wait (bool, optional): If True, wait for data according to the wait strategy.
+                If False, return immediately if there is no data. Defaults to True.
+            timeout (float, optional): Maximum time to wait in seconds.
+                None waits forever. Defaults to None.
+
+        Returns:
+            List[str]: The lines read from the pipe.
+        """
+        return self._wait(self._read_lines, busy_wait, timeout)
+
+    def read_frames(
+        self, busy_wait=True, timeout: Optional[float] = None
+    ) -> List[Frame]:
+        """
+        Read length-prefixed frames from the pipe.
+
+        Frames split across reads are reassembled, so a frame of any size
+        is returned only once it is complete.
+
+        Args:
+            busy_wait (bool, optional): If True, wait for data according to the wait strategy.
                 If False, return immediately if there is no data. Defaults to True.
+            timeout (float, optional): Maximum time to wait in seconds.
+                None waits forever. Defaults to None.
 
         Returns:
-            str: The data read from the pipe.
+            List[Frame]: The frames read from the pipe.
         """
+        return self._wait(self._read_frames, busy_wait, timeout)
+
+    def _wait(
+        self,
+        fetch: Callable[[], list],
+        busy_wait: bool,
+        timeout: Optional[float],
+    ) -> list:
+        """
+        Call `fetch` until it returns something, waiting as configured.
+        """
+        items = fetch()
+        if items or not busy_wait:
+            return items
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        mode = self.wait_strategy.mode
+
+        spins = 0
+        while mode == WaitStrategy.SPIN or (
+            mode == WaitStrategy.SPIN_THEN_BLOCK
+            and spins < self.wait_strategy.spin_count
+        ):
+            items = fetch()
+            if items:
+                return items
+            if deadline is not None and time.monotonic() >= deadline:
+                return []
+            spins += 1
+
         while True:
-            time.sleep(1e-6)
+            if deadline is None:
+                poll_timeout = None
+            else:
+                poll_timeout = max(deadline - time.monotonic(), 0) * 1000
+            ready = self.poller.poll(poll_timeout)
+            if ready:
+                items = fetch()
+                if items:
+                    return items
+            if deadline is not None and time.monotonic() >= deadline:
+                return []
 
-            response = ""
-            try:
-                response = os.read(self.pipe_fd, 512).decode().strip()
-                if response:
-                    break
+    def _read_lines(self) -> List[str]:
+        """
+        Read the complete lines available in the pipe without waiting.
 
-                if not busy_wait:
-                    break
+        A trailing incomplete line is kept until the rest of it arrives.
+        """
+        data = self._read_nonblocking()
+        if not data:
+            return []
+        lines = (self.partial + data).split(b"\n")
+        self.partial = lines.pop()
+        return [line.decode() for line in lines if line]
 
-            except Exception as e:
-                pass
+    def _read_frames(self) -> List[Frame]:
+        """
+        Read the complete frames available in the pipe without waiting.
+        """
+        data = self._read_nonblocking()
+        if not data:
+            return []
+        return self.decoder.feed(data)
 
-        return response.splitlines()
+    def _read_nonblocking(self) -> bytes:
+        """
+        Read whatever is in the pipe without waiting.
+        """
+        try:
+            return os.read(self.pipe_fd, self.READ_SIZE)
+        except BlockingIOError:
+            return b""
+
+    def close(self):
+        """
+        Close the pipe descriptors.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        for fd in (self.pipe_fd, self.keepalive_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
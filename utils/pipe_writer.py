@@ -1,21 +1,274 @@
+import collections
+import errno
+import os
+import select
 from pathlib import Path
+from typing import NamedTuple, Optional
+
+from utils.frame import pack_frame
+from utils.utils import pipe_capacity, set_pipe_capacity
+
+
+class PipeLimits(NamedTuple):
+    """
+    How the server writes to a client that does not keep up.
+
+    - capacity: kernel buffer of the client's pipes, set once the server
+      opens them. None keeps the kernel default (64 KiB).
+    - max_capacity: a full response pipe is grown, doubling, up to this
+      size before responses are queued. None never grows it.
+    - max_queued: bytes of queued responses at which the server stops
+      reading the client's requests until the client catches up.
+    """
+
+    capacity: Optional[int] = None
+    max_capacity: Optional[int] = None
+    max_queued: int = 1024 * 1024
 
 
 class PIPEWriter:
     """
     A class to write data to a named pipe.
+
+    A persistent writer can be made non-blocking with limit(): whatever does
+    not fit in the pipe is queued and written by flush() once the reader
+    made room, so one slow reader never blocks the writing thread.
     """
 
-    def __init__(self, pipe_path: Path):
+    # Writers created by subclasses without calling __init__ never queue.
+    nonblocking = False
+    queued = 0
+
+    def __init__(self, pipe_path: Path, persistent: bool = False):
         """
         Initialize the PIPEWriter object.
+
+        Args:
+            pipe_path (Path): The path to the named pipe.
+            persistent (bool, optional): If True, open the pipe on the first write
+                and keep the descriptor until close() is called.
+                If False, open and close the pipe for every message. Defaults to False.
         """
         self.pipe_path = pipe_path
+        self.persistent = persistent
+
+        self.pipe_fd = None
+
+        self.limits = None
+        self.capacity = None
+        # Data waiting for room in the pipe, as memoryviews.
+        self.queue = collections.deque()
+        self.queued = 0
+        # Writes that found the pipe full.
+        self.full_events = 0
 
     def write(self, message: str):
         """
         Write data to the pipe.
         """
-        with open(self.pipe_path, mode="wb") as fifo:
-            fifo.write((message + "\n").encode())
-            fifo.flush()
+        self.write_bytes((message + "\n").encode())
+
+    def write_frame(
+        self,
+        opcode: int,
+        payload: bytes = b"",
+        request_id: int = 0,
+        timestamp: int = 0,
+    ):
+        """
+        Write one frame to the pipe.
+
+        `payload` may be any bytes-like object. Transports that can send it
+        without copying it into the frame override this.
+        """
+        self.write_bytes(pack_frame(opcode, payload, request_id, timestamp))
+
+    def write_bytes(self, data: bytes):
+        """
+        Write raw bytes, such as a packed frame, to the pipe.
+        """
+        if not self.persistent:
+            with open(self.pipe_path, mode="wb") as fifo:
+                fifo.write(data)
+                fifo.flush()
+            return
+
+        if self.nonblocking:
+            self._open()
+            view = memoryview(data).cast("B")
+            if view:
+                self.queue.append(view)
+                self.queued += len(view)
+            self.flush()
+            return
+
+        try:
+            self._write_all(data)
+        except OSError as e:
+            if e.errno not in (errno.EPIPE, errno.ENXIO):
+                raise
+            # The reader went away, reopen the pipe and try once more.
+            self.close()
+            self._write_all(data)
+
+    def _write_all(self, data: bytes) -> None:
+        """
+        Write all bytes to the persistent descriptor, opening it if needed.
+        """
+        self._open()
+
+        view = memoryview(data)
+        while view:
+            written = os.write(self.pipe_fd, view)
+            view = view[written:]
+
+    def _open(self) -> None:
+        if self.pipe_fd is not None:
+            return
+        self.pipe_fd = os.open(self.pipe_path, os.O_WRONLY)
+        self._apply_limits()
+
+    def _apply_limits(self) -> None:
+        if self.limits is None:
+            return
+        os.set_blocking(self.pipe_fd, False)
+        if self.limits.capacity is not None:
+            self.capacity = set_pipe_capacity(
+                self.pipe_fd, self.limits.capacity
+            )
+
+    def limit(self, limits: PipeLimits) -> None:
+        """
+        Make the persistent writer non-blocking and apply `limits` to the
+        pipe, now if it is open or else once it is.
+        """
+        self.limits = limits
+        self.nonblocking = True
+        if self.pipe_fd is not None:
+            self._apply_limits()
+
+    @property
+    def backlogged(self) -> bool:
+        """
+        Whether the queued data reached the limit, so whoever produces it
+        should wait for the reader.
+        """
+        return self.limits is not None and self.queued >= self.limits.max_queued
+
+    def flush(self) -> bool:
+        """
+        Write as much queued data as the pipe takes without waiting, growing
+        a full pipe up to the limit first.
+
+        If the reader is gone, the queued data is dropped.
+
+        Returns:
+            Whether the queue is empty.
+        """
+        while self.queue:
+            try:
+                written = os.write(self.pipe_fd, self.queue[0])
+            except BlockingIOError:
+                if self._grow():
+                    continue
+                self.full_events += 1
+                break
+            except BrokenPipeError:
+                self.discard()
+                break
+
+            self.queued -= written
+            if written == len(self.queue[0]):
+                self.queue.popleft()
+            else:
+                self.queue[0] = self.queue[0][written:]
+        return not self.queue
+
+    def _grow(self) -> bool:
+        """
+        Double the capacity of the pipe within the limit.
+
+        Returns:
+            Whether the pipe got larger.
+        """
+        max_capacity = self.limits.max_capacity
+        if max_capacity is None:
+            return False
+        if self.capacity is None:
+            self.capacity = pipe_capacity(self.pipe_fd)
+        if self.capacity >= max_capacity:
+            return False
+        capacity = set_pipe_capacity(
+            self.pipe_fd, min(self.capacity * 2, max_capacity)
+        )
+        grown = capacity > self.capacity
+        self.capacity = capacity
+        return grown
+
+    def wait_writable(self, timeout: Optional[float]) -> bool:
+        """
+        Wait until the pipe has room or `timeout` expires.
+
+        Returns:
+            Whether the pipe has room.
+        """
+        poller = select.poll()
+        poller.register(self.pipe_fd, select.POLLOUT)
+        return bool(
+            poller.poll(None if timeout is None else timeout * 1000)
+        )
+
+    def discard(self) -> None:
+        """
+        Drop the queued data.
+        """
+        self.queue.clear()
+        self.queued = 0
+
+    def open_if_read(self) -> None:
+        """
+        Open the persistent descriptor now, failing with ENXIO instead of
+        waiting when nobody reads the pipe.
+        """
+        if self.pipe_fd is None:
+            self.pipe_fd = os.open(
+                self.pipe_path, os.O_WRONLY | os.O_NONBLOCK
+            )
+            os.set_blocking(self.pipe_fd, True)
+            self._apply_limits()
+
+    def preopen(self) -> None:
+        """
+        Open the persistent descriptor now, read-write, so opening does not
+        wait for a reader and writes do not fail while there is none. For
+        pipes the server keeps open across clients.
+        """
+        if self.pipe_fd is None:
+            self.pipe_fd = os.open(self.pipe_path, os.O_RDWR)
+            self._apply_limits()
+
+    def drain(self) -> None:
+        """
+        Discard what nobody read from a pipe opened by preopen().
+        """
+        self.discard()
+        os.set_blocking(self.pipe_fd, False)
+        try:
+            while os.read(self.pipe_fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        finally:
+            os.set_blocking(self.pipe_fd, not self.nonblocking)
+
+    def close(self):
+        """
+        Close the persistent descriptor if it is open, dropping queued data.
+        """
+        self.discard()
+        if self.pipe_fd is not None:
+            try:
+                os.close(self.pipe_fd)
+            except OSError:
+                pass
+            self.pipe_fd = None
@@ -0,0 +1,123 @@
+import os
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional
+
+
+class Placement(NamedTuple):
+    """
+    Where and how a thread runs.
+
+    - cpus: cores the thread may run on. None leaves the affinity alone.
+    - fifo_priority: run under SCHED_FIFO at this priority (1-99), which
+      needs CAP_SYS_NICE or an RLIMIT_RTPRIO allowing it. None keeps the
+      default scheduler.
+    - nice: nice level of the thread under the default scheduler. Lowering
+      it below 0 needs CAP_SYS_NICE.
+
+    On Linux all three apply to the calling thread only, so every thread
+    applies its own placement.
+    """
+
+    cpus: Optional[FrozenSet[int]] = None
+    fifo_priority: Optional[int] = None
+    nice: Optional[int] = None
+
+    def apply(self) -> Dict:
+        """
+        Apply the placement to the calling thread. Whatever is not
+        permitted is skipped.
+
+        Returns:
+            The placement the thread actually has, see current_placement(),
+            with the reasons of what could not be applied under `errors`.
+        """
+        errors = []
+        if self.cpus is not None:
+            try:
+                os.sched_setaffinity(0, self.cpus)
+            except OSError as e:
+                errors.append(f"affinity {sorted(self.cpus)}: {e.strerror}")
+
+        if self.fifo_priority is not None:
+            try:
+                os.sched_setscheduler(
+                    0, os.SCHED_FIFO, os.sched_param(self.fifo_priority)
+                )
+            except OSError as e:
+                errors.append(
+                    f"SCHED_FIFO {self.fifo_priority}: {e.strerror}"
+                )
+
+        if self.nice is not None:
+            try:
+                os.setpriority(os.PRIO_PROCESS, 0, self.nice)
+            except OSError as e:
+                errors.append(f"nice {self.nice}: {e.strerror}")
+
+        report = current_placement()
+        report["errors"] = errors
+        return report
+
+    def pinned(self, index: int) -> "Placement":
+        """
+        Return this placement restricted to one of its cores, chosen in turn
+        by `index`, so threads are spread over the cores one each.
+        """
+        if not self.cpus:
+            return self
+        cpus = sorted(self.cpus)
+        return self._replace(cpus=frozenset([cpus[index % len(cpus)]]))
+
+
+class ServerPlacement(NamedTuple):
+    """
+    Placement of the threads of a server.
+
+    - registration: the thread reading the register pipe, or the reactor
+      thread in reactor mode, which then serves every client as well.
+    - handlers: the thread of each request handler in thread mode. With
+      `spread`, each handler is pinned to one of the cores in turn.
+    - workers: the executor's worker processes.
+    """
+
+    registration: Optional[Placement] = None
+    handlers: Optional[Placement] = None
+    workers: Optional[Placement] = None
+    spread: bool = True
+
+    def handler(self, index: int) -> Optional[Placement]:
+        """
+        Return the placement of the `index`-th request handler.
+        """
+        if self.handlers is None or not self.spread:
+            return self.handlers
+        return self.handlers.pinned(index)
+
+
+def current_placement() -> Dict:
+    """
+    Describe where and how the calling thread runs.
+    """
+    policy = os.sched_getscheduler(0)
+    return {
+        "cpus": sorted(os.sched_getaffinity(0)),
+        "policy": "fifo" if policy == os.SCHED_FIFO else "other",
+        "priority": os.sched_getparam(0).sched_priority,
+        "nice": os.getpriority(os.PRIO_PROCESS, 0),
+    }
+
+
+def parse_cpus(values: Optional[Iterable[str]]) -> Optional[FrozenSet[int]]:
+    """
+    Parse core lists such as `0 2-3` or `0,2,3` into a set of cores.
+    """
+    if not values:
+        return None
+    cpus: List[int] = []
+    for value in values:
+        for part in value.split(","):
+            if "-" in part:
+                first, last = part.split("-")
+                cpus.extend(range(int(first), int(last) + 1))
+            elif part:
+                cpus.append(int(part))
+    return frozenset(cpus)
@@ -0,0 +1,268 @@
+import os
+import select
+import socket
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils.frame import FrameDecoder
+from utils.pipe_reader import PIPEReader, WaitStrategy
+from utils.pipe_writer import PIPEWriter
+
+# Largest message sent at once; bigger writes are split, and the frame
+# decoder puts frames back together on the other side.
+MAX_MESSAGE = 65536
+
+# First message on a connection that carries a client's requests, and the
+# listener's answer once the connection is ready to be opened by the server.
+CHANNEL_HELLO = b"channel "
+CHANNEL_ACK = b"ok"
+
+
+def unix_address(path: Path) -> str:
+    """
+    Return the socket address of `path`.
+
+    A path starting with "@" names a socket in the abstract namespace, which
+    leaves no file behind.
+    """
+    path = str(path)
+    if path.startswith("@"):
+        return "\0" + path[1:]
+    return path
+
+
+def connect(path: Path) -> socket.socket:
+    """
+    Connect to the SOCK_SEQPACKET socket listening at `path`.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    sock.connect(unix_address(path))
+    return sock
+
+
+def connect_channel(path: Path, client_id: int) -> socket.socket:
+    """
+    Connect the channel of `client_id` to the socket listening at `path`
+    and wait until the server has accepted it.
+    """
+    sock = connect(path)
+    sock.send(CHANNEL_HELLO + str(client_id).encode())
+    if sock.recv(len(CHANNEL_ACK)) != CHANNEL_ACK:
+        sock.close()
+        raise ConnectionError(f"Channel of {client_id} was not accepted.")
+    return sock
+
+
+class SeqpacketReader(PIPEReader):
+    """
+    A class to read data from a connected SOCK_SEQPACKET socket.
+
+    Once the peer has closed the connection, the socket is no longer polled,
+    so a reader waiting with a timeout sleeps instead of waking up on the
+    hangup again and again.
+    """
+
+    def __init__(
+        self,
+        sock: socket.socket,
+        wait_strategy: Optional[WaitStrategy] = None,
+    ):
+        """
+        Initialize the SeqpacketReader object.
+        """
+        self.sock = sock
+        self.wait_strategy = wait_strategy or WaitStrategy()
+
+        self.closed = False
+        self.eof = False
+        self.partial = b""
+        self.decoder = FrameDecoder()
+
+        self.poller = select.poll()
+        self.poller.register(sock.fileno(), select.POLLIN)
+
+    def fileno(self) -> int:
+        """
+        Return the descriptor of the socket.
+        """
+        return self.sock.fileno()
+
+    def _read_nonblocking(self) -> bytes:
+        """
+        Read every message waiting on the socket without waiting.
+        """
+        chunks = []
+        while not self.eof:
+            try:
+                chunk = self.sock.recv(MAX_MESSAGE, socket.MSG_DONTWAIT)
+            except BlockingIOError:
+                break
+            except ConnectionResetError:
+                chunk = b""
+            if not chunk:
+                self.eof = True
+                self.poller.unregister(self.sock.fileno())
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def close(self):
+        """
+        Close the socket.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.sock.close()
+
+
+class SeqpacketWriter(PIPEWriter):
+    """
+    A class to write data to a connected SOCK_SEQPACKET socket.
+    """
+
+    def __init__(self, sock: socket.socket):
+        """
+        Initialize the SeqpacketWriter object.
+        """
+        self.sock = sock
+        self.persistent = True
+
+    def write_bytes(self, data: bytes):
+        """
+        Send raw bytes, such as a packed frame, in messages of at most
+        MAX_MESSAGE bytes.
+        """
+        view = memoryview(data)
+        for start in range(0, len(view), MAX_MESSAGE):
+            self.sock.send(view[start : start + MAX_MESSAGE])
+
+    def close(self):
+        """
+        Close the socket.
+        """
+        self.sock.close()
+
+
+class SeqpacketListener(PIPEReader):
+    """
+    A class to accept connections on a listening SOCK_SEQPACKET socket and
+    read the register messages sent on them.
+
+    A connection whose first message is `channel <client id>` carries that
+    client's requests; it is put in `channels` for the request handler
+    instead of being read here. Any other connection sends register lines.
+
+    The listening socket and every register connection live in one epoll
+    set, whose descriptor is what fileno() returns and what is polled, so a
+    reactor needs to watch a single descriptor.
+    """
+
+    BACKLOG = 128
+
+    def __init__(self, path: Path, channels: Dict[int, socket.socket]):
+        """
+        Initialize the SeqpacketListener object.
+        """
+        self.pipe_path = path
+        self.wait_strategy = WaitStrategy()
+        self.channels = channels
+
+        self.closed = False
+
+        address = unix_address(path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        if address.startswith("\0"):
+            self.sock.bind(address)
+            self.sock.listen(self.BACKLOG)
+        else:
+            # Bind under a temporary name and move it into place once it
+            # listens, so a client seeing the path can always connect.
+            tmp_address = f"{address}.{os.getpid()}.tmp"
+            self.sock.bind(tmp_address)
+            self.sock.listen(self.BACKLOG)
+            os.replace(tmp_address, address)
+        self.sock.setblocking(False)
+
+        # Descriptor -> (connection, incomplete trailing line or None while
+        # the first message has not arrived).
+        self.connections: Dict[int, list] = dict()
+
+        self.epoll = select.epoll()
+        self.epoll.register(self.sock.fileno(), select.EPOLLIN)
+        self.poller = select.poll()
+        self.poller.register(self.epoll.fileno(), select.POLLIN)
+
+    def fileno(self) -> int:
+        """
+        Return the descriptor of the epoll set.
+        """
+        return self.epoll.fileno()
+
+    def _read_lines(self) -> List[str]:
+        """
+        Accept new connections and read the register lines available on
+        all of them without waiting.
+        """
+        lines = []
+        for fd, _ in self.epoll.poll(0):
+            if fd == self.sock.fileno():
+                self._accept()
+            else:
+                lines.extend(self._read_connection(fd))
+        return lines
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except BlockingIOError:
+                return
+            self.connections[conn.fileno()] = [conn, None]
+            self.epoll.register(conn.fileno(), select.EPOLLIN)
+
+    def _read_connection(self, fd: int) -> List[str]:
+        conn, partial = self.connections[fd]
+        try:
+            data = conn.recv(MAX_MESSAGE, socket.MSG_DONTWAIT)
+        except BlockingIOError:
+            return []
+        except ConnectionResetError:
+            data = b""
+
+        if partial is None and data.startswith(CHANNEL_HELLO):
+            # Hand the connection over to the request handler. The client
+            # waits for the ack before registering, so the connection is
+            # always here when its register line is read.
+            self._forget(fd)
+            self.channels[int(data[len(CHANNEL_HELLO) :])] = conn
+            conn.send(CHANNEL_ACK)
+            return []
+        if not data:
+            self._forget(fd)
+            conn.close()
+            return []
+
+        lines = ((partial or b"") + data).split(b"\n")
+        self.connections[fd][1] = lines.pop()
+        return [line.decode() for line in lines if line]
+
+    def _forget(self, fd: int) -> None:
+        self.epoll.unregister(fd)
+        del self.connections[fd]
+
+    def close(self):
+        """
+        Close the listening socket and the register connections.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        for conn, _ in self.connections.values():
+            conn.close()
+        self.connections.clear()
+        self.epoll.close()
+        self.sock.close()
+        address = unix_address(self.pipe_path)
+        if not address.startswith("\0") and os.path.exists(address):
+            os.remove(address)
@@ -0,0 +1,582 @@
+import collections
+import errno
+import functools
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from utils.frame import Frame, FrameDecoder
+from utils.pipe_reader import PIPEReader, WaitStrategy
+from utils.pipe_writer import PIPEWriter, PipeLimits
+from utils.utils import client_pid, make_pipe
+
+# Chunk header: client id, length of the chunk's data.
+CHUNK = struct.Struct("<QI")
+
+# Most data a chunk written to the inbound pipe carries. A write of at most
+# PIPE_BUF bytes is atomic, so chunks of different clients never interleave.
+MAX_CHUNK = select.PIPE_BUF - CHUNK.size
+
+
+def inbound_path(register_pipe_path: Path) -> Path:
+    """
+    Return the path of the pipe every client writes its requests to.
+    """
+    return Path(f"{register_pipe_path}_inbound")
+
+
+def return_path(register_pipe_path: Path, pid: int) -> Path:
+    """
+    Return the path of the pipe the responses of a process's clients go
+    through.
+    """
+    return Path(f"{register_pipe_path}_to_{pid}_pipe")
+
+
+def pack_chunks(
+    client_id: int, data: bytes, max_size: Optional[int] = None
+) -> Iterator[bytes]:
+    """
+    Split `data` into chunks tagged with `client_id`, each carrying at most
+    `max_size` bytes of it. Without `max_size` there is a single chunk.
+    """
+    view = memoryview(data).cast("B")
+    size = max_size or max(len(view), 1)
+    for pos in range(0, max(len(view), 1), size):
+        part = view[pos : pos + size]
+        yield CHUNK.pack(client_id, len(part)) + part
+
+
+class ChunkDecoder:
+    """
+    A class to reassemble the frames of many clients from a stream of
+    tagged chunks.
+
+    A frame may span several chunks, interleaved with chunks of other
+    clients; the partial frame of each client is kept apart.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize the ChunkDecoder object.
+        """
+        self.buffer = bytearray()
+        # Client id -> decoder holding the start of a frame.
+        self.partial: Dict[int, FrameDecoder] = dict()
+
+    def feed(self, data: bytes) -> List[Tuple[int, Frame]]:
+        """
+        Add bytes read from the stream and return the completed frames with
+        the id of their client.
+        """
+        self.buffer += data
+
+        frames = []
+        pos = 0
+        end = len(self.buffer)
+        while end - pos >= CHUNK.size:
+            client_id, length = CHUNK.unpack_from(self.buffer, pos)
+            start = pos + CHUNK.size
+            if end - start < length:
+                break
+            decoder = self.partial.pop(client_id, None) or FrameDecoder()
+            for frame in decoder.feed(self.buffer[start : start + length]):
+                frames.append((client_id, frame))
+            if decoder.buffer:
+                self.partial[client_id] = decoder
+            pos = start + length
+
+        if pos:
+            del self.buffer[:pos]
+        return frames
+
+    def forget(self, client_id: int) -> None:
+        """
+        Drop the partial frame of a client that is gone.
+        """
+        self.partial.pop(client_id, None)
+
+
+class ChunkReader(PIPEReader):
+    """
+    A class to read tagged chunks from a named pipe shared by many clients.
+
+    read_frames() returns (client id, frame) pairs.
+    """
+
+    def __init__(
+        self, pipe_path: Path, wait_strategy: Optional[WaitStrategy] = None
+    ):
+        """
+        Initialize the ChunkReader object.
+        """
+        super().__init__(pipe_path, wait_strategy)
+        self.decoder = ChunkDecoder()
+
+
+class GroupChannel:
+    """
+    The client end of the shared channel, used by every client of this
+    process talking to one server.
+
+    Requests go to the server's inbound pipe in chunks of at most PIPE_BUF
+    bytes, through one descriptor. Responses of all the clients come back on
+    one return pipe; whichever client reads it queues the frames of the
+    others in their inboxes, the way RequestSender shares its pipe between
+    threads.
+    """
+
+    _lock = threading.Lock()
+    # Register path -> channel of this process.
+    _channels: Dict[Path, "GroupChannel"] = dict()
+
+    @classmethod
+    def acquire(
+        cls,
+        register_pipe_path: Path,
+        wait_strategy: Optional[WaitStrategy] = None,
+    ) -> "GroupChannel":
+        """
+        Return the channel of this process to the server at
+        `register_pipe_path`, creating it for the first client.
+        """
+        with cls._lock:
+            channel = cls._channels.get(register_pipe_path)
+            if channel is None or channel.pid != os.getpid():
+                channel = cls(register_pipe_path, wait_strategy)
+                cls._channels[register_pipe_path] = channel
+            channel.users += 1
+            return channel
+
+    def __init__(
+        self,
+        register_pipe_path: Path,
+        wait_strategy: Optional[WaitStrategy] = None,
+    ) -> None:
+        """
+        Initialize the GroupChannel object.
+        """
+        self.pid = os.getpid()
+        self.register_pipe_path = register_pipe_path
+        self.users = 0
+
+        self.inbound_path = inbound_path(register_pipe_path)
+        self.write_fd = None
+        self.write_lock = threading.Lock()
+
+        self.return_path = return_path(register_pipe_path, self.pid)
+        make_pipe(self.return_path)
+        self.reader = ChunkReader(self.return_path, wait_strategy)
+
+        # Client id -> frames read for it and not taken yet.
+        self.inboxes: Dict[int, Deque[Frame]] = dict()
+        # Set while a client is reading the return pipe.
+        self.reading = False
+        self.cond = threading.Condition()
+
+    def open(self, client_id: int) -> None:
+        """
+        Start queueing the responses of `client_id`.
+        """
+        with self.cond:
+            self.inboxes[client_id] = collections.deque()
+
+    def send(self, client_id: int, data: bytes) -> None:
+        """
+        Write bytes of `client_id`, such as a packed frame, to the inbound
+        pipe.
+        """
+        if self.write_fd is None:
+            with self.write_lock:
+                if self.write_fd is None:
+                    self.write_fd = os.open(self.inbound_path, os.O_WRONLY)
+
+        for chunk in pack_chunks(client_id, data, MAX_CHUNK):
+            # Writes of at most PIPE_BUF bytes are never partial.
+            os.write(self.write_fd, chunk)
+
+    def frames_for(
+        self, client_id: int, busy_wait=True, timeout: Optional[float] = None
+    ) -> List[Frame]:
+        """
+        Return the frames read for `client_id`, reading the return pipe if
+        no other client is.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self.cond:
+                inbox = self.inboxes[client_id]
+                if inbox:
+                    frames = list(inbox)
+                    inbox.clear()
+                    return frames
+
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                if not busy_wait and self.reading:
+                    return []
+                if remaining is not None and remaining <= 0:
+                    return []
+                if self.reading:
+                    self.cond.wait(remaining)
+                    continue
+                self.reading = True
+
+            tagged = []
+            try:
+                tagged = self.reader.read_frames(busy_wait, remaining)
+            finally:
+                with self.cond:
+                    self.reading = False
+                    for owner, frame in tagged:
+                        owner_inbox = self.inboxes.get(owner)
+                        if owner_inbox is not None:
+                            owner_inbox.append(frame)
+                    self.cond.notify_all()
+
+            if not busy_wait:
+                busy_wait, deadline = True, time.monotonic()
+
+    def forget(self, client_id: int) -> None:
+        """
+        Stop queueing the responses of `client_id`.
+        """
+        with self.cond:
+            self.inboxes.pop(client_id, None)
+
+    def release(self) -> None:
+        """
+        Drop one user, closing the channel after the last one.
+        """
+        with self._lock:
+            self.users -= 1
+            if self.users:
+                return
+            if self._channels.get(self.register_pipe_path) is self:
+                del self._channels[self.register_pipe_path]
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close the pipes and delete the return pipe.
+        """
+        self.reader.close()
+        if self.write_fd is not None:
+            os.close(self.write_fd)
+            self.write_fd = None
+        try:
+            self.return_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class SharedReader(PIPEReader):
+    """
+    A class to read the responses of one client from its group channel.
+    """
+
+    def __init__(
+        self,
+        channel: GroupChannel,
+        client_id: int,
+        wait_strategy: Optional[WaitStrategy] = None,
+    ):
+        """
+        Initialize the SharedReader object.
+        """
+        self.channel = channel
+        self.client_id = client_id
+        self.wait_strategy = wait_strategy or WaitStrategy()
+        self.closed = False
+        channel.open(client_id)
+
+    def fileno(self) -> int:
+        """
+        Return the read descriptor of the return pipe, shared by the group.
+        """
+        return self.channel.reader.fileno()
+
+    def read_frames(
+        self, busy_wait=True, timeout: Optional[float] = None
+    ) -> List[Frame]:
+        """
+        Read the frames sent to this client.
+        """
+        return self.channel.frames_for(self.client_id, busy_wait, timeout)
+
+    def close(self):
+        """
+        Leave the group channel.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.channel.forget(self.client_id)
+        self.channel.release()
+
+
+class SharedWriter(PIPEWriter):
+    """
+    A class to write the requests of one client to the inbound pipe.
+    """
+
+    def __init__(self, channel: GroupChannel, client_id: int):
+        """
+        Initialize the SharedWriter object.
+        """
+        super().__init__(channel.inbound_path, persistent=True)
+        self.channel = channel
+        self.client_id = client_id
+
+    def write_bytes(self, data: bytes):
+        """
+        Write raw bytes, such as a packed frame, as chunks of this client.
+        """
+        self.channel.send(self.client_id, data)
+
+    def close(self):
+        """
+        Nothing to close: the descriptor belongs to the group channel.
+        """
+
+
+class ReturnWriters:
+    """
+    The server's writers to the return pipes of client processes.
+
+    Responses are written without blocking, one at a time so those of one
+    process never interleave: what does not fit in a return pipe is queued
+    and written by flush() once the process reads. A process whose queue
+    reaches `max_queued` of its limits is stalled: its responses are dropped
+    from then on and its clients are listed by stalled() to be retired, so
+    one process that stops reading never holds back the others.
+
+    At most MAX_OPEN pipes are kept open; the least recently used one with
+    nothing queued is closed to make room and opened again when needed.
+    """
+
+    MAX_OPEN = 256
+
+    def __init__(
+        self, register_pipe_path: Path, limits: Optional[PipeLimits] = None
+    ) -> None:
+        """
+        Initialize the ReturnWriters object.
+        """
+        self.register_pipe_path = register_pipe_path
+        self.limits = limits or PipeLimits()
+        self.lock = threading.Lock()
+        # Process id -> writer, least recently used first.
+        self.pipes: "collections.OrderedDict[int, PIPEWriter]" = (
+            collections.OrderedDict()
+        )
+        # Process id -> clients with a writer.
+        self.users: Dict[int, int] = collections.Counter()
+        # Processes that stopped reading, until their clients are gone.
+        self.stalled_pids: Set[int] = set()
+
+        # With a reactor, the pipes with queued responses are watched for
+        # room instead of being flushed by the caller.
+        self.reactor = None
+        self.watched: Set[int] = set()
+
+    def limit(self, limits: PipeLimits) -> None:
+        """
+        Apply `limits` to the return pipes.
+        """
+        with self.lock:
+            self.limits = limits
+            for pipe in self.pipes.values():
+                pipe.limit(limits)
+
+    def attach(self, reactor) -> None:
+        """
+        Write queued responses from `reactor` as their pipes get room.
+        """
+        self.reactor = reactor
+
+    def writer(self, client_id: int) -> "ReturnWriter":
+        """
+        Return a writer of responses to `client_id`.
+        """
+        with self.lock:
+            self.users[client_pid(client_id)] += 1
+        return ReturnWriter(self, client_id)
+
+    def release(self, client_id: int) -> None:
+        """
+        Drop the writer of `client_id`, closing the pipe of its process once
+        no client of it is left.
+        """
+        pid = client_pid(client_id)
+        with self.lock:
+            self.users[pid] -= 1
+            if self.users[pid] <= 0:
+                del self.users[pid]
+                self.stalled_pids.discard(pid)
+                self._close(pid)
+
+    def send(self, client_id: int, data: bytes) -> None:
+        """
+        Write bytes, such as a packed frame, to `client_id`.
+
+        Nothing is sent if the client's process is not reading anymore.
+        """
+        pid = client_pid(client_id)
+        with self.lock:
+            if pid in self.stalled_pids:
+                return
+            try:
+                pipe = self._open(pid)
+            except OSError as e:
+                if e.errno not in (errno.ENXIO, errno.ENOENT):
+                    raise
+                return
+            for chunk in pack_chunks(client_id, data):
+                pipe.write_bytes(chunk)
+            self._track(pid, pipe)
+
+    @property
+    def queued(self) -> int:
+        """
+        Bytes of responses waiting for room in the return pipes.
+        """
+        with self.lock:
+            return sum(pipe.queued for pipe in self.pipes.values())
+
+    def flush(self) -> None:
+        """
+        Write the queued responses the pipes have room for.
+        """
+        with self.lock:
+            for pid, pipe in list(self.pipes.items()):
+                if pipe.queued:
+                    pipe.flush()
+                    self._track(pid, pipe)
+
+    def flush_pipe(self, pid: int) -> None:
+        """
+        Write the queued responses of process `pid` its pipe has room for.
+        """
+        with self.lock:
+            pipe = self.pipes.get(pid)
+            if pipe is not None:
+                pipe.flush()
+                self._track(pid, pipe)
+
+    def stalled(self, client_ids: Iterable[int]) -> List[int]:
+        """
+        Return those of `client_ids` whose process stopped reading.
+        """
+        with self.lock:
+            if not self.stalled_pids:
+                return []
+            return [
+                client_id
+                for client_id in client_ids
+                if client_pid(client_id) in self.stalled_pids
+            ]
+
+    def _open(self, pid: int) -> PIPEWriter:
+        pipe = self.pipes.get(pid)
+        if pipe is not None:
+            self.pipes.move_to_end(pid)
+            return pipe
+
+        if len(self.pipes) >= self.MAX_OPEN:
+            idle = next(
+                (p for p, pipe in self.pipes.items() if not pipe.queued), None
+            )
+            if idle is not None:
+                self._close(idle)
+        pipe = PIPEWriter(
+            return_path(self.register_pipe_path, pid), persistent=True
+        )
+        pipe.limit(self.limits)
+        pipe.open_if_read()
+        self.pipes[pid] = pipe
+        return pipe
+
+    def _track(self, pid: int, pipe: PIPEWriter) -> None:
+        """
+        Stall the process if its queue is over the limit, or else have the
+        reactor watch its pipe while something is queued.
+        """
+        if pipe.backlogged:
+            self.stalled_pids.add(pid)
+            self._close(pid)
+            return
+        if self.reactor is None:
+            return
+        if pipe.queued and pid not in self.watched:
+            self.reactor.add_writer(
+                pipe.pipe_fd, functools.partial(self.flush_pipe, pid)
+            )
+            self.watched.add(pid)
+        elif not pipe.queued and pid in self.watched:
+            self.reactor.remove_writer(pipe.pipe_fd)
+            self.watched.discard(pid)
+
+    def _close(self, pid: int) -> None:
+        pipe = self.pipes.pop(pid, None)
+        if pipe is None:
+            return
+        if pid in self.watched:
+            self.reactor.remove_writer(pipe.pipe_fd)
+            self.watched.discard(pid)
+        pipe.close()
+
+    def close(self) -> None:
+        """
+        Close every pipe.
+        """
+        with self.lock:
+            for pid in list(self.pipes):
+                self._close(pid)
+            self.users.clear()
+            self.stalled_pids.clear()
+
+
+class ReturnWriter(PIPEWriter):
+    """
+    A class to write the responses of one client to its process's return
+    pipe.
+    """
+
+    def __init__(self, writers: ReturnWriters, client_id: int):
+        """
+        Initialize the ReturnWriter object.
+        """
+        super().__init__(
+            return_path(writers.register_pipe_path, client_pid(client_id)),
+            persistent=True,
+        )
+        self.writers = writers
+        self.client_id = client_id
+        self.closed = False
+
+    def write_bytes(self, data: bytes):
+        """
+        Write raw bytes, such as a packed frame, tagged with the client id.
+        """
+        self.writers.send(self.client_id, data)
+
+    def limit(self, limits: PipeLimits) -> None:
+        """
+        Apply `limits` to the return pipes, shared with the other clients.
+        """
+        self.writers.limit(limits)
+
+    def close(self):
+        """
+        Give the descriptor of the process back.
+        """
+        if not self.closed:
+            self.closed = True
+            self.writers.release(self.client_id)
@@ -0,0 +1,271 @@
+import ctypes
+import itertools
+import os
+import struct
+import threading
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from utils.shm_ring import attach_shared_memory, create_shared_memory
+
+# Array descriptor header: name length, dtype length, ndim, byte offset.
+DESCRIPTOR = struct.Struct("<HHBQ")
+DIMENSION = struct.Struct("<q")
+
+
+class ArrayDescriptor(NamedTuple):
+    """
+    Where an array lives in a shared memory segment and how to view it.
+    """
+
+    name: str
+    dtype: str
+    shape: Tuple[int, ...]
+    strides: Tuple[int, ...]
+    offset: int
+
+
+def require_numpy() -> None:
+    """
+    Raise if NumPy is not installed.
+    """
+    if np is None:
+        raise ImportError("NumPy is required for shared memory arrays.")
+
+
+def pack_descriptor(descriptor: ArrayDescriptor) -> bytes:
+    """
+    Pack an array descriptor.
+    """
+    name = descriptor.name.encode()
+    dtype = descriptor.dtype.encode()
+    ndim = len(descriptor.shape)
+    return (
+        DESCRIPTOR.pack(len(name), len(dtype), ndim, descriptor.offset)
+        + name
+        + dtype
+        + struct.pack(f"<{ndim}q", *descriptor.shape)
+        + struct.pack(f"<{ndim}q", *descriptor.strides)
+    )
+
+
+def unpack_descriptor(
+    payload: bytes, pos: int = 0
+) -> Tuple[ArrayDescriptor, int]:
+    """
+    Unpack an array descriptor starting at `pos`.
+
+    Returns:
+        The descriptor and the position right after it.
+    """
+    name_len, dtype_len, ndim, offset = DESCRIPTOR.unpack_from(payload, pos)
+    pos += DESCRIPTOR.size
+    name = bytes(payload[pos : pos + name_len]).decode()
+    pos += name_len
+    dtype = bytes(payload[pos : pos + dtype_len]).decode()
+    pos += dtype_len
+    shape = struct.unpack_from(f"<{ndim}q", payload, pos)
+    pos += ndim * DIMENSION.size
+    strides = struct.unpack_from(f"<{ndim}q", payload, pos)
+    pos += ndim * DIMENSION.size
+    return ArrayDescriptor(name, dtype, shape, strides, offset), pos
+
+
+def describe(array, name: str, offset: int = 0) -> ArrayDescriptor:
+    """
+    Describe `array`, which lives at `offset` in the segment `name`.
+    """
+    return ArrayDescriptor(
+        name, array.dtype.str, array.shape, array.strides, offset
+    )
+
+
+def view(shm: SharedMemory, descriptor: ArrayDescriptor):
+    """
+    Map the array described by `descriptor` without copying it.
+    """
+    require_numpy()
+    return np.ndarray(
+        descriptor.shape,
+        dtype=np.dtype(descriptor.dtype),
+        buffer=shm.buf,
+        offset=descriptor.offset,
+        strides=descriptor.strides,
+    )
+
+
+class SegmentPool:
+    """
+    A class to hand out reusable shared memory segments.
+
+    Segments are rounded up to a power of two and kept on a free list per size
+    when released, so steady traffic stops creating and unlinking segments.
+    The pool owns its segments and unlinks them on close().
+    """
+
+    MIN_SEGMENT_SIZE = 4096
+
+    def __init__(self, prefix: Optional[str] = None) -> None:
+        """
+        Initialize the SegmentPool object.
+        """
+        self.prefix = prefix or f"{os.getpid()}_array"
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+
+        self.free: Dict[int, List[SharedMemory]] = dict()
+        self.segments: Dict[str, SharedMemory] = dict()
+        # Segment name -> address of its first byte in this process.
+        self.addresses: Dict[str, int] = dict()
+
+    def acquire(self, nbytes: int) -> SharedMemory:
+        """
+        Return a segment of at least `nbytes` bytes.
+        """
+        size = self.MIN_SEGMENT_SIZE
+        while size < nbytes:
+            size <<= 1
+
+        with self.lock:
+            free = self.free.get(size)
+            if free:
+                return free.pop()
+            name = f"{self.prefix}_{next(self.counter)}"
+
+        shm = create_shared_memory(name, size)
+        with self.lock:
+            self.segments[shm.name] = shm
+            self.addresses[shm.name] = ctypes.addressof(
+                ctypes.c_char.from_buffer(shm.buf)
+            )
+        return shm
+
+    def release(self, shm: SharedMemory) -> None:
+        """
+        Put a segment back on the free list.
+        """
+        with self.lock:
+            self.free.setdefault(shm.size, []).append(shm)
+
+    def ndarray(self, shape, dtype) -> Tuple[SharedMemory, object]:
+        """
+        Allocate an array that lives in a pooled segment.
+
+        Filling this array and passing it to RequestSender.request_array()
+        sends it without any copy.
+
+        Returns:
+            The segment and the array viewing it.
+        """
+        require_numpy()
+        dtype = np.dtype(dtype)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        shm = self.acquire(nbytes)
+        return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+    def locate(self, array) -> Optional[Tuple[str, int]]:
+        """
+        Find the pooled segment that holds `array`.
+
+        Returns:
+            The segment name and the offset of the array in it,
+            or None if the array does not live in this pool.
+        """
+        address = array.__array_interface__["data"][0]
+        with self.lock:
+            for name, start in self.addresses.items():
+                size = self.segments[name].size
+                if start <= address < start + size:
+                    return name, address - start
+        return None
+
+    def close(self) -> None:
+        """
+        Close and unlink every segment of the pool.
+        """
+        with self.lock:
+            segments = list(self.segments.values())
+            self.segments.clear()
+            self.addresses.clear()
+            self.free.clear()
+        for shm in segments:
+            try:
+                shm.close()
+            except BufferError:
+                # An array still views the segment; it is unlinked anyway.
+                pass
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class AttachedSegments:
+    """
+    A class caching segments attached by name, so each segment of a client
+    is mapped once and reused for every request.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize the AttachedSegments object.
+        """
+        self.segments: Dict[str, SharedMemory] = dict()
+
+    def get(self, name: str) -> SharedMemory:
+        """
+        Return the segment `name`, attaching it on first use.
+        """
+        shm = self.segments.get(name)
+        if shm is None:
+            shm = attach_shared_memory(name)
+            self.segments[name] = shm
+        return shm
+
+    def close(self) -> None:
+        """
+        Detach from every segment.
+        """
+        for shm in self.segments.values():
+            try:
+                shm.close()
+            except BufferError:
+                pass
+        self.segments.clear()
+
+
+class ArrayLease:
+    """
+    A class holding a result array that lives in a pooled segment.
+
+    The array is only valid until release() gives the segment back to the
+    pool; copy it first if it has to outlive the lease.
+    """
+
+    def __init__(self, pool: SegmentPool, shm: SharedMemory, array) -> None:
+        """
+        Initialize the ArrayLease object.
+        """
+        self.pool = pool
+        self.shm = shm
+        self.array = array
+
+    def release(self) -> None:
+        """
+        Give the segment back to the pool.
+        """
+        if self.shm is not None:
+            self.array = None
+            self.pool.release(self.shm)
+            self.shm = None
+
+    def __enter__(self):
+        return self.array
+
+    def __exit__(self, *exc_info) -> None:
+        self.release()
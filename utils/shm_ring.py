@@ -0,0 +1,395 @@
+import errno
+import os
+import select
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import List, Optional
+
+from utils.frame import Frame, FrameDecoder, pack_header
+from utils.pipe_reader import WaitStrategy
+
+
+# Names of the segments created by this process, see attach_shared_memory().
+_created_segments = set()
+
+
+def create_shared_memory(name: str, size: int) -> SharedMemory:
+    """
+    Create a shared memory segment owned by this process.
+    """
+    shm = SharedMemory(name, create=True, size=size)
+    _created_segments.add(shm._name)
+    return shm
+
+
+def attach_shared_memory(name: str) -> SharedMemory:
+    """
+    Attach to an existing shared memory segment without tracking it.
+
+    The creator owns the segment. Before Python 3.13 attaching also registers
+    the segment with this process's resource tracker, which would unlink it
+    when this process exits. The registration is dropped again, unless this
+    process created the segment itself and still needs it.
+    """
+    try:
+        return SharedMemory(name, track=False)
+    except TypeError:
+        shm = SharedMemory(name)
+        if shm._name not in _created_segments:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class ShmRing:
+    """
+    A class for a single-producer/single-consumer byte ring in shared memory.
+
+    The segment starts with a header of three counters on separate cache lines:
+    `head` (bytes written, only stored by the producer), `tail` (bytes read,
+    only stored by the consumer) and `parked` (set by the consumer while it
+    sleeps on the doorbell). The counters are aligned 8-byte stores, which
+    are not torn on 64-bit targets. The payload copy is only ordered before
+    the `head` store on CPUs that do not reorder stores, such as x86-64;
+    prefer the FIFO transport on ARM boards.
+    """
+
+    HEADER_SIZE = 256
+
+    # Indexes of the counters in the header viewed as uint64.
+    HEAD = 0
+    TAIL = 8
+    PARKED = 16
+    CAPACITY = 24
+
+    DEFAULT_CAPACITY = 1 << 20
+
+    def __init__(
+        self, name: str, create: bool = False, capacity: int = DEFAULT_CAPACITY
+    ) -> None:
+        """
+        Initialize the ShmRing object.
+
+        Args:
+            name (str): The name of the shared memory segment.
+            create (bool, optional): If True, create and own the segment.
+                If False, attach to an existing one. Defaults to False.
+            capacity (int, optional): The ring size in bytes when creating,
+                a power of two. Defaults to 1 MiB.
+        """
+        self.name = name
+        self.owner = create
+
+        if create:
+            if capacity & (capacity - 1):
+                raise ValueError("Ring capacity must be a power of two.")
+            self.shm = create_shared_memory(
+                name, self.HEADER_SIZE + capacity
+            )
+        else:
+            self.shm = attach_shared_memory(name)
+
+        self.meta = self.shm.buf[: self.HEADER_SIZE].cast("Q")
+        if create:
+            self.meta[self.HEAD] = 0
+            self.meta[self.TAIL] = 0
+            # Nobody reads yet, so the first write must ring the doorbell.
+            self.meta[self.PARKED] = 1
+            self.meta[self.CAPACITY] = capacity
+
+        self.capacity = self.meta[self.CAPACITY]
+        self.mask = self.capacity - 1
+        self.data = self.shm.buf[
+            self.HEADER_SIZE : self.HEADER_SIZE + self.capacity
+        ]
+
+    @property
+    def parked(self) -> bool:
+        return self.meta[self.PARKED] != 0
+
+    @parked.setter
+    def parked(self, value: bool) -> None:
+        self.meta[self.PARKED] = 1 if value else 0
+
+    def write(self, view: memoryview) -> int:
+        """
+        Copy as much of `view` as fits into the ring.
+
+        Returns:
+            The number of bytes written.
+        """
+        head = self.meta[self.HEAD]
+        free = self.capacity - (head - self.meta[self.TAIL])
+        size = min(free, len(view))
+        if size == 0:
+            return 0
+
+        pos = head & self.mask
+        first = min(size, self.capacity - pos)
+        self.data[pos : pos + first] = view[:first]
+        if size > first:
+            self.data[: size - first] = view[first:size]
+
+        self.meta[self.HEAD] = head + size
+        return size
+
+    def read(self) -> bytes:
+        """
+        Take every byte currently in the ring.
+        """
+        tail = self.meta[self.TAIL]
+        size = self.meta[self.HEAD] - tail
+        if size == 0:
+            return b""
+
+        pos = tail & self.mask
+        first = min(size, self.capacity - pos)
+        data = bytes(self.data[pos : pos + first])
+        if size > first:
+            data += bytes(self.data[: size - first])
+
+        self.meta[self.TAIL] = tail + size
+        return data
+
+    def close(self) -> None:
+        """
+        Detach from the segment, and delete it if this side created it.
+        """
+        self.meta.release()
+        self.data.release()
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class ShmReader:
+    """
+    A class to read frames from a shared memory ring.
+
+    It has the same interface as PIPEReader. The named pipe at `doorbell_path`
+    only wakes the reader up when it is parked; in "spin" mode the reader
+    never parks and the producer never touches the pipe.
+    """
+
+    # While parked, recheck the ring this often in case a wakeup was missed.
+    PARK_RECHECK_INTERVAL = 0.01
+
+    def __init__(
+        self,
+        ring: ShmRing,
+        doorbell_path: Path,
+        wait_strategy: Optional[WaitStrategy] = None,
+    ) -> None:
+        """
+        Initialize the ShmReader object.
+        """
+        self.ring = ring
+        self.wait_strategy = wait_strategy or WaitStrategy()
+
+        self.decoder = FrameDecoder()
+
+        self.closed = False
+        self.doorbell_fd = os.open(doorbell_path, os.O_RDONLY | os.O_NONBLOCK)
+        self.keepalive_fd = os.open(doorbell_path, os.O_WRONLY | os.O_NONBLOCK)
+
+        self.poller = select.poll()
+        self.poller.register(self.doorbell_fd, select.POLLIN)
+
+    def fileno(self) -> int:
+        """
+        Return the read descriptor of the doorbell pipe.
+        """
+        return self.doorbell_fd
+
+    def read_frames(
+        self, busy_wait=True, timeout: Optional[float] = None
+    ) -> List[Frame]:
+        """
+        Read frames from the ring.
+
+        Args:
+            busy_wait (bool, optional): If True, wait for data according to the wait strategy.
+                If False, return immediately if there is no data. This is how
+                event loops watching fileno() read, so the reader stays parked
+                and every write rings the doorbell. Defaults to True.
+            timeout (float, optional): Maximum time to wait in seconds.
+                None waits forever. Defaults to None.
+
+        Returns:
+            List[Frame]: The frames read from the ring.
+        """
+        if not busy_wait:
+            self.ring.parked = True
+            self._drain_doorbell()
+            return self._read_frames()
+
+        self.ring.parked = False
+        frames = self._read_frames()
+        if frames:
+            return frames
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        mode = self.wait_strategy.mode
+
+        spins = 0
+        while mode == WaitStrategy.SPIN or (
+            mode == WaitStrategy.SPIN_THEN_BLOCK
+            and spins < self.wait_strategy.spin_count
+        ):
+            frames = self._read_frames()
+            if frames:
+                return frames
+            if deadline is not None and time.monotonic() >= deadline:
+                return []
+            spins += 1
+
+        while True:
+            self.ring.parked = True
+            # Check again after parking, the producer may have missed it.
+            frames = self._read_frames()
+            if frames:
+                self.ring.parked = False
+                return frames
+
+            poll_timeout = self.PARK_RECHECK_INTERVAL
+            if deadline is not None:
+                poll_timeout = min(
+                    poll_timeout, max(deadline - time.monotonic(), 0)
+                )
+            if self.poller.poll(poll_timeout * 1000):
+                self._drain_doorbell()
+
+            frames = self._read_frames()
+            if frames or (
+                deadline is not None and time.monotonic() >= deadline
+            ):
+                self.ring.parked = False
+                return frames
+
+    def _read_frames(self) -> List[Frame]:
+        """
+        Read the complete frames available in the ring without waiting.
+        """
+        data = self.ring.read()
+        if not data:
+            return []
+        return self.decoder.feed(data)
+
+    def _drain_doorbell(self) -> None:
+        """
+        Consume pending doorbell bytes.
+
+        Every ring is one byte and a reader drains after each wakeup, so one
+        read almost always empties the pipe; a leftover byte only causes one
+        spurious wakeup.
+        """
+        try:
+            os.read(self.doorbell_fd, 4096)
+        except BlockingIOError:
+            pass
+
+    def close(self) -> None:
+        """
+        Close the doorbell descriptors and detach from the ring.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        for fd in (self.doorbell_fd, self.keepalive_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        self.ring.close()
+
+
+class ShmWriter:
+    """
+    A class to write frames to a shared memory ring.
+
+    It has the same interface as PIPEWriter. After a write the doorbell pipe
+    is rung only if the reader is parked.
+    """
+
+    # How long to back off while the ring is full.
+    FULL_BACKOFF = 1e-5
+
+    def __init__(self, ring: ShmRing, doorbell_path: Path) -> None:
+        """
+        Initialize the ShmWriter object.
+        """
+        self.ring = ring
+        self.doorbell_path = doorbell_path
+
+        self.doorbell_fd = None
+        self.closed = False
+
+    def write_frame(
+        self,
+        opcode: int,
+        payload: bytes = b"",
+        request_id: int = 0,
+        timestamp: int = 0,
+    ):
+        """
+        Write one frame to the ring, copying the payload straight from
+        `payload` instead of from a packed frame.
+        """
+        self.write_bytes(pack_header(opcode, payload, request_id, timestamp))
+        self.write_bytes(payload)
+
+    def write_bytes(self, data: bytes):
+        """
+        Write raw bytes, such as a packed frame, to the ring.
+
+        Waits while the ring is full.
+        """
+        view = memoryview(data)
+        while view:
+            written = self.ring.write(view)
+            if written and self.ring.parked:
+                self._ring_doorbell()
+            view = view[written:]
+            if view:
+                time.sleep(self.FULL_BACKOFF)
+
+    def _ring_doorbell(self) -> None:
+        """
+        Wake up the parked reader.
+        """
+        try:
+            if self.doorbell_fd is None:
+                self.doorbell_fd = os.open(
+                    self.doorbell_path, os.O_WRONLY | os.O_NONBLOCK
+                )
+            os.write(self.doorbell_fd, b"\0")
+        except BlockingIOError:
+            # The doorbell is already full of unread wakeups.
+            pass
+        except OSError as e:
+            # ENXIO: nobody listens yet; the reader checks the ring on start.
+            if e.errno not in (errno.ENXIO, errno.EPIPE, errno.ENOENT):
+                raise
+            self._close_doorbell()
+
+    def _close_doorbell(self) -> None:
+        if self.doorbell_fd is not None:
+            try:
+                os.close(self.doorbell_fd)
+            except OSError:
+                pass
+            self.doorbell_fd = None
+
+    def close(self):
+        """
+        Close the doorbell descriptor and detach from the ring.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self._close_doorbell()
+        self.ring.close()
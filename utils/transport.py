@@ -0,0 +1,357 @@
+import socket
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from utils import seqpacket, shared_channel
+from utils.pipe_reader import PIPEReader, WaitStrategy
+from utils.pipe_writer import PIPEWriter
+from utils.shm_ring import ShmReader, ShmRing, ShmWriter
+from utils.utils import (
+    FIFO_TRANSPORT,
+    SEQPACKET_TRANSPORT,
+    SHARED_TRANSPORT,
+    SHM_TRANSPORT,
+    ZMQ_TRANSPORT,
+    make_pipe,
+)
+from utils import zmq_pipe
+
+
+def channel_paths(client_id) -> Tuple[Path, Path]:
+    """
+    Return the client-to-server and server-to-client paths of a client, or
+    of a pooled channel given its id.
+    """
+    return (
+        Path(f"{client_id}_to_server_pipe"),
+        Path(f"server_to_{client_id}_pipe"),
+    )
+
+
+class Transport:
+    """
+    A class creating the readers and writers of one kind of transport.
+
+    Readers have the interface of PIPEReader (read, read_frames, fileno,
+    close) and writers the interface of PIPEWriter (write, write_bytes,
+    close), so the client and the server are written once against them.
+    Shared memory channels only carry frames, so their readers have no read().
+
+    - listen()/connect() give the two ends of the register channel.
+    - create_channel() gives the client's ends of its request channel and
+      creates whatever the channel needs. Transports that reach the server
+      through the register channel need its path.
+    - open_channel() gives the server's ends of a client's channel. The
+      reader is None when the server reads all clients from one pipe.
+    - attach_channel() gives the client's ends of a channel the server
+      created, such as one from its channel pool.
+    """
+
+    name = None
+
+    def listen(self, path: Path) -> PIPEReader:
+        """
+        Create the register channel at `path` and return its reader.
+        """
+        make_pipe(path)
+        return PIPEReader(path)
+
+    def connect(self, path: Path) -> PIPEWriter:
+        """
+        Return a writer to the register channel at `path`.
+        """
+        return PIPEWriter(path)
+
+    def create_channel(
+        self,
+        client_id: int,
+        wait_strategy: Optional[WaitStrategy] = None,
+        register_pipe_path: Optional[Path] = None,
+    ):
+        """
+        Create the channel of a client.
+
+        Returns:
+            The reader of responses and the writer of requests.
+        """
+        raise NotImplementedError
+
+    def open_channel(
+        self, client_id: int, wait_strategy: Optional[WaitStrategy] = None
+    ):
+        """
+        Open the channel a client created.
+
+        Returns:
+            The reader of requests, or None if the requests of every client
+            arrive on one pipe, and the writer of responses.
+        """
+        raise NotImplementedError
+
+    def attach_channel(
+        self, channel_id: str, wait_strategy: Optional[WaitStrategy] = None
+    ):
+        """
+        Open the client's ends of a channel the server created.
+
+        Returns:
+            The reader of responses and the writer of requests.
+        """
+        raise NotImplementedError(
+            f"The {self.name} transport has no server-created channels."
+        )
+
+
+class FifoTransport(Transport):
+    """
+    Requests and responses go through two named pipes per client.
+    """
+
+    name = FIFO_TRANSPORT
+
+    def create_channel(
+        self, client_id, wait_strategy=None, register_pipe_path=None
+    ):
+        write_path, read_path = channel_paths(client_id)
+        make_pipe(write_path)
+        make_pipe(read_path)
+        return (
+            PIPEReader(read_path, wait_strategy),
+            PIPEWriter(write_path, persistent=True),
+        )
+
+    def open_channel(self, client_id, wait_strategy=None):
+        read_path, write_path = channel_paths(client_id)
+        return (
+            PIPEReader(read_path, wait_strategy),
+            PIPEWriter(write_path, persistent=True),
+        )
+
+    def attach_channel(self, channel_id, wait_strategy=None):
+        write_path, read_path = channel_paths(channel_id)
+        return (
+            PIPEReader(read_path, wait_strategy),
+            PIPEWriter(write_path, persistent=True),
+        )
+
+
+class ShmTransport(Transport):
+    """
+    Requests and responses go through a shared memory ring per direction;
+    the two named pipes only wake up a parked reader.
+    """
+
+    name = SHM_TRANSPORT
+
+    def create_channel(
+        self, client_id, wait_strategy=None, register_pipe_path=None
+    ):
+        write_path, read_path = channel_paths(client_id)
+        make_pipe(write_path)
+        make_pipe(read_path)
+        return (
+            ShmReader(
+                ShmRing(f"server_to_{client_id}_ring", create=True),
+                read_path,
+                wait_strategy,
+            ),
+            ShmWriter(
+                ShmRing(f"{client_id}_to_server_ring", create=True),
+                write_path,
+            ),
+        )
+
+    def open_channel(self, client_id, wait_strategy=None):
+        read_path, write_path = channel_paths(client_id)
+        return (
+            ShmReader(
+                ShmRing(f"{client_id}_to_server_ring"),
+                read_path,
+                wait_strategy,
+            ),
+            ShmWriter(ShmRing(f"server_to_{client_id}_ring"), write_path),
+        )
+
+
+class ZmqTransport(Transport):
+    """
+    The server binds one ZeroMQ ROUTER socket over `ipc://` at the register
+    path and serves every client from it. A client's channel is a DEALER
+    socket whose routing id is the client id; the registrar sends its lines
+    through a DEALER of its own. All sockets of a process share one context.
+
+    A process serves a single register path with this transport.
+    """
+
+    name = ZMQ_TRANSPORT
+
+    def __init__(self) -> None:
+        self.router: Optional[zmq_pipe.ZmqRouter] = None
+        # Client id -> frames received from it and not read yet.
+        self.inboxes: Dict[int, zmq_pipe.ZmqInbox] = dict()
+
+    def listen(self, path):
+        self.router = zmq_pipe.ZmqRouter(path, self.inboxes)
+        return self.router
+
+    def connect(self, path):
+        return zmq_pipe.ZmqWriter(zmq_pipe.ZmqDealer(path), control=True)
+
+    def create_channel(
+        self, client_id, wait_strategy=None, register_pipe_path=None
+    ):
+        if register_pipe_path is None:
+            raise ValueError("The zmq transport needs the register path.")
+        dealer = zmq_pipe.ZmqDealer(
+            register_pipe_path, zmq_pipe.routing_id(client_id)
+        )
+        return (
+            zmq_pipe.ZmqReader(dealer, wait_strategy),
+            zmq_pipe.ZmqWriter(dealer),
+        )
+
+    def open_channel(self, client_id, wait_strategy=None):
+        if self.router is None:
+            raise RuntimeError("The zmq transport is not listening.")
+        return (
+            zmq_pipe.ZmqChannelReader(
+                client_id, self.inboxes, wait_strategy
+            ),
+            zmq_pipe.ZmqChannelWriter(self.router, client_id),
+        )
+
+
+class SeqpacketTransport(Transport):
+    """
+    The register path is an AF_UNIX SOCK_SEQPACKET socket the server listens
+    on (a path starting with "@" lives in the abstract namespace). Each
+    client connects once more for its channel, announcing its id in the
+    first message; that single connection carries requests and responses,
+    so no per-client files are created.
+    """
+
+    name = SEQPACKET_TRANSPORT
+
+    def __init__(self) -> None:
+        # Client id -> accepted channel connection not yet opened.
+        self.channels: Dict[int, socket.socket] = dict()
+
+    def listen(self, path):
+        return seqpacket.SeqpacketListener(path, self.channels)
+
+    def connect(self, path):
+        return seqpacket.SeqpacketWriter(seqpacket.connect(path))
+
+    def create_channel(
+        self, client_id, wait_strategy=None, register_pipe_path=None
+    ):
+        if register_pipe_path is None:
+            raise ValueError(
+                "The seqpacket transport needs the register socket path."
+            )
+        sock = seqpacket.connect_channel(register_pipe_path, client_id)
+        return (
+            seqpacket.SeqpacketReader(sock, wait_strategy),
+            seqpacket.SeqpacketWriter(sock),
+        )
+
+    def open_channel(self, client_id, wait_strategy=None):
+        sock = self.channels.pop(client_id)
+        return (
+            seqpacket.SeqpacketReader(sock, wait_strategy),
+            seqpacket.SeqpacketWriter(sock),
+        )
+
+
+class SharedTransport(Transport):
+    """
+    Every client writes its requests, tagged with its id, to one inbound
+    pipe of the server, in chunks of at most PIPE_BUF bytes so that writes
+    of different clients never interleave. The responses to all clients of
+    a process come back tagged on one return pipe. A process with thousands
+    of clients thus uses two pipes, and the server reads them all from one
+    descriptor instead of serving each client from a thread of its own.
+
+    The server has no reader per client: the registration handler reads
+    the inbound pipe and hands each request to its client's handler.
+    A process serves a single register path with this transport.
+    """
+
+    name = SHARED_TRANSPORT
+
+    def __init__(self) -> None:
+        self.inbound: Optional[shared_channel.ChunkReader] = None
+        self.returns: Optional[shared_channel.ReturnWriters] = None
+
+    def listen(self, path):
+        # Clients wait for the register pipe, so the inbound pipe must
+        # exist by then.
+        inbound_path = shared_channel.inbound_path(path)
+        make_pipe(inbound_path)
+        self.inbound = shared_channel.ChunkReader(inbound_path)
+        self.returns = shared_channel.ReturnWriters(path)
+        return super().listen(path)
+
+    def create_channel(
+        self, client_id, wait_strategy=None, register_pipe_path=None
+    ):
+        if register_pipe_path is None:
+            raise ValueError("The shared transport needs the register path.")
+        channel = shared_channel.GroupChannel.acquire(
+            register_pipe_path, wait_strategy
+        )
+        return (
+            shared_channel.SharedReader(channel, client_id, wait_strategy),
+            shared_channel.SharedWriter(channel, client_id),
+        )
+
+    def open_channel(self, client_id, wait_strategy=None):
+        if self.returns is None:
+            raise RuntimeError("The shared transport is not listening.")
+        return None, self.returns.writer(client_id)
+
+
+_TRANSPORTS: Dict[str, Transport] = {
+    transport.name: transport
+    for transport in (
+        FifoTransport(),
+        ShmTransport(),
+        ZmqTransport(),
+        SeqpacketTransport(),
+        SharedTransport(),
+    )
+}
+
+# URL schemes accepted by parse_url().
+SCHEMES = {
+    "fifo": FIFO_TRANSPORT,
+    "shm": SHM_TRANSPORT,
+    "zmq+ipc": ZMQ_TRANSPORT,
+    "unix+seqpacket": SEQPACKET_TRANSPORT,
+    "fifo+shared": SHARED_TRANSPORT,
+}
+
+
+def get_transport(name: str) -> Transport:
+    """
+    Return the transport called `name`.
+    """
+    try:
+        return _TRANSPORTS[name]
+    except KeyError:
+        raise ValueError(f"Unknown transport: {name}") from None
+
+
+def parse_url(url: str) -> Tuple[str, Path]:
+    """
+    Split a URL such as `fifo://register_pipe` or `zmq+ipc:///tmp/register`
+    into a transport name and the path of the register channel.
+
+    A plain path uses the FIFO transport.
+    """
+    if "://" not in url:
+        return FIFO_TRANSPORT, Path(url)
+    scheme, path = url.split("://", 1)
+    if scheme not in SCHEMES:
+        raise ValueError(f"Unknown transport scheme: {scheme}")
+    return SCHEMES[scheme], Path(path)
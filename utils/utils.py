@@ -1,6 +1,33 @@
+import errno
+import fcntl
+import itertools
 import os
 from pathlib import Path
 
+# How request and response frames travel between a client and the server.
+# "fifo": through the two named pipes of the client.
+# "shm": through a shared memory ring per direction, the named pipes only
+#   wake up a parked reader.
+# "zmq": through DEALER sockets talking to one ZeroMQ ROUTER socket over
+#   ipc://, which is the register channel too.
+# "seqpacket": through one AF_UNIX SOCK_SEQPACKET connection per client,
+#   accepted on the socket listening at the register path.
+# "shared": clients write tagged requests to one inbound pipe of the server,
+#   and the responses come back on one pipe per client process.
+FIFO_TRANSPORT = "fifo"
+SHM_TRANSPORT = "shm"
+ZMQ_TRANSPORT = "zmq"
+SEQPACKET_TRANSPORT = "seqpacket"
+SHARED_TRANSPORT = "shared"
+
+TRANSPORTS = (
+    FIFO_TRANSPORT,
+    SHM_TRANSPORT,
+    ZMQ_TRANSPORT,
+    SEQPACKET_TRANSPORT,
+    SHARED_TRANSPORT,
+)
+
 
 def make_pipe(path: Path) -> None:
     """
@@ -14,3 +41,81 @@ def make_pipe(path: Path) -> None:
     if os.path.exists(path):
         os.remove(path)
     os.mkfifo(path)
+
+
+# fcntl commands resizing a pipe's kernel buffer, in the fcntl module
+# since Python 3.10.
+F_SETPIPE_SZ = getattr(fcntl, "F_SETPIPE_SZ", 1031)
+F_GETPIPE_SZ = getattr(fcntl, "F_GETPIPE_SZ", 1032)
+
+
+def pipe_max_size() -> int:
+    """
+    Return the largest pipe capacity an unprivileged process may set.
+    """
+    try:
+        with open("/proc/sys/fs/pipe-max-size") as f:
+            return int(f.read())
+    except OSError:
+        return 1024 * 1024
+
+
+def pipe_capacity(fd: int) -> int:
+    """
+    Return the capacity of the pipe `fd` belongs to, in bytes.
+    """
+    return fcntl.fcntl(fd, F_GETPIPE_SZ)
+
+
+def set_pipe_capacity(fd: int, size: int) -> int:
+    """
+    Resize the kernel buffer of the pipe `fd` belongs to.
+
+    The size is capped at pipe_max_size() when the process may not go
+    beyond it, and a pipe holding more than `size` bytes keeps its
+    capacity. The capacity lasts as long as any descriptor of the pipe is
+    open, so a FIFO is resized once opened rather than when created.
+
+    Returns:
+        The capacity of the pipe, which the kernel rounds up to a power of
+        two pages.
+    """
+    try:
+        return fcntl.fcntl(fd, F_SETPIPE_SZ, size)
+    except OSError as e:
+        if e.errno == errno.EPERM:
+            return fcntl.fcntl(fd, F_SETPIPE_SZ, min(size, pipe_max_size()))
+        if e.errno == errno.EBUSY:
+            return pipe_capacity(fd)
+        raise
+
+
+_client_counter = itertools.count()
+
+# Bits of a client id from new_client_id() below the process id.
+CLIENT_COUNTER_BITS = 20
+
+# Largest process id Linux can hand out (PID_MAX_LIMIT on 64-bit).
+PID_MAX_LIMIT = 1 << 22
+
+
+def new_client_id() -> int:
+    """
+    Return a client id that is unique on this machine.
+
+    The process id is kept in the high bits so several clients can live in one
+    process, e.g. thousands of coroutine clients sharing an event loop.
+    """
+    return (os.getpid() << CLIENT_COUNTER_BITS) | (
+        next(_client_counter) & ((1 << CLIENT_COUNTER_BITS) - 1)
+    )
+
+
+def client_pid(client_id: int) -> int:
+    """
+    Return the process id of a client, whose id is either its process id or
+    an id from new_client_id().
+    """
+    if client_id >= PID_MAX_LIMIT:
+        return client_id >> CLIENT_COUNTER_BITS
+    return client_id
@@ -0,0 +1,593 @@
+import collections
+import os
+import select
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+try:
+    import zmq
+except ImportError:
+    zmq = None
+
+from utils.frame import Frame, FrameDecoder, pack_header, unpack_header
+from utils.pipe_reader import PIPEReader, WaitStrategy
+from utils.pipe_writer import PIPEWriter
+
+# How long closing a client socket keeps trying to deliver queued messages,
+# in milliseconds.
+LINGER = 1000
+
+# Longest sleep of a client on the descriptor of its socket, in seconds.
+# The descriptor is edge-triggered and a send from another thread may
+# consume the edge, so the socket is looked at again after this long.
+POLL_INTERVAL = 0.01
+
+# Empty part in front of a register line, telling it apart from a frame.
+CONTROL = b""
+
+# Payloads of at least this many bytes are sent as a message part of their
+# own without being copied, with a tracker telling when ZeroMQ let go of
+# them. Smaller frames are packed and copied, which is cheaper for them.
+COPY_THRESHOLD = 65536
+
+
+def require_zmq() -> None:
+    """
+    Raise an ImportError if pyzmq is not installed.
+    """
+    if zmq is None:
+        raise ImportError("The zmq transport requires pyzmq.")
+
+
+def shared_context() -> "zmq.Context":
+    """
+    Return the context of this process. Every socket shares its I/O thread.
+    """
+    require_zmq()
+    return zmq.Context.instance()
+
+
+def message_item(parts: list) -> Union[Frame, bytes]:
+    """
+    Turn the parts of a received frame message into a Frame when the
+    payload came as a part of its own, keeping a view of ZeroMQ's buffer,
+    or into the bytes of the packed frames otherwise.
+    """
+    if len(parts) == 2:
+        return unpack_header(parts[0].bytes, parts[1].buffer)
+    return parts[0].bytes
+
+
+def decode_items(
+    decoder: FrameDecoder, items: List[Union[Frame, bytes]]
+) -> List[Frame]:
+    """
+    Return the frames of received items in order, feeding packed frames
+    through `decoder`.
+    """
+    frames = []
+    for item in items:
+        if isinstance(item, Frame):
+            frames.append(item)
+        else:
+            frames.extend(decoder.feed(item))
+    return frames
+
+
+def frame_parts(
+    opcode: int, payload, request_id: int, timestamp: int
+) -> List[bytes]:
+    """
+    Return the header and the payload of a frame as two message parts.
+    """
+    return [pack_header(opcode, payload, request_id, timestamp), payload]
+
+
+def routing_id(client_id: int) -> bytes:
+    """
+    Return the routing id of the DEALER socket carrying `client_id`'s
+    channel; the server finds the client by it.
+    """
+    return str(client_id).encode()
+
+
+class SocketPoller:
+    """
+    A poller with the interface of select.poll() for one ZeroMQ socket.
+
+    It waits on the socket's descriptor for at most POLL_INTERVAL and then
+    always reports the socket ready, so the caller looks at it again.
+    """
+
+    def __init__(self, fd: int) -> None:
+        """
+        Initialize the SocketPoller object.
+        """
+        self.fd = fd
+        self.poller = select.poll()
+        self.poller.register(fd, select.POLLIN)
+
+    def poll(self, timeout: Optional[float] = None) -> list:
+        """
+        Wait up to `timeout` milliseconds, capped at POLL_INTERVAL.
+        """
+        cap = POLL_INTERVAL * 1000
+        self.poller.poll(cap if timeout is None else min(timeout, cap))
+        return [(self.fd, select.POLLIN)]
+
+
+class LockedSocket:
+    """
+    A ZeroMQ socket used by several threads, one at a time.
+
+    ZeroMQ sockets are not thread-safe, but may be used from any thread as
+    long as calls do not overlap.
+    """
+
+    def __init__(self, socket: "zmq.Socket") -> None:
+        """
+        Initialize the LockedSocket object.
+        """
+        self.socket = socket
+        self.lock = threading.Lock()
+        self.closed = False
+        self.fd = socket.getsockopt(zmq.FD)
+
+    def fileno(self) -> int:
+        """
+        Return the descriptor ZeroMQ signals on when the socket has events.
+        """
+        return self.fd
+
+    def send_multipart(
+        self, parts: list, copy: bool = True, track: bool = False
+    ) -> Optional["zmq.MessageTracker"]:
+        """
+        Send one message made of `parts`.
+
+        Returns:
+            The tracker of the message if `track` is set.
+        """
+        with self.lock:
+            if not self.closed:
+                return self.socket.send_multipart(
+                    parts, copy=copy, track=track
+                )
+        return None
+
+    def readable(self) -> bool:
+        """
+        Return whether a message is waiting.
+        """
+        with self.lock:
+            if self.closed:
+                return False
+            return bool(self.socket.getsockopt(zmq.EVENTS) & zmq.POLLIN)
+
+    def recv_all(self) -> List[List["zmq.Frame"]]:
+        """
+        Receive every waiting message without waiting or copying.
+        """
+        messages = []
+        with self.lock:
+            while not self.closed:
+                try:
+                    messages.append(
+                        self.socket.recv_multipart(zmq.NOBLOCK, copy=False)
+                    )
+                except zmq.Again:
+                    break
+        return messages
+
+    def close(self, linger: int = 0) -> None:
+        """
+        Close the socket.
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.socket.close(linger=linger)
+
+
+class ZmqDealer(LockedSocket):
+    """
+    A DEALER socket connected to the server's ROUTER at `ipc://<path>`.
+
+    A client's channel is one DEALER whose routing id is the client id, read
+    by a ZmqReader and written by a ZmqWriter; it is closed once both are.
+    The registrar uses a DEALER of its own without a routing id.
+    """
+
+    def __init__(self, path: Path, identity: Optional[bytes] = None) -> None:
+        """
+        Initialize the ZmqDealer object.
+        """
+        socket = shared_context().socket(zmq.DEALER)
+        if identity is not None:
+            socket.setsockopt(zmq.ROUTING_ID, identity)
+        socket.connect(f"ipc://{path}")
+        super().__init__(socket)
+        self.users = 0
+
+    def acquire(self) -> "ZmqDealer":
+        """
+        Count one more reader or writer using the socket.
+        """
+        with self.lock:
+            self.users += 1
+        return self
+
+    def release(self) -> None:
+        """
+        Count one reader or writer less, closing the socket after the last.
+        """
+        with self.lock:
+            self.users -= 1
+            last = self.users == 0
+        if last:
+            self.close(linger=LINGER)
+
+
+class ZmqReader(PIPEReader):
+    """
+    A class to read the responses arriving on a client's DEALER socket.
+    """
+
+    def __init__(
+        self, dealer: ZmqDealer, wait_strategy: Optional[WaitStrategy] = None
+    ):
+        """
+        Initialize the ZmqReader object.
+        """
+        self.dealer = dealer.acquire()
+        self.wait_strategy = wait_strategy or WaitStrategy()
+
+        self.closed = False
+        self.partial = b""
+        self.decoder = FrameDecoder()
+
+        self.poller = SocketPoller(dealer.fileno())
+
+    def fileno(self) -> int:
+        """
+        Return the descriptor ZeroMQ signals on when the socket has events.
+
+        It is edge-triggered, which is enough for a reactor because every
+        callback reads until no message is left.
+        """
+        return self.dealer.fileno()
+
+    def _read_frames(self) -> List[Frame]:
+        """
+        Read the frames of every message waiting on the socket without
+        waiting. Payloads sent apart are views of the received buffers.
+        """
+        return decode_items(
+            self.decoder,
+            [message_item(parts) for parts in self.dealer.recv_all()],
+        )
+
+    def close(self):
+        """
+        Stop using the socket.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.dealer.release()
+
+
+class ZmqWriter(PIPEWriter):
+    """
+    A class to write to the server through a DEALER socket.
+
+    Every write is one message. A `control` writer sends register lines,
+    which carry an empty first part; the others send frames.
+    """
+
+    def __init__(self, dealer: ZmqDealer, control: bool = False):
+        """
+        Initialize the ZmqWriter object.
+        """
+        self.dealer = dealer.acquire()
+        self.control = control
+        self.persistent = True
+        self.closed = False
+        self.copy_threshold = COPY_THRESHOLD
+
+    def write_frame(
+        self,
+        opcode: int,
+        payload: bytes = b"",
+        request_id: int = 0,
+        timestamp: int = 0,
+    ) -> Optional["zmq.MessageTracker"]:
+        """
+        Write one frame. A payload of at least `copy_threshold` bytes is
+        sent without being copied.
+
+        Returns:
+            The tracker of a payload sent without copying; it must not be
+            modified until the tracker is done.
+        """
+        if memoryview(payload).nbytes < self.copy_threshold:
+            return super().write_frame(opcode, payload, request_id, timestamp)
+        return self.dealer.send_multipart(
+            frame_parts(opcode, payload, request_id, timestamp),
+            copy=False,
+            track=True,
+        )
+
+    def write_bytes(self, data: bytes):
+        """
+        Send raw bytes, such as a packed frame, as one message.
+        """
+        if self.control:
+            self.dealer.send_multipart([CONTROL, data])
+        else:
+            self.dealer.send_multipart([data])
+
+    def close(self):
+        """
+        Stop using the socket, delivering queued messages for up to LINGER
+        ms once nothing else uses it.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.dealer.release()
+
+
+class ZmqInbox:
+    """
+    The frames the router received for one client, waiting for the request
+    handler: packed frames, or Frames whose payload came apart. An eventfd
+    tells the handler there is something to read.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize the ZmqInbox object.
+        """
+        self.items = collections.deque()
+        self.event_fd = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+
+    def push(self, item: Union[Frame, bytes]) -> None:
+        """
+        Queue `item` and wake up the reader.
+        """
+        self.items.append(item)
+        try:
+            os.eventfd_write(self.event_fd, 1)
+        except OSError:
+            # The handler closed the inbox meanwhile; nobody reads it.
+            pass
+
+    def pop_all(self) -> List[Union[Frame, bytes]]:
+        """
+        Take everything queued without waiting.
+        """
+        try:
+            os.eventfd_read(self.event_fd)
+        except BlockingIOError:
+            pass
+        items = []
+        while self.items:
+            items.append(self.items.popleft())
+        return items
+
+    def close(self) -> None:
+        """
+        Close the eventfd.
+        """
+        os.close(self.event_fd)
+
+
+def inbox_of(inboxes: Dict[int, ZmqInbox], client_id: int) -> ZmqInbox:
+    """
+    Return the inbox of `client_id`, creating it if needed. The router and
+    the request handler may both be first, from different threads.
+    """
+    inbox = inboxes.get(client_id)
+    if inbox is None:
+        new_inbox = ZmqInbox()
+        inbox = inboxes.setdefault(client_id, new_inbox)
+        if inbox is not new_inbox:
+            new_inbox.close()
+    return inbox
+
+
+class ZmqRouter(PIPEReader):
+    """
+    A class to serve every client from one ROUTER socket bound to
+    `ipc://<path>`.
+
+    It reads the register lines itself and queues the frames of each client
+    in its inbox in `inboxes`, keyed by client id; the request handlers read
+    them from there and answer through send(). No socket is created per
+    client.
+
+    A send may consume the edge ZeroMQ signals incoming messages with, so
+    send() rings an eventfd when messages are left waiting. Both live in one
+    epoll set, whose descriptor is what fileno() returns and what is polled.
+    """
+
+    def __init__(self, path: Path, inboxes: Dict[int, ZmqInbox]):
+        """
+        Initialize the ZmqRouter object.
+        """
+        self.pipe_path = path
+        self.wait_strategy = WaitStrategy()
+        self.inboxes = inboxes
+
+        self.closed = False
+        self.partial = b""
+
+        socket = shared_context().socket(zmq.ROUTER)
+        socket.bind(f"ipc://{path}")
+        self.socket = LockedSocket(socket)
+        self.wake_fd = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+
+        self.epoll = select.epoll()
+        self.epoll.register(self.socket.fileno(), select.EPOLLIN)
+        self.epoll.register(self.wake_fd, select.EPOLLIN)
+        self.poller = select.poll()
+        self.poller.register(self.epoll.fileno(), select.POLLIN)
+
+    def fileno(self) -> int:
+        """
+        Return the descriptor of the epoll set.
+        """
+        return self.epoll.fileno()
+
+    def _read_nonblocking(self) -> bytes:
+        """
+        Read every waiting message, queue frames in the inboxes of their
+        clients and return the register lines.
+        """
+        try:
+            os.eventfd_read(self.wake_fd)
+        except BlockingIOError:
+            pass
+
+        lines = []
+        for identity, *parts in self.socket.recv_all():
+            identity = identity.bytes
+            if len(parts) == 2 and len(parts[0]) == len(CONTROL):
+                lines.append(parts[1].bytes)
+            elif identity.isdigit():
+                # Frames may arrive before the register line, which comes
+                # through the registrar's own socket.
+                inbox_of(self.inboxes, int(identity)).push(
+                    message_item(parts)
+                )
+        return b"".join(lines)
+
+    def send(
+        self,
+        client_id: int,
+        parts: List[bytes],
+        copy: bool = True,
+        track: bool = False,
+    ) -> Optional["zmq.MessageTracker"]:
+        """
+        Send a message made of `parts` to the DEALER of `client_id`.
+        """
+        tracker = self.socket.send_multipart(
+            [routing_id(client_id)] + parts, copy=copy, track=track
+        )
+        if self.socket.readable():
+            os.eventfd_write(self.wake_fd, 1)
+        return tracker
+
+    def close(self):
+        """
+        Close the socket and the epoll set.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.socket.close()
+        self.epoll.close()
+        os.close(self.wake_fd)
+
+
+class ZmqChannelReader(PIPEReader):
+    """
+    A class to read the frames the router queued for one client.
+    """
+
+    def __init__(
+        self,
+        client_id: int,
+        inboxes: Dict[int, ZmqInbox],
+        wait_strategy: Optional[WaitStrategy] = None,
+    ):
+        """
+        Initialize the ZmqChannelReader object.
+        """
+        self.client_id = client_id
+        self.inboxes = inboxes
+        self.inbox = inbox_of(inboxes, client_id)
+        self.wait_strategy = wait_strategy or WaitStrategy()
+
+        self.closed = False
+        self.partial = b""
+        self.decoder = FrameDecoder()
+
+        self.poller = select.poll()
+        self.poller.register(self.inbox.event_fd, select.POLLIN)
+
+    def fileno(self) -> int:
+        """
+        Return the eventfd of the inbox.
+        """
+        return self.inbox.event_fd
+
+    def _read_frames(self) -> List[Frame]:
+        """
+        Take the frames the router queued without waiting.
+        """
+        return decode_items(self.decoder, self.inbox.pop_all())
+
+    def close(self):
+        """
+        Drop the inbox.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.inboxes.pop(self.client_id, None)
+        self.inbox.close()
+
+
+class ZmqChannelWriter(PIPEWriter):
+    """
+    A class to write to one client through the router.
+    """
+
+    def __init__(self, router: ZmqRouter, client_id: int):
+        """
+        Initialize the ZmqChannelWriter object.
+        """
+        self.router = router
+        self.client_id = client_id
+        self.persistent = True
+        self.copy_threshold = COPY_THRESHOLD
+
+    def write_frame(
+        self,
+        opcode: int,
+        payload: bytes = b"",
+        request_id: int = 0,
+        timestamp: int = 0,
+    ) -> Optional["zmq.MessageTracker"]:
+        """
+        Write one frame. A payload of at least `copy_threshold` bytes is
+        sent without being copied.
+
+        Returns:
+            The tracker of a payload sent without copying; it must not be
+            modified until the tracker is done.
+        """
+        if memoryview(payload).nbytes < self.copy_threshold:
+            return super().write_frame(opcode, payload, request_id, timestamp)
+        return self.router.send(
+            self.client_id,
+            frame_parts(opcode, payload, request_id, timestamp),
+            copy=False,
+            track=True,
+        )
+
+    def write_bytes(self, data: bytes):
+        """
+        Send raw bytes, such as a packed frame, as one message.
+        """
+        self.router.send(self.client_id, [data])
+
+    def close(self):
+        """
+        Nothing to close; the router outlives its clients.
+        """